@@ -1,9 +1,11 @@
 import os
 import secrets
+from http.cookies import SimpleCookie
 from fastapi import Depends, HTTPException, status, Response, Request
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from jose import jwt, JWTError
 from sqlmodel import Session, select
+from starlette.types import Scope
 from typing import Union, Optional
 from datetime import datetime, timedelta
 from .models import User
@@ -46,6 +48,31 @@ def get_token_from_cookie_or_header(request: Request, token: Optional[str] = Dep
     
     return None
 
+def token_from_scope(scope: Scope) -> Optional[str]:
+    """The same token as get_token_from_cookie_or_header, read from a raw ASGI scope (for middleware)"""
+    headers = dict(scope["headers"])
+    cookie = headers.get(b"cookie")
+    if cookie:
+        morsel = SimpleCookie(cookie.decode("latin-1")).get("access_token")
+        if morsel is not None:
+            return morsel.value
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if authorization.startswith("Bearer "):
+        return authorization[len("Bearer "):]
+    return None
+
+def username_from_token(token: Optional[str]) -> Optional[str]:
+    """Subject of a valid access token, or None"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type", "access") != "access":
+        return None
+    return payload.get("sub")
+
 def get_current_user(token: Optional[str] = Depends(get_token_from_cookie_or_header)) -> User:
     """
     Get current user from token (cookie or header).
@@ -57,17 +84,8 @@ def get_current_user(token: Optional[str] = Depends(get_token_from_cookie_or_hea
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    if not token:
-        raise credentials_exception
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        token_type: str = payload.get("type", "access")
-        
-        if username is None or token_type != "access":
-            raise credentials_exception
-    except JWTError:
+    username = username_from_token(token)
+    if username is None:
         raise credentials_exception
     
     with Session(engine) as session:
@@ -76,6 +94,18 @@ def get_current_user(token: Optional[str] = Depends(get_token_from_cookie_or_hea
             raise credentials_exception
         return user
 
+def get_current_admin(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Get current user and require admin rights.
+    Raises 403 for authenticated non-admin users.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
+
 def get_current_user_optional(token: Optional[str] = Depends(get_token_from_cookie_or_header)) -> Union[User, None]:
     """
     Get current user from token, but return None instead of raising exception.
@@ -93,10 +123,10 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire, "type": "access"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(data: dict):
-    """Create JWT refresh token"""
+def create_refresh_token(data: dict, expires_at: datetime = None):
+    """Create JWT refresh token (see app/refresh_tokens.py for issuing and rotating them)"""
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    expire = expires_at or datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire, "type": "refresh"})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -139,4 +169,39 @@ def set_auth_cookies(response: Response, access_token: str, refresh_token: str,
 def clear_auth_cookies(response: Response):
     """Clear authentication cookies on logout"""
     response.delete_cookie(key="access_token", path="/")
-    response.delete_cookie(key="refresh_token", path="/") 
\ No newline at end of file
+    response.delete_cookie(key="refresh_token", path="/") 
+
+CSRF_TOKEN_MAX_AGE = 60 * 60  # 1 hour, as issued by the frontend's /api/csrf
+
+def set_csrf_cookie(response: Response) -> str:
+    """Issue a fresh CSRF token in an HTTP-only cookie and return it"""
+    token = secrets.token_hex(32)
+    response.set_cookie(
+        key="csrf_token",
+        value=token,
+        max_age=CSRF_TOKEN_MAX_AGE,
+        httponly=True,
+        secure=True,
+        samesite="strict",
+        path="/"
+    )
+    return token
+
+PROFILE_TOKEN_EXPIRE_MINUTES = int(os.getenv("PROFILE_TOKEN_EXPIRE_MINUTES", "30"))
+
+def create_profile_token(username: str) -> str:
+    """Signed X-Profile header value: requests carrying it are profiled (see app/profiling.py)"""
+    expire = datetime.utcnow() + timedelta(minutes=PROFILE_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({"sub": username, "exp": expire, "type": "profile"}, SECRET_KEY, algorithm=ALGORITHM)
+
+def profile_token_subject(token: Optional[str]) -> Optional[str]:
+    """Admin who issued a valid profile token, or None"""
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "profile":
+        return None
+    return payload.get("sub")
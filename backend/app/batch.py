@@ -0,0 +1,159 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, update
+from sqlmodel import Session, SQLModel, select
+
+# Largest batch accepted by the /batch endpoints
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+def _error(loc: Sequence[Any], msg: str, type_: str) -> Dict[str, Any]:
+    return {"loc": list(loc), "msg": msg, "type": type_}
+
+def _validation_errors(exc: ValidationError) -> List[Dict[str, Any]]:
+    # Drop "input"/"ctx", which may not be JSON-serializable
+    return [_error(err["loc"], err["msg"], err["type"]) for err in exc.errors(include_url=False)]
+
+def _unknown_fields(item: Dict[str, Any], allowed: Sequence[str]) -> List[Dict[str, Any]]:
+    return [_error([key], "Field cannot be set in a batch", "extra_forbidden")
+            for key in item if key not in allowed]
+
+def _check_size(items: List[Any]) -> None:
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(items)} items; the maximum is {BATCH_MAX_ITEMS}",
+        )
+
+def _summary(results: List[Dict[str, Any]], atomic: bool) -> Dict[str, Any]:
+    failed = sum(1 for result in results if result["status"] == "error")
+    body = {"ok": len(results) - failed, "failed": failed, "items": results}
+    if atomic and failed:
+        raise HTTPException(status_code=422, detail=body)
+    return body
+
+def bulk_create(
+    session: Session,
+    model: Type[SQLModel],
+    items: List[Any],
+    fields: Sequence[str],
+    atomic: bool = False,
+    prepare: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Validate `items` as new `model` rows and insert the valid ones.
+
+    All rows go in with a single multi-row INSERT ... RETURNING id and one
+    commit. Each item gets a result entry with its index and either its new
+    id or its validation errors. With `atomic`, any invalid item rejects the
+    whole batch with a 422 and nothing is written. `prepare` may fill in
+    derived columns on each validated row before it is written.
+    """
+    _check_size(items)
+    results: List[Dict[str, Any]] = []
+    rows: List[Dict[str, Any]] = []
+    pending: List[Dict[str, Any]] = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors = [_error([], "Item must be an object", "dict_type")]
+        else:
+            errors = _unknown_fields(item, fields)
+        if not errors:
+            try:
+                row = model.model_validate(item).model_dump(exclude={"id"})
+                if prepare:
+                    prepare(row)
+            except ValidationError as exc:
+                errors = _validation_errors(exc)
+        if errors:
+            results.append({"index": index, "status": "error", "errors": errors})
+            continue
+        result = {"index": index, "status": "created", "id": None}
+        results.append(result)
+        rows.append(row)
+        pending.append(result)
+
+    if atomic and len(pending) < len(results):
+        return _summary(results, atomic)
+
+    if rows:
+        # Ids come back in the order of `rows` (matched through the model's
+        # insert sentinel column), so they zip straight onto items
+        ids = session.execute(
+            insert(model).returning(model.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        session.commit()
+        for result, new_id in zip(pending, ids):
+            result["id"] = new_id
+
+    return _summary(results, atomic)
+
+def bulk_update(
+    session: Session,
+    model: Type[SQLModel],
+    items: List[Any],
+    fields: Sequence[str],
+    atomic: bool = False,
+    prepare: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Apply partial updates `{"id": ..., <field>: <value>, ...}` to `model` rows.
+
+    The targeted rows are loaded with one SELECT, each change is validated
+    against the merged row, and the valid changes are written with a single
+    executemany UPDATE and one commit. Results mirror `bulk_create`.
+    """
+    _check_size(items)
+    results: List[Dict[str, Any]] = []
+    changes: List[Dict[str, Any]] = []
+
+    ids = {item["id"] for item in items if isinstance(item, dict) and isinstance(item.get("id"), int)}
+    existing = {
+        row.id: row.model_dump()
+        for row in session.exec(select(model).where(model.id.in_(ids))).all()
+    } if ids else {}
+
+    seen = set()
+    for index, item in enumerate(items):
+        change = None
+        if not isinstance(item, dict):
+            errors = [_error([], "Item must be an object", "dict_type")]
+        elif not isinstance(item.get("id"), int):
+            errors = [_error(["id"], "An integer id is required", "missing")]
+        elif item["id"] in seen:
+            errors = [_error(["id"], "Id appears more than once in the batch", "duplicate")]
+        elif item["id"] not in existing:
+            errors = [_error(["id"], "Not found", "not_found")]
+        else:
+            seen.add(item["id"])
+            values = {key: value for key, value in item.items() if key != "id"}
+            errors = _unknown_fields(values, fields)
+            if not errors:
+                try:
+                    merged = model.model_validate({**existing[item["id"]], **values})
+                    # Write every batch field so all rows share one UPDATE statement
+                    change = {"id": item["id"], **{key: getattr(merged, key) for key in fields}}
+                    if prepare:
+                        prepare(change)
+                except ValidationError as exc:
+                    errors = _validation_errors(exc)
+
+        if errors:
+            results.append({"index": index, "status": "error", "errors": errors})
+        else:
+            results.append({"index": index, "status": "updated", "id": item["id"]})
+            changes.append(change)
+
+    if atomic and len(changes) < len(results):
+        return _summary(results, atomic)
+
+    if changes:
+        session.execute(update(model), changes)
+        session.commit()
+
+    return _summary(results, atomic)
@@ -0,0 +1,76 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .models import Source
+from .middleware.compression import PrecompressedPayload
+
+# File-based registry of data sources; the DB table mirrors it
+SOURCES_REGISTRY = Path(
+    os.getenv("SOURCES_REGISTRY", Path(__file__).resolve().parent.parent / "data" / "sources.json")
+)
+
+class SourceCatalog:
+    """
+    Registry of data sources loaded once from disk.
+
+    The parsed entries are kept as an immutable tuple and the HTTP response
+    body is encoded and compressed once, so every route serving the catalog
+    shares the same bytes.
+    """
+
+    def __init__(self, path: Path = SOURCES_REGISTRY):
+        self.path = path
+        self._sources: Optional[Tuple[Dict[str, str], ...]] = None
+        self._payload: Optional[PrecompressedPayload] = None
+
+    def load(self) -> None:
+        """(Re)load the registry from disk"""
+        with open(self.path, encoding="utf-8") as f:
+            entries = json.load(f)
+
+        sources = []
+        for entry in entries:
+            if not entry.get("id") or not entry.get("name") or not entry.get("url"):
+                raise ValueError(f"Invalid source entry in {self.path}: {entry!r}")
+            sources.append({"id": entry["id"], "name": entry["name"], "url": entry["url"]})
+
+        self._sources = tuple(sources)
+        self._payload = PrecompressedPayload.from_json(sources)
+
+    @property
+    def sources(self) -> Tuple[Dict[str, str], ...]:
+        if self._sources is None:
+            self.load()
+        return self._sources
+
+    @property
+    def payload(self) -> PrecompressedPayload:
+        if self._payload is None:
+            self.load()
+        return self._payload
+
+    def get(self, source_id: str) -> Optional[Dict[str, str]]:
+        for source in self.sources:
+            if source["id"] == source_id:
+                return source
+        return None
+
+    def sync(self, session: Session) -> None:
+        """Mirror the registry into the Source table (insert new, update changed)"""
+        existing = {source.id: source for source in session.exec(select(Source)).all()}
+        for entry in self.sources:
+            row = existing.get(entry["id"])
+            if row is None:
+                session.add(Source(**entry))
+            elif row.name != entry["name"] or row.url != entry["url"]:
+                row.name = entry["name"]
+                row.url = entry["url"]
+                session.add(row)
+        session.commit()
+
+# Global catalog instance
+source_catalog = SourceCatalog()
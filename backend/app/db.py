@@ -1,24 +1,197 @@
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime
+from sqlalchemy import event, inspect, text, update
 from sqlmodel import SQLModel, create_engine, Session, select
-from .models import EconomicReport, User, Dataset, Dashboard, Profile, Topic, ProfileTopic
-from passlib.context import CryptContext
+from .models import (
+    EconomicReport, User, Dataset, Dashboard, Profile, Topic, ProfileTopic, Observation, ObservationRollup,
+    RelatedContent,
+)
+from .catalog import source_catalog
+from .deadlines import DeadlineExceeded, check_deadline, current_deadline, sqlite_progress_handler
+from .hashing import hash_password
+from .metrics import DB_QUERY_DURATION, current_request_stats
+from .projections import make_excerpt
+from .rollups import rebuild_rollups
+
+logger = logging.getLogger(__name__)
 
 # Database URL - in production, use environment variable
 DATABASE_URL = "sqlite:///./lt_econ_portal.db"
 
-# Create engine
-engine = create_engine(DATABASE_URL, echo=True)
+# Create engine (set SQL_ECHO=true to log every statement)
+engine = create_engine(DATABASE_URL, echo=os.getenv("SQL_ECHO", "false").lower() == "true")
+
+# SQLite calls the deadline check every this many VM instructions
+_PROGRESS_INTERVAL = 10000
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    # Lets a request's deadline interrupt its statements mid-scan, so a
+    # runaway query gives its connection back to the pool
+    dbapi_connection.set_progress_handler(sqlite_progress_handler, _PROGRESS_INTERVAL)
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    check_deadline()  # don't start statements for a request that is over
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    
+    # Attribute the statement to the HTTP request being served, if any
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(context):
+    if not isinstance(context.original_exception, sqlite3.Error):
+        return None
+    if context.statement is not None:
+        # after_cursor_execute never runs for a failed statement
+        context.connection.info["query_start_time"].pop()
+    deadline = current_deadline.get()
+    reason = deadline.reason() if deadline is not None else None
+    if reason is not None and isinstance(context.original_exception, sqlite3.OperationalError):
+        return DeadlineExceeded(reason)  # interrupted by the progress handler
+    return None
+
+def upgrade_schema():
+    """
+    Add nullable columns and indexes introduced since a table was created.
+    create_all() only creates missing tables, never alters existing ones.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+                    logger.info("Added column %s.%s", table.name, column.name)
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    logger.info("Created index %s", index.name)
+
+# Formats accepted for report dates stored before the column became a DATE
+LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d.%m.%Y", "%Y.%m.%d", "%Y-%m", "%Y")
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def _parse_legacy_date(value: str) -> date:
+    value = value.strip()
+    if len(value) > 10 and value[10] in "T ":
+        value = value[:10]  # ISO datetime
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized report date {value!r}")
+
+def normalize_report_dates():
+    """
+    Rewrite report dates that are not ISO YYYY-MM-DD, which is how SQLite
+    stores DATE values, so they load, sort and range-filter correctly.
+    """
+    with engine.begin() as conn:
+        rows = conn.execute(text(
+            "SELECT id, date FROM economicreport "
+            "WHERE date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+        )).all()
+        if not rows:
+            return
+        updates, invalid = [], []
+        for report_id, value in rows:
+            try:
+                updates.append({"id": report_id, "date": _parse_legacy_date(str(value)).isoformat()})
+            except ValueError:
+                invalid.append(report_id)
+        if invalid:
+            raise RuntimeError(f"Reports with unparseable dates, fix them before starting: {invalid[:20]}")
+        conn.execute(text("UPDATE economicreport SET date = :date WHERE id = :id"), updates)
+        logger.info("Normalized %d report date(s)", len(updates))
+
+def backfill_report_excerpts(batch_size: int = 1000):
+    """Fill in excerpts for reports stored before the column existed"""
+    with Session(engine) as session:
+        while True:
+            rows = session.exec(
+                select(EconomicReport.id, EconomicReport.content)
+                .where(EconomicReport.excerpt == None)  # noqa: E711
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return
+            session.execute(
+                update(EconomicReport),
+                [{"id": report_id, "excerpt": make_excerpt(content)} for report_id, content in rows],
+            )
+            session.commit()
+
+def drop_legacy_rollups():
+    """
+    Drop a rollup table that stores raw sorted values instead of sketches;
+    create_all() recreates it and backfill_rollups() refills it.
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table(ObservationRollup.__tablename__):
+        return
+    if "sorted_values" in {column["name"] for column in inspector.get_columns(ObservationRollup.__tablename__)}:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE {ObservationRollup.__tablename__}"))
+        logger.info("Dropped legacy observation rollups; they are rebuilt as sketches")
+
+def backfill_rollups():
+    """Build the observation rollup cube for databases that have observations but no rollups yet"""
+    with Session(engine) as session:
+        if session.exec(select(ObservationRollup.year).limit(1)).first() is not None:
+            return
+        if session.exec(select(Observation.series_id).limit(1)).first() is None:
+            return
+        cells = rebuild_rollups(session)
+        logger.info("Built %d observation rollup cell(s)", cells)
+
+def backfill_related():
+    """Compute related-content neighbours for databases that have content but none stored yet"""
+    from .related import update_related
+
+    with Session(engine) as session:
+        if session.exec(select(RelatedContent.content_id).limit(1)).first() is not None:
+            return
+        if session.exec(select(EconomicReport.id).limit(1)).first() is None:
+            return
+        result = update_related(session)
+        logger.info("Stored %d related-content neighbour(s)", result["neighbours"])
 
 def init_db():
     """Initialize database with tables and sample data"""
+    drop_legacy_rollups()
     SQLModel.metadata.create_all(engine)
+    upgrade_schema()
+    normalize_report_dates()
+    backfill_report_excerpts()
+    backfill_rollups()
+    backfill_related()
     
     with Session(engine) as session:
+        # Keep the Source table in step with the registry on every start
+        source_catalog.sync(session)
+        
         # Check if we already have data
         if session.exec(select(User)).first():
-            print("Database already initialized, skipping data creation")
+            logger.info("Database already initialized, skipping data creation")
             return  # Database already initialized
         
         # Create sample topics
@@ -97,14 +270,14 @@ def init_db():
             ),
         ]
         
+        # Fetch existing slugs once rather than querying per topic
+        existing_slugs = set(session.exec(select(Topic.slug)).all())
         for topic in topics:
-            # Check if topic already exists
-            existing = session.exec(select(Topic).where(Topic.slug == topic.slug)).first()
-            if not existing:
+            if topic.slug not in existing_slugs:
                 session.add(topic)
-                print(f"Added topic: {topic.slug}")
+                logger.info("Added topic: %s", topic.slug)
             else:
-                print(f"Topic already exists: {topic.slug}")
+                logger.info("Topic already exists: %s", topic.slug)
         
         # Create sample dashboards with tags
         import json
@@ -149,16 +322,17 @@ def init_db():
             EconomicReport(
                 title="Q3 2024 Economic Outlook",
                 content="Analysis of current economic trends and future projections...",
-                date="2024-10-15"
+                date=date(2024, 10, 15)
             ),
             EconomicReport(
                 title="Labor Market Recovery Report",
                 content="Comprehensive analysis of employment trends post-pandemic...",
-                date="2024-09-20"
+                date=date(2024, 9, 20)
             ),
         ]
         
         for report in reports:
+            report.excerpt = make_excerpt(report.content)
             session.add(report)
         
         # Create sample datasets
@@ -180,9 +354,9 @@ def init_db():
         
         try:
             session.commit()
-            print("Database initialization completed successfully")
-        except Exception as e:
-            print(f"Error during database initialization: {e}")
+            logger.info("Database initialization completed successfully")
+        except Exception:
+            logger.exception("Error during database initialization")
             session.rollback()
             raise
 
@@ -190,11 +364,3 @@ def get_session():
     """Get database session"""
     with Session(engine) as session:
         yield session
-
-def hash_password(password: str) -> str:
-    """Hash a password"""
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password) 
\ No newline at end of file
@@ -0,0 +1,89 @@
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from starlette.types import Scope
+
+# Seconds a request may run before its database statements are interrupted;
+# routes with heavier work declare their own with @request_timeout
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "10"))
+
+class DeadlineExceeded(Exception):
+    """Raised into a handler whose deadline passed or whose client disconnected"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request deadline exceeded ({reason})")
+        self.reason = reason
+
+def request_timeout(seconds: float) -> Callable:
+    """
+    Declare how long an endpoint may run, counted from when the request
+    reached DeadlineMiddleware.
+
+    Usage:
+        @router.get("/reports")
+        @query_budget(1)
+        @request_timeout(5)
+        def list_reports(...): ...
+    """
+    def decorator(func: Callable) -> Callable:
+        func.__request_timeout__ = seconds
+        return func
+    return decorator
+
+class Deadline:
+    """
+    Deadline of one request. The timeout comes from the matched endpoint,
+    which is only known after routing, so it is resolved on first use.
+    """
+
+    __slots__ = ("scope", "started", "disconnected", "_expires_at")
+
+    def __init__(self, scope: Scope):
+        self.scope = scope
+        self.started = time.monotonic()
+        self.disconnected = False
+        self._expires_at: Optional[float] = None
+
+    @property
+    def expires_at(self) -> float:
+        if self._expires_at is None:
+            endpoint = getattr(self.scope.get("route"), "endpoint", None)
+            if endpoint is None:
+                return self.started + REQUEST_TIMEOUT_SECONDS  # not routed yet
+            timeout = getattr(endpoint, "__request_timeout__", REQUEST_TIMEOUT_SECONDS)
+            self._expires_at = self.started + timeout
+        return self._expires_at
+
+    @property
+    def timed_out(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def reason(self) -> Optional[str]:
+        """Why the request should stop: "disconnect", "timeout", or None"""
+        if self.disconnected:
+            return "disconnect"
+        if self.timed_out:
+            return "timeout"
+        return None
+
+# Set by DeadlineMiddleware for the duration of each HTTP request; copied
+# into the threadpool with the rest of the context, so sync handlers see it
+current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+
+def check_deadline() -> None:
+    """Raise DeadlineExceeded if the current request should stop"""
+    deadline = current_deadline.get()
+    if deadline is not None:
+        reason = deadline.reason()
+        if reason is not None:
+            raise DeadlineExceeded(reason)
+
+def sqlite_progress_handler() -> int:
+    """
+    Called by SQLite every few thousand VM instructions; a non-zero return
+    aborts the running statement with "interrupted".
+    """
+    deadline = current_deadline.get()
+    return int(deadline is not None and deadline.reason() is not None)
@@ -0,0 +1,254 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from .db import engine
+from .models import (
+    Dashboard, DigestFrequency, EconomicReport, Language, Profile, ProfileTopic, ReportTopic, Topic, User,
+    decode_tags,
+)
+
+logger = logging.getLogger(__name__)
+
+# Local stand-in for an SMTP relay
+OUTBOX_DIR = Path(os.getenv("OUTBOX_DIR", "./outbox"))
+DIGEST_SENDER = os.getenv("DIGEST_SENDER", "digest@lt-econ-portal.local")
+SUBSCRIBER_CHUNK_SIZE = 1000
+MAX_REPORTS_PER_DIGEST = 20
+
+PERIODS = {
+    DigestFrequency.DAILY: timedelta(days=1),
+    DigestFrequency.WEEKLY: timedelta(days=7),
+    DigestFrequency.MONTHLY: timedelta(days=30),
+}
+
+SUBJECTS = {
+    Language.LT: {
+        DigestFrequency.DAILY: "Dienos ekonomikos apžvalga",
+        DigestFrequency.WEEKLY: "Savaitės ekonomikos apžvalga",
+        DigestFrequency.MONTHLY: "Mėnesio ekonomikos apžvalga",
+    },
+    Language.EN: {
+        DigestFrequency.DAILY: "Your daily economics digest",
+        DigestFrequency.WEEKLY: "Your weekly economics digest",
+        DigestFrequency.MONTHLY: "Your monthly economics digest",
+    },
+}
+
+HEADINGS = {
+    Language.LT: {"topics": "Jūsų temos", "reports": "Naujos ataskaitos", "dashboards": "Rekomenduojami skydeliai",
+                  "none": "Šiuo laikotarpiu naujų ataskaitų nėra."},
+    Language.EN: {"topics": "Your topics", "reports": "New reports", "dashboards": "Recommended dashboards",
+                  "none": "No new reports in this period."},
+}
+
+# Subscribers receive the same digest iff they share frequency, language and topic set
+DigestKey = Tuple[DigestFrequency, Language, FrozenSet[str]]
+
+class Subscriber:
+    __slots__ = ("profile_id", "email", "language", "topics")
+
+    def __init__(self, profile_id: int, email: str, language: Language, topics: FrozenSet[str]):
+        self.profile_id = profile_id
+        self.email = email
+        self.language = language
+        self.topics = topics
+
+def iter_subscribers(
+    session: Session,
+    frequency: DigestFrequency,
+    chunk_size: int = SUBSCRIBER_CHUNK_SIZE,
+) -> Iterator[Subscriber]:
+    """
+    Stream newsletter subscribers for a frequency in keyset-paginated chunks.
+
+    Each chunk costs two queries (profiles + their topics), so memory stays
+    bounded and the query count grows with subscribers / chunk_size.
+    """
+    last_id = 0
+    while True:
+        rows = session.exec(
+            select(Profile.id, Profile.language, User.email)
+            .join(User, User.id == Profile.user_id)
+            .where(
+                Profile.newsletter == True,  # noqa: E712
+                Profile.digest_frequency == frequency,
+                Profile.id > last_id,
+            )
+            .order_by(Profile.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return
+
+        profile_ids = [row[0] for row in rows]
+        topics: Dict[int, set] = {}
+        for profile_id, slug in session.exec(
+            select(ProfileTopic.profile_id, ProfileTopic.topic_slug)
+            .where(ProfileTopic.profile_id.in_(profile_ids))
+        ).all():
+            topics.setdefault(profile_id, set()).add(slug)
+
+        for profile_id, language, email in rows:
+            yield Subscriber(profile_id, email, language, frozenset(topics.get(profile_id, ())))
+
+        last_id = profile_ids[-1]
+
+def digest_id(key: DigestKey, since: datetime) -> str:
+    """Stable identifier for a rendered digest"""
+    frequency, language, topics = key
+    raw = f"{frequency.value}|{language.value}|{','.join(sorted(topics))}|{since.date().isoformat()}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+class DigestRenderer:
+    """
+    Renders digests from content loaded once per run.
+
+    Rendering depends only on the DigestKey, so each distinct key is
+    rendered once however many subscribers share it.
+    """
+
+    def __init__(self, session: Session, frequency: DigestFrequency, now: Optional[datetime] = None):
+        self.frequency = frequency
+        self.now = now or datetime.utcnow()
+        self.since = self.now - PERIODS[frequency]
+
+        self.topics = {topic.slug: topic for topic in session.exec(select(Topic)).all()}
+        # Every report of the period, newest first, with its topic slugs;
+        # each digest keeps those matching its topics, up to MAX_REPORTS_PER_DIGEST
+        recent = select(EconomicReport.id).where(EconomicReport.date >= self.since.date())
+        report_topics: Dict[int, set] = {}
+        for report_id, slug in session.exec(
+            select(ReportTopic.report_id, ReportTopic.topic_slug).where(ReportTopic.report_id.in_(recent))
+        ).all():
+            report_topics.setdefault(report_id, set()).add(slug)
+        self.reports = [
+            (report_id, title, date, frozenset(report_topics.get(report_id, ())))
+            for report_id, title, date in session.exec(
+                select(EconomicReport.id, EconomicReport.title, EconomicReport.date)
+                .where(EconomicReport.date >= self.since.date())
+                .order_by(EconomicReport.date.desc())
+            ).all()
+        ]
+        self.dashboards = [
+            (dashboard.id, dashboard.title, set(decode_tags(dashboard.tags)))
+            for dashboard in session.exec(select(Dashboard)).all()
+        ]
+
+    def render(self, key: DigestKey) -> EmailMessage:
+        _, language, topics = key
+        headings = HEADINGS[language]
+
+        topic_names = sorted(
+            (self.topics[slug].name_lt if language == Language.LT else self.topics[slug].name_en)
+            for slug in topics if slug in self.topics
+        )
+        # No topics chosen means all reports
+        reports = [
+            (title, date) for _, title, date, report_topics in self.reports
+            if not topics or report_topics & topics
+        ][:MAX_REPORTS_PER_DIGEST]
+        dashboards = [title for _, title, tags in self.dashboards if tags & topics]
+
+        lines = []
+        if topic_names:
+            lines += [f"{headings['topics']}: {', '.join(topic_names)}", ""]
+
+        lines.append(f"{headings['reports']}:")
+        if reports:
+            lines += [f"  - {title} ({date})" for title, date in reports]
+        else:
+            lines.append(f"  {headings['none']}")
+
+        if dashboards:
+            lines += ["", f"{headings['dashboards']}:"]
+            lines += [f"  - {title}" for title in dashboards]
+
+        message = EmailMessage()
+        message["From"] = DIGEST_SENDER
+        message["Subject"] = SUBJECTS[language][self.frequency]
+        message.set_content("\n".join(lines) + "\n")
+        return message
+
+class Outbox:
+    """
+    File-based outbox standing in for SMTP.
+
+    Each distinct digest is written once as an .eml file. Every recipient gets
+    one line in deliveries.jsonl pointing at the digest they should receive.
+    """
+
+    def __init__(self, root: Path = OUTBOX_DIR, run_name: Optional[str] = None):
+        self.path = root / (run_name or datetime.utcnow().strftime("%Y%m%dT%H%M%S"))
+        (self.path / "digests").mkdir(parents=True, exist_ok=True)
+        self._deliveries = open(self.path / "deliveries.jsonl", "a", encoding="utf-8")
+
+    def write_digest(self, digest: str, message: EmailMessage) -> None:
+        (self.path / "digests" / f"{digest}.eml").write_bytes(message.as_bytes())
+
+    def deliver(self, email: str, digest: str) -> None:
+        self._deliveries.write(json.dumps({"to": email, "digest": digest}) + "\n")
+
+    def close(self) -> None:
+        self._deliveries.close()
+
+def build_digests(
+    frequency: DigestFrequency,
+    outbox: Optional[Outbox] = None,
+    now: Optional[datetime] = None,
+    chunk_size: int = SUBSCRIBER_CHUNK_SIZE,
+) -> Dict[str, float]:
+    """Render and fan out all digests for one frequency"""
+    if frequency not in PERIODS:
+        raise ValueError(f"No digest period for frequency {frequency.value!r}")
+
+    started = time.perf_counter()
+    outbox = outbox or Outbox(run_name=f"{frequency.value}-{datetime.utcnow():%Y%m%dT%H%M%S}")
+    rendered: Dict[DigestKey, str] = {}
+    subscribers = 0
+
+    try:
+        with Session(engine) as session:
+            renderer = DigestRenderer(session, frequency, now)
+            for subscriber in iter_subscribers(session, frequency, chunk_size):
+                key = (frequency, subscriber.language, subscriber.topics)
+                digest = rendered.get(key)
+                if digest is None:
+                    digest = digest_id(key, renderer.since)
+                    outbox.write_digest(digest, renderer.render(key))
+                    rendered[key] = digest
+                outbox.deliver(subscriber.email, digest)
+                subscribers += 1
+    finally:
+        outbox.close()
+
+    stats = {
+        "frequency": frequency.value,
+        "subscribers": subscribers,
+        "distinct_digests": len(rendered),
+        "seconds": round(time.perf_counter() - started, 3),
+        "outbox": str(outbox.path),
+    }
+    logger.info("Digest run complete: %s", stats)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Build newsletter digests into the local outbox")
+    parser.add_argument("frequency", choices=[f.value for f in PERIODS])
+    parser.add_argument("--chunk-size", type=int, default=SUBSCRIBER_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").strip().upper())
+    print(json.dumps(build_digests(DigestFrequency(args.frequency), chunk_size=args.chunk_size)))
+
+if __name__ == "__main__":
+    main()
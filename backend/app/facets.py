@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import extract
+from sqlmodel import Session, select
+
+from .db import engine
+from .metrics import record_cache
+from .models import EconomicReport, ReportSource, ReportTopic
+
+# Other worker processes write reports too; rebuild at least this often (seconds)
+FACET_INDEX_TTL = float(os.getenv("FACET_INDEX_TTL", "300"))
+
+def bitmap(ids: Iterable[int]) -> int:
+    """Bitmap (as a Python int) with bit `id` set for every id"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buf = bytearray(max(ids) // 8 + 1)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+class FacetIndex:
+    """
+    In-memory bitmap index of reports by topic, source and year.
+
+    Each facet value maps to a bitmap of report ids, so the count for any
+    value under any filter is a single AND plus a popcount, and all facet
+    counts come out of one pass over the values instead of one COUNT query
+    per value.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.all = 0
+        self.topics: Dict[str, int] = {}
+        self.sources: Dict[str, int] = {}
+        self.years: Dict[int, int] = {}
+        self.built_at: Optional[float] = None
+
+    def build(self, session: Session) -> None:
+        """Load the whole index with three queries"""
+        reports = session.execute(
+            select(EconomicReport.id, extract("year", EconomicReport.date))
+        ).all()
+        topics = session.execute(select(ReportTopic.topic_slug, ReportTopic.report_id)).all()
+        sources = session.execute(select(ReportSource.source_id, ReportSource.report_id)).all()
+
+        years: Dict[int, List[int]] = {}
+        for report_id, year in reports:
+            years.setdefault(int(year), []).append(report_id)
+        by_topic: Dict[str, List[int]] = {}
+        for slug, report_id in topics:
+            by_topic.setdefault(slug, []).append(report_id)
+        by_source: Dict[str, List[int]] = {}
+        for source_id, report_id in sources:
+            by_source.setdefault(source_id, []).append(report_id)
+
+        with self._lock:
+            self.all = bitmap(report_id for report_id, _ in reports)
+            self.years = {year: bitmap(ids) for year, ids in years.items()}
+            self.topics = {slug: bitmap(ids) for slug, ids in by_topic.items()}
+            self.sources = {source_id: bitmap(ids) for source_id, ids in by_source.items()}
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self) -> None:
+        if self.built_at is None or time.monotonic() - self.built_at > FACET_INDEX_TTL:
+            record_cache("facets", hit=False)
+            with Session(engine) as session:
+                self.build(session)
+        else:
+            record_cache("facets", hit=True)
+
+    def add(self, report_id: int, year: int, topics: Sequence[str], sources: Sequence[str]) -> None:
+        """Index a created or updated report (call `remove` first on update)"""
+        if self.built_at is None:
+            return
+        bit = 1 << report_id
+        with self._lock:
+            self.all |= bit
+            self.years[year] = self.years.get(year, 0) | bit
+            for slug in topics:
+                self.topics[slug] = self.topics.get(slug, 0) | bit
+            for source_id in sources:
+                self.sources[source_id] = self.sources.get(source_id, 0) | bit
+
+    def remove(self, report_id: int) -> None:
+        if self.built_at is None:
+            return
+        mask = ~(1 << report_id)
+        with self._lock:
+            self.all &= mask
+            for index in (self.years, self.topics, self.sources):
+                for key in index:
+                    index[key] &= mask
+
+    def invalidate(self) -> None:
+        self.built_at = None
+
+    @staticmethod
+    def _any_of(index: Dict, values: Sequence) -> Optional[int]:
+        # OR of the selected values; None means "not filtered on this facet"
+        if not values:
+            return None
+        result = 0
+        for value in values:
+            result |= index.get(value, 0)
+        return result
+
+    def counts(
+        self,
+        base: Optional[int] = None,
+        topics: Sequence[str] = (),
+        sources: Sequence[str] = (),
+        years: Sequence[int] = (),
+    ) -> Dict:
+        """
+        Facet counts for reports matching `base` (a bitmap from other filters)
+        and the selected facet values.
+
+        Values within a facet are ORed and facets are ANDed. Each facet's
+        counts ignore that facet's own selection, so picking one topic still
+        shows how many reports the other topics would add.
+        """
+        with self._lock:
+            universe = self.all if base is None else self.all & base
+            selected = {
+                "topics": self._any_of(self.topics, topics),
+                "sources": self._any_of(self.sources, sources),
+                "years": self._any_of(self.years, years),
+            }
+
+            def restrict(excluding: Optional[str]) -> int:
+                result = universe
+                for name, mask in selected.items():
+                    if name != excluding and mask is not None:
+                        result &= mask
+                return result
+
+            def facet(name: str, index: Dict, chosen: Sequence) -> List[Dict]:
+                scope = restrict(name)
+                values = []
+                for value, mask in index.items():
+                    count = (mask & scope).bit_count()
+                    if count or value in chosen:
+                        values.append({"value": value, "count": count, "selected": value in chosen})
+                return values
+
+            topic_counts = facet("topics", self.topics, topics)
+            source_counts = facet("sources", self.sources, sources)
+            year_counts = facet("years", self.years, years)
+            total = restrict(None).bit_count()
+
+        topic_counts.sort(key=lambda item: (-item["count"], item["value"]))
+        source_counts.sort(key=lambda item: (-item["count"], item["value"]))
+        year_counts.sort(key=lambda item: item["value"], reverse=True)
+        return {"total": total, "topics": topic_counts, "sources": source_counts, "years": year_counts}
+
+# Global facet index, shared by the report routes
+facet_index = FacetIndex()
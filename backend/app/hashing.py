@@ -0,0 +1,70 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from .metrics import BCRYPT_ROUNDS, PASSWORD_HASH_DURATION
+
+logger = logging.getLogger(__name__)
+
+# bcrypt cost. Set BCRYPT_ROUNDS to pin it (e.g. to the value printed by
+# `python -m app.hashing` at deploy time); otherwise it is calibrated at
+# startup to the highest cost whose hash time stays under the target.
+BCRYPT_TARGET_MS = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+BCRYPT_MIN_ROUNDS = int(os.getenv("BCRYPT_MIN_ROUNDS", "10"))
+BCRYPT_MAX_ROUNDS = int(os.getenv("BCRYPT_MAX_ROUNDS", "15"))
+
+# Cost used for the timing samples; each extra round doubles the work
+_SAMPLE_ROUNDS = 8
+_SAMPLES = 3
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def calibrate_rounds(target_ms: float = BCRYPT_TARGET_MS) -> int:
+    """Highest bcrypt cost, within the configured bounds, that hashes in about `target_ms` here"""
+    sampler = CryptContext(schemes=["bcrypt"], bcrypt__rounds=_SAMPLE_ROUNDS)
+    timings = []
+    for _ in range(_SAMPLES):
+        start = time.perf_counter()
+        sampler.hash("calibration")
+        timings.append(time.perf_counter() - start)
+    sample_ms = min(timings) * 1000
+
+    rounds = _SAMPLE_ROUNDS
+    while rounds < BCRYPT_MAX_ROUNDS and sample_ms * 2 ** (rounds + 1 - _SAMPLE_ROUNDS) <= target_ms:
+        rounds += 1
+    return max(BCRYPT_MIN_ROUNDS, rounds)
+
+def configure_rounds(rounds: Optional[int] = None) -> int:
+    """
+    Set the cost for new hashes: BCRYPT_ROUNDS if given, else calibrated.
+    Stored hashes below it report `needs_update`, so logins upgrade them;
+    stronger hashes are left alone, so workers calibrating a round apart
+    do not rehash back and forth.
+    """
+    if rounds is None:
+        pinned = os.getenv("BCRYPT_ROUNDS")
+        rounds = int(pinned) if pinned else calibrate_rounds()
+    pwd_context.update(bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds)
+    BCRYPT_ROUNDS.set(rounds)
+    logger.info("bcrypt cost set to %d rounds", rounds)
+    return rounds
+
+def hash_password(password: str) -> str:
+    """Hash a password"""
+    with PASSWORD_HASH_DURATION.time("hash"):
+        return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    with PASSWORD_HASH_DURATION.time("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True if a hash was made with a weaker cost (or scheme) than new hashes use"""
+    return pwd_context.needs_update(hashed_password)
+
+if __name__ == "__main__":
+    print(f"BCRYPT_ROUNDS={calibrate_rounds()}")
@@ -0,0 +1,314 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import insert, literal, or_, update
+from sqlmodel import Session, select
+
+from .db import engine
+from .metrics import JOB_DURATION, JOBS_PROCESSED, JOBS_RUNNING
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JOBS_ENABLED = os.getenv("JOBS_ENABLED", "true").lower() == "true"
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# "thread" runs handlers on the worker threads; "process" hands them to a
+# process pool so CPU-heavy work does not compete with requests for the GIL
+JOB_WORKER_MODE = os.getenv("JOB_WORKER_MODE", "thread").lower()
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# Jobs left "running" longer than this (e.g. after a crash) are requeued
+JOB_STALE_AFTER = timedelta(seconds=int(os.getenv("JOB_STALE_AFTER", "3600")))
+RETRY_BASE_DELAY = 5.0  # seconds; doubles with each attempt
+
+# Priorities
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+_handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+# Handlers that touch in-process state (e.g. caches) and so never run in a child process
+_in_process_handlers = set()
+
+def job_handler(job_type: str, in_process: bool = False) -> Callable:
+    """Register a function as the handler for a job type"""
+    def decorator(func: Callable[[Dict[str, Any]], Any]) -> Callable:
+        _handlers[job_type] = func
+        if in_process:
+            _in_process_handlers.add(job_type)
+        return func
+    return decorator
+
+def _load_handlers() -> None:
+    # Handlers live in app.tasks; importing it fills the registry
+    from . import tasks  # noqa: F401
+
+def run_handler(job_type: str, payload: Dict[str, Any]) -> Any:
+    """Run a registered handler (also the entry point in process mode)"""
+    _load_handlers()
+    handler = _handlers.get(job_type)
+    if handler is None:
+        raise LookupError(f"No handler registered for job type {job_type!r}")
+    return handler(payload)
+
+def enqueue(
+    job_type: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = PRIORITY_NORMAL,
+    delay: float = 0,
+    max_attempts: int = 3,
+    dedupe_key: Optional[str] = None,
+    session: Optional[Session] = None,
+    user_id: Optional[int] = None,
+) -> Job:
+    """
+    Add a job to the persistent queue and return it. `user_id` records who
+    queued it; only they and admins can read its status.
+
+    If `dedupe_key` is given and a queued or running job already has that
+    key, the existing job is returned instead of adding a duplicate.
+    """
+    def _enqueue(session: Session) -> Job:
+        if dedupe_key is not None:
+            existing = session.exec(
+                select(Job).where(
+                    Job.dedupe_key == dedupe_key,
+                    Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+                )
+            ).first()
+            if existing:
+                return existing
+
+        job = Job(
+            type=job_type,
+            payload=json.dumps(payload or {}),
+            priority=priority,
+            max_attempts=max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay),
+            dedupe_key=dedupe_key,
+            user_id=user_id,
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+    if session is not None:
+        return _enqueue(session)
+    with Session(engine) as session:
+        return _enqueue(session)
+
+def claim_next_job() -> Optional[Job]:
+    """
+    Atomically move the highest-priority due job from queued to running.
+
+    A single UPDATE ... RETURNING, so concurrent workers never claim the
+    same job.
+    """
+    now = datetime.utcnow()
+    next_id = (
+        select(Job.id)
+        .where(Job.status == JobStatus.QUEUED, Job.run_at <= now)
+        .order_by(Job.priority.desc(), Job.run_at, Job.id)
+        .limit(1)
+        .scalar_subquery()
+    )
+    with Session(engine) as session:
+        row = session.execute(
+            update(Job)
+            .where(Job.id == next_id, Job.status == JobStatus.QUEUED)
+            .values(status=JobStatus.RUNNING, started_at=now, attempts=Job.attempts + 1)
+            .returning(Job.id)
+        ).first()
+        session.commit()
+        if row is None:
+            return None
+        return session.get(Job, row[0])
+
+def _finish(job_id: int, result: Any = None, error: Optional[str] = None) -> None:
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        job.finished_at = datetime.utcnow()
+        if error is None:
+            job.status = JobStatus.SUCCEEDED
+            job.result = json.dumps(result, default=str)
+            job.error = None
+        elif job.attempts < job.max_attempts:
+            # Retry with exponential backoff
+            job.status = JobStatus.QUEUED
+            job.run_at = datetime.utcnow() + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1))
+            job.error = error
+        else:
+            job.status = JobStatus.FAILED
+            job.error = error
+        session.add(job)
+        session.commit()
+
+def requeue_stale_jobs() -> int:
+    """Requeue jobs stuck in running, e.g. after a worker crash"""
+    cutoff = datetime.utcnow() - JOB_STALE_AFTER
+    with Session(engine) as session:
+        result = session.execute(
+            update(Job)
+            .where(Job.status == JobStatus.RUNNING, Job.started_at < cutoff)
+            .values(status=JobStatus.QUEUED, run_at=datetime.utcnow())
+        )
+        session.commit()
+        return result.rowcount
+
+class Schedule:
+    """A job type enqueued every `interval`"""
+
+    def __init__(self, name: str, job_type: str, interval: timedelta,
+                 payload: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_LOW):
+        self.name = name
+        self.job_type = job_type
+        self.interval = interval
+        self.payload = payload or {}
+        self.priority = priority
+
+    @property
+    def dedupe_key(self) -> str:
+        return f"schedule:{self.name}"
+
+_schedules: List[Schedule] = []
+
+def schedule(name: str, job_type: str, interval: timedelta,
+             payload: Optional[Dict[str, Any]] = None, priority: int = PRIORITY_LOW) -> None:
+    """Register a periodic job"""
+    _schedules.append(Schedule(name, job_type, interval, payload, priority))
+
+def enqueue_due_schedules() -> None:
+    """
+    Enqueue every schedule whose last run is older than its interval.
+
+    The last run is read from the queue itself, so restarts do not cause
+    duplicate runs. The check and the insert are one INSERT ... SELECT ...
+    WHERE NOT EXISTS, so schedulers in several processes cannot both pass
+    the check and queue the same run twice.
+    """
+    now = datetime.utcnow()
+    columns = Job.__table__.c
+    with Session(engine) as session:
+        for entry in _schedules:
+            values = {
+                "type": entry.job_type,
+                "payload": json.dumps(entry.payload),
+                "priority": entry.priority,
+                "status": JobStatus.QUEUED,
+                "attempts": 0,
+                "max_attempts": 3,
+                "run_at": now,
+                "dedupe_key": entry.dedupe_key,
+                "created_at": now,
+            }
+            # Skip while the last run is recent or still queued or running
+            blocking = select(Job.id).where(
+                Job.dedupe_key == entry.dedupe_key,
+                or_(
+                    Job.created_at > now - entry.interval,
+                    Job.status.in_([JobStatus.QUEUED, JobStatus.RUNNING]),
+                ),
+            )
+            row = select(*(literal(value, columns[name].type) for name, value in values.items()))
+            session.execute(insert(Job).from_select(list(values), row.where(~blocking.exists())))
+        session.commit()
+
+class WorkerPool:
+    """
+    In-process job runner: `workers` threads poll the queue, plus one
+    scheduler thread for periodic jobs.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, mode: str = JOB_WORKER_MODE,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        _load_handlers()
+        self._stop.clear()
+        if self.mode == "process":
+            # Spawned, not forked: a forked child would inherit the engine's
+            # pooled SQLite connections and threads mid-use
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        requeued = requeue_stale_jobs()
+        if requeued:
+            logger.warning("Requeued %d stale job(s)", requeued)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        scheduler = threading.Thread(target=self._schedule, name="job-scheduler", daemon=True)
+        scheduler.start()
+        self._threads.append(scheduler)
+        logger.info("Started %d job worker(s) in %s mode", self.workers, self.mode)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+
+    def _execute(self, job: Job) -> Any:
+        payload = json.loads(job.payload or "{}")
+        if self._processes is not None and job.type not in _in_process_handlers:
+            return self._processes.submit(run_handler, job.type, payload).result()
+        return run_handler(job.type, payload)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job()
+            except Exception:
+                logger.exception("Failed to claim job")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            JOBS_RUNNING.inc()
+            started = time.perf_counter()
+            try:
+                result = self._execute(job)
+            except Exception as exc:
+                logger.warning("Job %s (%s) attempt %d failed: %s", job.id, job.type, job.attempts, exc)
+                # Only the exception type is stored: messages can quote fetched
+                # content or internal hosts, and job status is readable by users
+                _finish(job.id, error=type(exc).__name__)
+                JOBS_PROCESSED.inc(job.type, "error")
+            else:
+                _finish(job.id, result=result)
+                JOBS_PROCESSED.inc(job.type, "success")
+            finally:
+                JOBS_RUNNING.dec()
+                JOB_DURATION.observe(time.perf_counter() - started, job.type)
+
+    def _schedule(self) -> None:
+        while not self._stop.is_set():
+            try:
+                enqueue_due_schedules()
+            except Exception:
+                logger.exception("Failed to enqueue scheduled jobs")
+            self._stop.wait(30)
+
+# Global worker pool, started and stopped with the app
+worker_pool = WorkerPool()
@@ -1,11 +1,27 @@
+import logging
 import os
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
+from .auth import set_csrf_cookie
 from .db import init_db
-from .routes import reports, users, datasets, dashboards, profiles, auth
+from .deadlines import DeadlineExceeded
+from .hashing import configure_rounds
+from .middleware.admission import AdmissionControlMiddleware
+from .middleware.compression import CompressionMiddleware
+from .middleware.deadline import DeadlineMiddleware
+from .middleware.metrics import MetricsMiddleware
+from .middleware.profiling import ProfilingMiddleware
+from .query_budget import QueryBudgetMiddleware
+from .catalog import source_catalog
+from .jobs import JOBS_ENABLED, PRIORITY_HIGH, enqueue, worker_pool
+from .views import view_counter
+from .routes import reports, users, datasets, dashboards, profiles, auth, sources, metrics, jobs, series, aggregates, bootstrap, search, debug
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").strip().upper())
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="Lithuanian Economics Portal API",
@@ -26,6 +42,17 @@ if os.getenv("ENVIRONMENT") == "production":
     # HTTPS redirect middleware
     app.add_middleware(HTTPSRedirectMiddleware)
 
+# On-demand profiling of requests flagged by an admin (see app/profiling.py)
+app.add_middleware(ProfilingMiddleware)
+
+# Request deadlines: SQL of requests that run too long or whose client went
+# away is interrupted
+app.add_middleware(DeadlineMiddleware)
+
+# Load shedding: over the adaptive concurrency limit, answer 503 + Retry-After
+# at once (inside CORS, so browsers can read the 503)
+app.add_middleware(AdmissionControlMiddleware)
+
 # Add CORS middleware for frontend-backend integration
 allowed_origins = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000").split(",")
 app.add_middleware(
@@ -37,6 +64,9 @@ app.add_middleware(
     expose_headers=["Set-Cookie"],  # Allow frontend to see cookie headers
 )
 
+# Response compression (br/zstd/gzip, negotiated per request)
+app.add_middleware(CompressionMiddleware)
+
 # Security headers middleware
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
@@ -68,10 +98,28 @@ async def add_security_headers(request: Request, call_next):
     
     return response
 
+# Per-request query budgets (needs the stats installed by MetricsMiddleware)
+app.add_middleware(QueryBudgetMiddleware)
+
+# Request metrics - added last so it wraps every other middleware
+app.add_middleware(MetricsMiddleware)
+
 @app.on_event("startup")
 def on_startup():
-    """Initialize database on startup"""
+    """Initialize database and static catalogs on startup"""
+    source_catalog.load()
+    configure_rounds()
     init_db()
+    view_counter.start()
+    if JOBS_ENABLED:
+        worker_pool.start()
+        enqueue("warm_caches", priority=PRIORITY_HIGH, dedupe_key="schedule:warm-caches")
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """Stop background job workers and write buffered view counts"""
+    worker_pool.stop()
+    view_counter.stop()
 
 # Include routers
 app.include_router(reports.router)
@@ -80,6 +128,14 @@ app.include_router(datasets.router)
 app.include_router(dashboards.router)
 app.include_router(profiles.router)
 app.include_router(auth.router)
+app.include_router(sources.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+app.include_router(series.router)
+app.include_router(aggregates.router)
+app.include_router(bootstrap.router)
+app.include_router(search.router)
+app.include_router(debug.router)
 
 @app.get("/")
 def read_root():
@@ -95,42 +151,6 @@ def test_endpoint():
     """Health check endpoint"""
     return {"status": "ok", "message": "Backend is accessible"}
 
-@app.get("/sources")
-def get_sources():
-    """Return available data sources for reports"""
-    return [
-        {
-            "id": "LB",
-            "name": "Bank of Lithuania",
-            "url": "https://www.lb.lt/en/statistics"
-        },
-        {
-            "id": "StataLT",
-            "name": "Statistics Lithuania",
-            "url": "https://osp.stat.gov.lt/en"
-        },
-        {
-            "id": "Eurostat",
-            "name": "European Statistics",
-            "url": "https://ec.europa.eu/eurostat"
-        },
-        {
-            "id": "OECD",
-            "name": "Organisation for Economic Co-operation and Development",
-            "url": "https://data.oecd.org"
-        },
-        {
-            "id": "IMF",
-            "name": "International Monetary Fund",
-            "url": "https://data.imf.org"
-        },
-        {
-            "id": "WorldBank",
-            "name": "World Bank",
-            "url": "https://data.worldbank.org"
-        }
-    ]
-
 @app.get("/api/auth/me")
 def get_current_user(request: Request):
     """Return current user information from JWT token"""
@@ -182,8 +202,8 @@ def get_current_user(request: Request):
             status_code=401,
             content={"error": "Invalid token"}
         )
-    except Exception as e:
-        print(f"Error in /api/auth/me: {e}")
+    except Exception:
+        logger.exception("Error in /api/auth/me")
         return JSONResponse(
             status_code=500,
             content={"error": "Internal server error"}
@@ -216,10 +236,9 @@ def update_profile():
     return {"message": "Profile updated successfully"}
 
 @app.get("/api/csrf")
-def get_csrf_token():
-    """Return CSRF token (placeholder for now)"""
-    # This is a placeholder - in a real app, you'd generate a proper CSRF token
-    return {"csrf_token": "placeholder-csrf-token"}
+def get_csrf_token(response: Response):
+    """Issue a CSRF token (also part of the /bootstrap payload)"""
+    return {"csrf_token": set_csrf_cookie(response)}
 
 @app.post("/api/auth/set-refresh-token")
 def set_refresh_token():
@@ -238,124 +257,26 @@ def test_backend():
     """Test backend connectivity"""
     return {"status": "ok", "message": "Backend is accessible via API"}
 
-@app.get("/api/reports")
-def get_reports():
-    """Return reports data (placeholder for now)"""
-    # This is a placeholder - in a real app, you'd fetch from database
-    return [
-        {
-            "id": "1",
-            "title": "Q1 2024 Economic Overview",
-            "date": "2024-03-31",
-            "content": "Comprehensive analysis of Lithuania's economic performance in Q1 2024...",
-            "topics": ["Economy", "Finance"],
-            "sources": [
-                {"id": "LB", "name": "Bank of Lithuania", "url": "https://www.lb.lt/en/statistics"}
-            ]
-        },
-        {
-            "id": "2", 
-            "title": "Inflation Trends Analysis",
-            "date": "2024-02-29",
-            "content": "Detailed examination of inflation patterns and their economic implications...",
-            "topics": ["Economy", "Prices"],
-            "sources": [
-                {"id": "StataLT", "name": "Statistics Lithuania", "url": "https://osp.stat.gov.lt/en"}
-            ]
-        }
-    ]
-
-@app.get("/api/sources")
-def get_api_sources():
-    """Return available data sources for reports"""
-    return [
-        {
-            "id": "LB",
-            "name": "Bank of Lithuania",
-            "url": "https://www.lb.lt/en/statistics"
-        },
-        {
-            "id": "StataLT",
-            "name": "Statistics Lithuania",
-            "url": "https://osp.stat.gov.lt/en"
-        },
-        {
-            "id": "Eurostat",
-            "name": "European Statistics",
-            "url": "https://ec.europa.eu/eurostat"
-        },
-        {
-            "id": "OECD",
-            "name": "Organisation for Economic Co-operation and Development",
-            "url": "https://data.oecd.org"
-        },
-        {
-            "id": "IMF",
-            "name": "International Monetary Fund",
-            "url": "https://data.imf.org"
-        },
-        {
-            "id": "WorldBank",
-            "name": "World Bank",
-            "url": "https://data.worldbank.org"
-        }
-    ]
-
-@app.get("/api/dashboards")
-def get_dashboards():
-    """Return dashboards data (placeholder for now)"""
-    # This is a placeholder - in a real app, you'd fetch from database
-    return [
-        {
-            "id": "1",
-            "title": "Economic Indicators Dashboard",
-            "description": "Real-time economic indicators for Lithuania",
-            "tags": ["economy", "indicators", "real-time"]
-        },
-        {
-            "id": "2",
-            "title": "Financial Markets Overview",
-            "description": "Comprehensive view of financial markets and trends",
-            "tags": ["finance", "markets", "trends"]
-        },
-        {
-            "id": "3",
-            "title": "Labor Market Analysis",
-            "description": "Employment and labor market statistics",
-            "tags": ["labor", "employment", "statistics"]
-        }
-    ]
-
-@app.get("/api/datasets")
-def get_datasets():
-    """Return datasets data (placeholder for now)"""
-    # This is a placeholder - in a real app, you'd fetch from database
-    return [
-        {
-            "id": "1",
-            "title": "GDP Growth Dataset",
-            "description": "Historical GDP growth data for Lithuania",
-            "tags": ["gdp", "growth", "historical"]
-        },
-        {
-            "id": "2",
-            "title": "Inflation Rate Dataset",
-            "description": "Monthly inflation rate data",
-            "tags": ["inflation", "prices", "monthly"]
-        }
-    ]
-
 @app.patch("/api/profiles/me")
 def update_profile_me():
     """Update current user profile (placeholder for now)"""
     # This is a placeholder - in a real app, you'd update the database
     return {"message": "Profile updated successfully"}
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request, exc):
+    """The request ran out of time (504), or the client left (499, never read)"""
+    if exc.reason == "disconnect":
+        return JSONResponse(status_code=499, content={"detail": "Client closed request"})
+    return JSONResponse(status_code=504, content={"detail": "Request timed out"})
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler for security"""
-    # Log the error (in production, use proper logging)
-    print(f"Unhandled exception: {exc}")
+    logger.error(
+        "Unhandled exception on %s %s", request.method, request.url.path,
+        exc_info=(type(exc), exc, exc.__traceback__)
+    )
     
     return JSONResponse(
         status_code=500,
@@ -0,0 +1,277 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Minimal in-process metrics registry rendered in the Prometheus text format.
+# Metrics are per worker process. Samples are kept in dicts keyed by label
+# values and guarded by a lock, since sync handlers run on the threadpool.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labelvalues: Sequence[str]) -> Tuple[str, ...]:
+        if len(labelvalues) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(v) for v in labelvalues)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labelvalues: str, amount: float = 1.0) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(self._key(labelvalues), 0.0)
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        if self._callback is not None:
+            lines.append(f"{self.name} {_format_value(self._callback())}")
+            return lines
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = self._key(labelvalues)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Observe the wall time of the wrapped block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def count(self, *labelvalues: str) -> float:
+        state = self._values.get(self._key(labelvalues))
+        return state[-1] if state else 0.0
+
+    def collect(self) -> List[str]:
+        lines = self.header()
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return registry.register(Counter(name, documentation, labelnames))
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = (),
+          callback: Optional[Callable[[], float]] = None) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, callback))
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+# HTTP
+HTTP_REQUESTS = counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+HTTP_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being served")
+REQUEST_DEADLINES_EXCEEDED = counter(
+    "http_request_deadlines_exceeded_total",
+    "Requests that ran past their deadline or lost their client, by route",
+    ("route", "reason"),
+)
+
+# Admission control
+ADMISSION_LIMIT = gauge("admission_limit", "Adaptive concurrency limit for admitted requests")
+ADMISSION_IN_FLIGHT = gauge("admission_in_flight", "Admitted requests in flight, by priority class", ("priority",))
+ADMISSION_REJECTIONS = counter(
+    "admission_rejections_total", "Requests shed with a 503, by priority class", ("priority",)
+)
+
+# Database
+DB_QUERIES = counter("db_queries_total", "SQL statements executed, by route", ("route",))
+DB_QUERY_DURATION = histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+DB_QUERIES_PER_REQUEST = histogram(
+    "http_request_db_queries", "SQL statements per HTTP request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+DB_TIME_PER_REQUEST = histogram(
+    "http_request_db_seconds", "Total SQL time per HTTP request", ("route",)
+)
+
+# Auth
+PASSWORD_HASH_DURATION = histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time", ("operation",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0),
+)
+BCRYPT_ROUNDS = gauge("bcrypt_rounds", "bcrypt cost used for new password hashes")
+PASSWORD_REHASHES = counter("password_rehashes_total", "Stored password hashes upgraded on login")
+REFRESH_TOKEN_ROTATIONS = counter(
+    "refresh_token_rotations_total", "Refresh attempts by outcome", ("outcome",)
+)
+RATE_LIMIT_REJECTIONS = counter(
+    "rate_limit_rejections_total", "Requests rejected by rate limiting", ("limiter",)
+)
+
+# Usage
+CONTENT_VIEWS = counter("content_views_total", "Views recorded, by content type", ("type",))
+VIEW_FLUSH_DURATION = histogram("view_flush_duration_seconds", "Time to write buffered view counts")
+
+# Caches
+CACHE_REQUESTS = counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result")
+)
+
+# Response compression
+COMPRESSED_RESPONSES = counter(
+    "compression_responses_total", "Responses compressed on the fly", ("encoding",)
+)
+COMPRESSION_BYTES_IN = counter("compression_bytes_in_total", "Bytes fed to compressors")
+COMPRESSION_BYTES_OUT = counter("compression_bytes_out_total", "Bytes produced by compressors")
+COMPRESSION_SECONDS = counter("compression_seconds_total", "Time spent compressing")
+
+# Background jobs
+JOBS_PROCESSED = counter("jobs_processed_total", "Background job runs by type and outcome", ("type", "outcome"))
+JOB_DURATION = histogram(
+    "job_duration_seconds", "Background job run time", ("type",),
+    buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0),
+)
+JOBS_RUNNING = gauge("jobs_running", "Background jobs currently executing")
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+class RequestStats:
+    """Per-request accumulator filled in by the SQLAlchemy event hooks"""
+
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self, record_statements: bool = False):
+        self.queries = 0
+        self.db_seconds = 0.0
+        # SQL text of each statement; only collected when query budgets are checked
+        self.statements: Optional[List[str]] = [] if record_statements else None
+
+# Set by MetricsMiddleware for the duration of each HTTP request
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "current_request_stats", default=None
+)
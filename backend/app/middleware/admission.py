@@ -0,0 +1,164 @@
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..auth import token_from_scope, username_from_token
+from ..metrics import ADMISSION_IN_FLIGHT, ADMISSION_LIMIT, ADMISSION_REJECTIONS
+
+# Adaptive concurrency limit (AIMD). The limit grows by about one per
+# window of completed requests while latency stays near each class's
+# baseline, and is cut by ADMISSION_BACKOFF when latency passes
+# ADMISSION_LATENCY_TOLERANCE x baseline: queueing means too much in flight.
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() == "true"
+ADMISSION_INITIAL_LIMIT = float(os.getenv("ADMISSION_INITIAL_LIMIT", "40"))
+ADMISSION_MIN_LIMIT = float(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+ADMISSION_MAX_LIMIT = float(os.getenv("ADMISSION_MAX_LIMIT", "200"))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv("ADMISSION_LATENCY_TOLERANCE", "2.0"))
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+
+# Priority classes, shed first to last: each may only fill its share of the
+# limit, so as load rises logins are refused first, then anonymous traffic,
+# and authenticated reads last. Retry-After grows with sheddability.
+PRIORITY_CLASSES = {
+    "login": (0.5, 5),
+    "anonymous": (0.8, 2),
+    "authenticated": (1.0, 1),
+}
+LOGIN_PATHS = frozenset({
+    "/users/login", "/users/login/oauth2", "/users/register", "/users/refresh",
+    "/api/auth/login", "/api/auth/register", "/api/auth/refresh",
+})
+# Never shed: monitoring must keep working under overload
+EXEMPT_PATHS = frozenset({"/metrics", "/test"})
+
+_WARMUP_SAMPLES = 20
+_BASELINE_ALPHA = 0.01   # slow: the no-load latency of the class
+_RECENT_ALPHA = 0.2      # fast: latency right now
+_DECREASE_INTERVAL = 0.1  # seconds; one cut per burst of slow responses
+
+def priority_class(scope: Scope) -> str:
+    """
+    Login, anonymous or authenticated, from the path and the access token.
+    The token's signature and expiry are checked (no database lookup), so a
+    made-up header cannot claim the authenticated share.
+    """
+    if scope["path"] in LOGIN_PATHS:
+        return "login"
+    if username_from_token(token_from_scope(scope)) is not None:
+        return "authenticated"
+    return "anonymous"
+
+class LatencyStats:
+    """Baseline and recent latency of one priority class"""
+
+    __slots__ = ("samples", "baseline", "recent")
+
+    def __init__(self):
+        self.samples = 0
+        self.baseline = 0.0
+        self.recent = 0.0
+
+    def observe(self, seconds: float) -> None:
+        if self.samples == 0:
+            self.baseline = self.recent = seconds
+        else:
+            self.baseline += _BASELINE_ALPHA * (seconds - self.baseline)
+            self.recent += _RECENT_ALPHA * (seconds - self.recent)
+        self.samples += 1
+
+    @property
+    def congested(self) -> bool:
+        return self.samples >= _WARMUP_SAMPLES and self.recent > ADMISSION_LATENCY_TOLERANCE * self.baseline
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit shared by all classes. Only touched from the
+    event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, initial: float = ADMISSION_INITIAL_LIMIT,
+                 minimum: float = ADMISSION_MIN_LIMIT, maximum: float = ADMISSION_MAX_LIMIT):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.stats: Dict[str, LatencyStats] = {name: LatencyStats() for name in PRIORITY_CLASSES}
+        self._last_decrease = 0.0
+        ADMISSION_LIMIT.set(self.limit)
+
+    def try_acquire(self, priority: str) -> bool:
+        share, _ = PRIORITY_CLASSES[priority]
+        if self.in_flight >= max(1.0, share * self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self, priority: str, seconds: float, failed: bool) -> None:
+        self.in_flight -= 1
+        stats = self.stats[priority]
+        stats.observe(seconds)
+        now = time.monotonic()
+        if failed or stats.congested:
+            if now - self._last_decrease >= _DECREASE_INTERVAL:
+                self.limit = max(self.minimum, self.limit * ADMISSION_BACKOFF)
+                self._last_decrease = now
+        elif self.in_flight >= self.limit / 2:
+            # Only grow while the limit is actually in use
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        ADMISSION_LIMIT.set(self.limit)
+
+class AdmissionControlMiddleware:
+    """
+    ASGI admission control: requests over their class's share of the
+    adaptive limit get an immediate 503 with Retry-After, instead of queueing
+    for the threadpool and timing out with everything else.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[AdaptiveLimit] = None):
+        self.app = app
+        self.limiter = limiter or AdaptiveLimit()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not ADMISSION_CONTROL or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        priority = priority_class(scope)
+        if not self.limiter.try_acquire(priority):
+            ADMISSION_REJECTIONS.inc(priority)
+            await self._reject(send, PRIORITY_CLASSES[priority][1])
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        ADMISSION_IN_FLIGHT.inc(priority)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            ADMISSION_IN_FLIGHT.dec(priority)
+            # 503/504 from inside (e.g. a timed-out dependency) also signal overload
+            self.limiter.release(priority, time.perf_counter() - start, status_code in (503, 504))
+
+    @staticmethod
+    async def _reject(send: Send, retry_after: int) -> None:
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
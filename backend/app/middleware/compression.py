@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..metrics import (
+    COMPRESSED_RESPONSES,
+    COMPRESSION_BYTES_IN,
+    COMPRESSION_BYTES_OUT,
+    COMPRESSION_SECONDS,
+    record_cache,
+)
+
+# Brotli and zstd are optional; gzip (zlib) is always available
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+# Responses smaller than this are sent as-is: framing overhead and CPU cost
+# outweigh the bytes saved
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Levels used for dynamic responses, per media type. These favour speed since
+# they are paid on every request.
+CONTENT_TYPE_LEVELS: Dict[str, Dict[str, int]] = {
+    "application/json": {"br": 4, "zstd": 3, "gzip": 6},
+    "text/csv": {"br": 5, "zstd": 6, "gzip": 6},
+    "text/html": {"br": 5, "zstd": 3, "gzip": 6},
+    "text/plain": {"br": 4, "zstd": 3, "gzip": 6},
+    "application/javascript": {"br": 5, "zstd": 3, "gzip": 6},
+    "application/xml": {"br": 4, "zstd": 3, "gzip": 6},
+    "image/svg+xml": {"br": 5, "zstd": 3, "gzip": 6},
+}
+DEFAULT_TEXT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+# Precompressed payloads are encoded once, so they use the maximum levels
+PRECOMPRESS_LEVELS = {"br": 11, "zstd": 19, "gzip": 9}
+
+def available_encodings() -> List[str]:
+    """Return supported content-codings in server preference order"""
+    encodings = []
+    if brotli is not None:
+        encodings.append("br")
+    if zstandard is not None:
+        encodings.append("zstd")
+    encodings.append("gzip")
+    return encodings
+
+def negotiate_encoding(accept_encoding: str, offered: List[str]) -> Optional[str]:
+    """
+    Pick the best content-coding from an Accept-Encoding header.
+
+    Highest q-value wins; ties are broken by the order of `offered`.
+    Returns None when the client accepts none of the offered codings.
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best = None
+    best_q = 0.0
+    for coding in offered:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def levels_for_content_type(content_type: str) -> Optional[Dict[str, int]]:
+    """Return compression levels for a media type, or None if it is not compressible"""
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in CONTENT_TYPE_LEVELS:
+        return CONTENT_TYPE_LEVELS[media_type]
+    if media_type.startswith("text/") or media_type.endswith("+json"):
+        return DEFAULT_TEXT_LEVELS
+    return None
+
+class StreamCompressor:
+    """Uniform compress/flush interface over gzip, brotli and zstd"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+            self._compress = self._compressor.process
+            self._flush = self._compressor.finish
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+        else:
+            # wbits=31 produces a gzip container rather than raw zlib
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self._compress = self._compressor.compress
+            self._flush = self._compressor.flush
+
+    def compress(self, data: bytes) -> bytes:
+        return self._timed(self._compress, data)
+
+    def flush(self) -> bytes:
+        return self._timed(self._flush)
+
+    def _timed(self, func, *args) -> bytes:
+        # Recorded so the CPU spent compressing can be weighed against the
+        # bandwidth it saves
+        start = time.perf_counter()
+        out = func(*args)
+        COMPRESSION_SECONDS.inc(amount=time.perf_counter() - start)
+        if args:
+            COMPRESSION_BYTES_IN.inc(amount=len(args[0]))
+        COMPRESSION_BYTES_OUT.inc(amount=len(out))
+        return out
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete body in one shot"""
+    compressor = StreamCompressor(encoding, level)
+    return compressor.compress(data) + compressor.flush()
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses with the best coding the
+    client accepts (br, zstd or gzip).
+
+    Bodies below `minimum_size`, non-text media types and responses that
+    already carry a Content-Encoding (e.g. precompressed payloads) pass
+    through untouched. Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    """Per-response state for CompressionMiddleware"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.started = False
+        self.passthrough = False
+        self.level: Optional[int] = None
+        self.buffer = bytearray()
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            levels = levels_for_content_type(headers.get("content-type", ""))
+            if levels is None or "content-encoding" in headers:
+                self.passthrough = True
+            else:
+                self.level = levels[self.encoding]
+            return
+
+        if message_type != "http.response.body":
+            await self._start()
+            await self._send(message)
+            return
+
+        if self.passthrough:
+            await self._start()
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.buffer.extend(body)
+            if more_body and len(self.buffer) < self.minimum_size:
+                return
+
+            if len(self.buffer) < self.minimum_size:
+                # Complete response that is too small to be worth compressing
+                await self._start(vary=True)
+                await self._send({"type": "http.response.body", "body": bytes(self.buffer)})
+                return
+
+            self.compressor = StreamCompressor(self.encoding, self.level)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            COMPRESSED_RESPONSES.inc(self.encoding)
+
+            if more_body:
+                del headers["Content-Length"]
+                out = self.compressor.compress(bytes(self.buffer))
+            else:
+                out = self.compressor.compress(bytes(self.buffer)) + self.compressor.flush()
+                headers["Content-Length"] = str(len(out))
+            self.buffer = bytearray()
+
+            await self._start()
+            await self._send({"type": "http.response.body", "body": out, "more_body": more_body})
+            return
+
+        if self.compressor is None:
+            await self._send(message)
+            return
+
+        out = self.compressor.compress(body)
+        if not more_body:
+            out += self.compressor.flush()
+        await self._send({"type": "http.response.body", "body": out, "more_body": more_body})
+
+    async def _start(self, vary: bool = False) -> None:
+        if self.started:
+            return
+        self.started = True
+        if vary:
+            MutableHeaders(raw=self.start_message["headers"]).add_vary_header("Accept-Encoding")
+        await self._send(self.start_message)
+
+class PrecompressedPayload:
+    """
+    Immutable response body encoded once for every supported coding.
+
+    Used for cacheable catalog responses: the stored bytes are served
+    directly, so neither JSON encoding nor compression runs per request.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        self.variants: Dict[str, bytes] = {}
+        if len(body) >= MINIMUM_SIZE:
+            for encoding in available_encodings():
+                encoded = compress_bytes(body, encoding, PRECOMPRESS_LEVELS[encoding])
+                if len(encoded) < len(body):
+                    self.variants[encoding] = encoded
+
+    @classmethod
+    def from_json(cls, data: Any) -> "PrecompressedPayload":
+        """Encode JSON-serializable data compactly and precompress it"""
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+        return cls(body.encode("utf-8"))
+
+    def response(self, request: Request) -> Response:
+        """Build a response using the best stored variant for this request"""
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        revalidated = request.headers.get("if-none-match") == self.etag
+        record_cache("etag", revalidated)
+        if revalidated:
+            return Response(status_code=304, headers=headers)
+
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding", ""), list(self.variants)
+        )
+        if encoding is None:
+            return Response(content=self.body, media_type=self.media_type, headers=headers)
+
+        headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.variants[encoding], media_type=self.media_type, headers=headers
+        )
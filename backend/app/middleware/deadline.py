@@ -0,0 +1,67 @@
+import asyncio
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..deadlines import Deadline, current_deadline
+from ..metrics import REQUEST_DEADLINES_EXCEEDED
+from .metrics import route_label
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware giving each request a deadline (see app.deadlines) and
+    watching for the client to disconnect. Either one makes the request's
+    next or running SQL statement raise DeadlineExceeded, which ends the
+    handler and frees its connection.
+
+    Request messages are pumped through a one-slot queue, so a disconnect
+    is seen while the handler runs without reading the body ahead of it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        deadline = Deadline(scope)
+        response_complete = False
+        messages: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async def pump() -> None:
+            while True:
+                try:
+                    message = await receive()
+                except Exception:
+                    message = {"type": "http.disconnect"}
+                if message["type"] == "http.disconnect":
+                    # Servers also report a disconnect once the response is out
+                    deadline.disconnected = not response_complete
+                    await messages.put(message)
+                    return
+                await messages.put(message)
+
+        async def buffered_receive() -> Message:
+            if deadline.disconnected:
+                return {"type": "http.disconnect"}
+            return await messages.get()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_complete
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete = True
+            await send(message)
+
+        token = current_deadline.set(deadline)
+        # A bare task rather than an anyio task group: this runs for every
+        # request, and a task group costs several times as much
+        watcher = asyncio.ensure_future(pump())
+        try:
+            await self.app(scope, buffered_receive, send_wrapper)
+        finally:
+            watcher.cancel()
+            current_deadline.reset(token)
+            reason = deadline.reason()
+            if reason is not None:
+                REQUEST_DEADLINES_EXCEEDED.inc(route_label(scope), reason)
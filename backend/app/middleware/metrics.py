@@ -0,0 +1,67 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..metrics import (
+    DB_QUERIES,
+    DB_QUERIES_PER_REQUEST,
+    DB_TIME_PER_REQUEST,
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_DURATION,
+    HTTP_REQUESTS,
+    RequestStats,
+    current_request_stats,
+)
+
+def route_label(scope: Scope) -> str:
+    """
+    Return the route template (e.g. "/reports/{report_id}") for a request.
+
+    Using the template rather than the raw path keeps label cardinality bounded.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path if path else "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status counts, in-flight
+    requests and the SQL statements issued while serving each request.
+
+    Must be the outermost middleware so the timings cover the whole stack.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            current_request_stats.reset(token)
+
+            route = route_label(scope)
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route, str(status_code))
+            HTTP_REQUEST_DURATION.observe(elapsed, method, route)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+            if stats.queries:
+                DB_QUERIES.inc(route, amount=stats.queries)
+                DB_TIME_PER_REQUEST.observe(stats.db_seconds, route)
@@ -0,0 +1,87 @@
+import logging
+from types import CodeType
+from typing import Optional
+from urllib.parse import parse_qs
+
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..auth import profile_token_subject, token_from_scope, username_from_token
+from ..db import engine
+from ..metrics import current_request_stats
+from ..models import User
+from ..profiling import PROFILING_ENABLED, SamplingProfiler, new_profile_id, store_profile
+from .metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+def _is_admin(username: str) -> bool:
+    # Not the request's own work, so kept out of its query count and budget
+    token = current_request_stats.set(None)
+    try:
+        with Session(engine) as session:
+            return bool(session.exec(select(User.is_admin).where(User.username == username)).first())
+    finally:
+        current_request_stats.reset(token)
+
+async def wants_profile(scope: Scope) -> bool:
+    """
+    A request is profiled when it carries a valid X-Profile token (issued by
+    POST /admin/debug/profile-token), or ?profile=1 with an admin's credentials.
+    """
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return profile_token_subject(value.decode("latin-1")) is not None
+
+    query_string = scope.get("query_string", b"")
+    if b"profile=" not in query_string:
+        return False
+    flag = parse_qs(query_string.decode("latin-1")).get("profile", [""])[-1]
+    if flag.lower() not in ("1", "true"):
+        return False
+    username = username_from_token(token_from_scope(scope))
+    return username is not None and await run_in_threadpool(_is_admin, username)
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running flagged requests under a SamplingProfiler. The
+    response gets an X-Profile-Id header; the profile is written once the
+    response is out and served by GET /admin/debug/profiles/{id}.
+    Unflagged requests only pay for the flag check.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not PROFILING_ENABLED or not await wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        def root() -> Optional[CodeType]:
+            endpoint = getattr(scope.get("route"), "endpoint", None)
+            return getattr(endpoint, "__code__", None)
+
+        profile_id = new_profile_id()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-Profile-Id"] = profile_id
+            await send(message)
+
+        profiler = SamplingProfiler(root)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            name = f"{scope['method']} {route_label(scope)}"
+            try:
+                await run_in_threadpool(store_profile, profile_id, profiler, name)
+                logger.info("Stored profile %s of %s (%d samples)", profile_id, name,
+                            sum(profiler.samples.values()))
+            except OSError:
+                logger.exception("Failed to store profile %s", profile_id)
@@ -3,6 +3,7 @@ import json
 from fastapi import HTTPException, Request
 from typing import Dict, Tuple
 import os
+from ..metrics import RATE_LIMIT_REJECTIONS
 
 # In-memory storage for rate limiting (use Redis in production)
 rate_limit_store: Dict[str, Tuple[int, float]] = {}
@@ -73,6 +74,7 @@ def rate_limit_login(request: Request):
     key = f"login:{client_ip}"
     
     if not login_limiter.is_allowed(key):
+        RATE_LIMIT_REJECTIONS.inc("login")
         remaining_time = int(login_limiter.get_reset_time(key) - time.time())
         raise HTTPException(
             status_code=429,
@@ -89,6 +91,7 @@ def rate_limit_register(request: Request):
     key = f"register:{client_ip}"
     
     if not register_limiter.is_allowed(key):
+        RATE_LIMIT_REJECTIONS.inc("register")
         remaining_time = int(register_limiter.get_reset_time(key) - time.time())
         raise HTTPException(
             status_code=429,
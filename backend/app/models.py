@@ -1,7 +1,11 @@
-from datetime import datetime
+import json
+from datetime import date as date_type, datetime
+from pydantic import field_validator
+from sqlalchemy import Index, insert_sentinel
 from sqlmodel import SQLModel, Field
 from typing import Optional, List
 from enum import Enum
+from .utils.urls import check_url_scheme
 
 class StakeholderRole(str, Enum):
     POLICY_MAKER = "policy_maker"
@@ -22,11 +26,76 @@ class Language(str, Enum):
     LT = "lt"
     EN = "en"
 
+class SeriesFrequency(str, Enum):
+    MONTHLY = "M"
+    QUARTERLY = "Q"
+    ANNUAL = "A"
+
+class Aggregation(str, Enum):
+    MEAN = "mean"
+    SUM = "sum"
+    LAST = "last"
+    FIRST = "first"
+    MIN = "min"
+    MAX = "max"
+
+class ContentType(str, Enum):
+    REPORT = "report"
+    DASHBOARD = "dashboard"
+    DATASET = "dataset"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
 class EconomicReport(SQLModel, table=True):
+    __table_args__ = (
+        # Numbers the rows of a multi-row INSERT so RETURNING ids can be
+        # matched to them (SQLite does not order RETURNING); never selected
+        insert_sentinel("_sentinel"),
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     content: str
-    date: str
+    date: date_type = Field(index=True)
+    excerpt: Optional[str] = None  # Plain-text preview of content for list views
+
+class ContentView(SQLModel, table=True):
+    """All-time view count of a report, dashboard or dataset"""
+    content_type: ContentType = Field(primary_key=True)
+    content_id: int = Field(primary_key=True)
+    views: int = 0
+    last_viewed_at: Optional[datetime] = None
+
+class ContentViewBucket(SQLModel, table=True):
+    """Views of one item within one hour; recent buckets feed the trending feeds"""
+    content_type: ContentType = Field(primary_key=True)
+    bucket: int = Field(primary_key=True)  # Hours since the Unix epoch (UTC)
+    content_id: int = Field(primary_key=True)
+    views: int = 0
+
+class RelatedContent(SQLModel, table=True):
+    """One precomputed nearest neighbour of a report or dataset, by text similarity"""
+    __table_args__ = (
+        # Finds the lists that mention an item when it changes
+        Index("ix_relatedcontent_related", "related_type", "related_id"),
+    )
+    content_type: ContentType = Field(primary_key=True)
+    content_id: int = Field(primary_key=True)
+    related_type: ContentType = Field(primary_key=True)
+    rank: int = Field(primary_key=True)  # 0 is the most similar
+    related_id: int
+    score: float  # Cosine similarity of the TF-IDF vectors
+
+class ReportTopic(SQLModel, table=True):
+    report_id: int = Field(foreign_key="economicreport.id", primary_key=True)
+    topic_slug: str = Field(foreign_key="topic.slug", primary_key=True, index=True)
+
+class ReportSource(SQLModel, table=True):
+    report_id: int = Field(foreign_key="economicreport.id", primary_key=True)
+    source_id: str = Field(foreign_key="source.id", primary_key=True, index=True)
 
 class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -36,6 +105,20 @@ class User(SQLModel, table=True):
     is_admin: bool = Field(default=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+class RefreshTokenFamily(SQLModel, table=True):
+    """
+    A chain of rotated refresh tokens started by one login. Only the
+    current token (and, briefly, the previous one) is accepted.
+    """
+    id: str = Field(primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    current_jti: str
+    previous_jti: Optional[str] = None
+    rotated_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(index=True)
+    revoked_at: Optional[datetime] = Field(default=None, index=True)
+
 class Profile(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id", unique=True)
@@ -62,16 +145,115 @@ class ProfileTopic(SQLModel, table=True):
     profile_id: int = Field(foreign_key="profile.id")
     topic_slug: str = Field(foreign_key="topic.slug")
 
+class Source(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # Short code, e.g. "Eurostat"
+    name: str
+    url: str
+
 class Dataset(SQLModel, table=True):
+    __table_args__ = (
+        insert_sentinel("_sentinel"),  # see EconomicReport
+    )
     id: Optional[int] = Field(default=None, primary_key=True)
     name: str
     description: str
     source_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    @field_validator("source_url")
+    @classmethod
+    def _public_source_url(cls, value: Optional[str]) -> Optional[str]:
+        # The refresh job fetches it; the job re-checks where the host resolves
+        if value:
+            check_url_scheme(value)
+        return value
+
 class Dashboard(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str
     description: Optional[str] = None
     tags: Optional[str] = None  # JSON string of tags
-    created_at: datetime = Field(default_factory=datetime.utcnow) 
\ No newline at end of file
+    created_at: datetime = Field(default_factory=datetime.utcnow) 
+
+def check_tags(tags: Optional[str]) -> None:
+    """Raise ValueError unless `tags` is empty or a JSON array of strings"""
+    if not tags:
+        return
+    try:
+        decoded = json.loads(tags)
+    except ValueError:
+        decoded = None
+    if not isinstance(decoded, list) or not all(isinstance(tag, str) for tag in decoded):
+        raise ValueError('tags must be a JSON array of strings, e.g. ["gdp", "growth"]')
+
+def decode_tags(tags: Optional[str]) -> List[str]:
+    """
+    Dashboard tags as a list. Rows stored before writes were checked may
+    hold a comma-separated string; those are split rather than failing.
+    """
+    try:
+        check_tags(tags)
+    except ValueError:
+        return [tag.strip() for tag in tags.split(",") if tag.strip()]
+    return json.loads(tags) if tags else []
+
+class Job(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    type: str = Field(index=True)
+    payload: str = "{}"  # JSON arguments for the handler
+    priority: int = Field(default=0)  # Higher runs first
+    status: JobStatus = Field(default=JobStatus.QUEUED, index=True)
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    run_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    dedupe_key: Optional[str] = Field(default=None, index=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)  # Who queued it, if anyone
+    result: Optional[str] = None  # JSON
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class Series(SQLModel, table=True):
+    id: str = Field(primary_key=True)  # Code, e.g. "LT.HICP.M"
+    name: str
+    source_id: Optional[str] = Field(default=None, foreign_key="source.id")
+    dataset_id: Optional[int] = Field(default=None, foreign_key="dataset.id", index=True)
+    indicator: str = Field(index=True)  # e.g. "hicp"; the same across countries
+    region: str = Field(index=True)  # ISO country code or regional code, e.g. "LT", "EU27"
+    sector: Optional[str] = None
+    frequency: SeriesFrequency
+    unit: Optional[str] = None
+    # How values combine when resampled to a lower frequency
+    aggregation: Aggregation = Field(default=Aggregation.MEAN)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Observation(SQLModel, table=True):
+    series_id: str = Field(foreign_key="series.id", primary_key=True)
+    period: date_type = Field(primary_key=True)  # First day of the period
+    value: float
+    valid_from: Optional[datetime] = None  # Release that published this value; None if loaded before vintages
+
+class ObservationRollup(SQLModel, table=True):
+    """Per-year aggregate of every observation of one indicator, region and sector"""
+    indicator: str = Field(primary_key=True)
+    region: str = Field(primary_key=True)
+    sector: str = Field(default="", primary_key=True)  # "" for series without a sector
+    year: int = Field(primary_key=True, index=True)
+    count: int
+    total: float
+    min_value: float
+    max_value: float
+    sketch: bytes  # (mean, weight) float64 little-endian pairs, ascending; see rollups.make_sketch
+
+class ObservationVintage(SQLModel, table=True):
+    """A superseded observation value, valid over [valid_from, valid_to)"""
+    __table_args__ = (
+        # Interval index: an as-of lookup only visits values superseded after that time
+        Index("ix_observationvintage_series_valid_to", "series_id", "valid_to"),
+    )
+    series_id: str = Field(foreign_key="series.id", primary_key=True)
+    period: date_type = Field(primary_key=True)
+    valid_to: datetime = Field(primary_key=True)  # Release that revised it
+    valid_from: Optional[datetime] = None
+    value: float
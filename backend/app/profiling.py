@@ -0,0 +1,207 @@
+import json
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional
+
+# On-demand profiling for admins: a flagged request is sampled while it runs
+# and the result stored under PROFILE_DIR (see ProfilingMiddleware)
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "true").lower() == "true"
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "./profiles"))
+# Profiles kept on disk; the oldest are deleted first
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+# Sampling period. Samples are taken by a thread that needs the GIL, so
+# busy Python code is seen about every sys.getswitchinterval() (5 ms) at best.
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+PROFILE_FORMATS = {"speedscope": ".speedscope.json", "collapsed": ".collapsed.txt"}
+
+_PROFILE_ID = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+
+def _frame_name(code: CodeType) -> str:
+    return getattr(code, "co_qualname", code.co_name)
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler for one request. A thread reads every
+    thread's current stack each interval and keeps those running the
+    request's endpoint, trimmed to start at the endpoint frame. The endpoint
+    is only known after routing, so `root` is asked for its code each time.
+
+    Concurrent calls of the same endpoint are sampled too; profile on a
+    quiet worker, or accept the mix.
+    """
+
+    def __init__(self, root: Callable[[], Optional[CodeType]], interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.root = root
+        self.interval = interval
+        self.samples: Counter = Counter()  # stack (root first) -> samples
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            root = self.root()
+            if root is None:
+                continue
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    if frame.f_code is root:
+                        self.samples[tuple(reversed(stack))] += 1
+                        break
+                    frame = frame.f_back
+
+    def speedscope(self, name: str) -> Dict[str, Any]:
+        """The samples as a speedscope file (https://www.speedscope.app)"""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[CodeType, int] = {}
+        samples, weights = [], []
+        for stack, count in self.samples.items():
+            for code in stack:
+                if code not in index:
+                    index[code] = len(frames)
+                    frames.append({"name": _frame_name(code), "file": code.co_filename, "line": code.co_firstlineno})
+            samples.append([index[code] for code in stack])
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "lt-econ-portal",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(self.duration, 6),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+    def collapsed(self) -> str:
+        """The samples as folded stacks, the input of flamegraph.pl and most flame graph tools"""
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = ";".join(f"{_frame_name(code)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                             for code in stack)
+            lines.append(f"{names} {count}")
+        return "\n".join(lines) + "\n"
+
+def new_profile_id() -> str:
+    return f"{int(time.time())}-{secrets.token_hex(4)}"
+
+def store_profile(profile_id: str, profiler: SamplingProfiler, name: str) -> None:
+    """Write both formats and prune the oldest profiles beyond PROFILE_KEEP"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    (PROFILE_DIR / f"{profile_id}.speedscope.json").write_text(json.dumps(profiler.speedscope(name)))
+    (PROFILE_DIR / f"{profile_id}.collapsed.txt").write_text(profiler.collapsed())
+    for old in list_profiles()[PROFILE_KEEP:]:
+        for suffix in PROFILE_FORMATS.values():
+            (PROFILE_DIR / f"{old}{suffix}").unlink(missing_ok=True)
+
+def list_profiles() -> List[str]:
+    """Stored profile ids, newest first"""
+    if not PROFILE_DIR.is_dir():
+        return []
+    suffix = PROFILE_FORMATS["speedscope"]
+    paths = sorted(PROFILE_DIR.glob(f"*{suffix}"), key=lambda path: path.stat().st_mtime, reverse=True)
+    return [path.name[:-len(suffix)] for path in paths]
+
+def profile_path(profile_id: str, fmt: str) -> Optional[Path]:
+    """Path of a stored profile, or None for unknown ids (which are never joined into a path)"""
+    if not _PROFILE_ID.match(profile_id) or fmt not in PROFILE_FORMATS:
+        return None
+    path = PROFILE_DIR / f"{profile_id}{PROFILE_FORMATS[fmt]}"
+    return path if path.is_file() else None
+
+class MemoryTracker:
+    """
+    tracemalloc snapshots for finding memory growth. Tracing slows every
+    allocation, so it only runs between start() and stop(); each diff
+    compares against the baseline snapshot taken at start or at the last rebase.
+    """
+
+    # Allocations made by tracemalloc itself and by imports are noise
+    _IGNORE = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self.started_at: Optional[float] = None
+
+    def start(self, frames: int = 1) -> None:
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(frames)
+                self.started_at = time.time()
+            self._baseline = self._snapshot()
+
+    def stop(self) -> None:
+        with self._lock:
+            tracemalloc.stop()
+            self._baseline = None
+            self.started_at = None
+
+    def _snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._IGNORE)
+
+    def diff(self, limit: int = 25, group_by: str = "lineno", rebase: bool = False) -> Dict[str, Any]:
+        """Top allocation sites by growth since the baseline"""
+        with self._lock:
+            if self._baseline is None:
+                raise RuntimeError("tracemalloc is not running")
+            snapshot = self._snapshot()
+            stats = snapshot.compare_to(self._baseline, group_by)
+            if rebase:
+                self._baseline = snapshot
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "size_diff": sum(stat.size_diff for stat in stats),
+            "top": [
+                {
+                    "location": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+                    "size": stat.size,
+                    "size_diff": stat.size_diff,
+                    "count": stat.count,
+                    "count_diff": stat.count_diff,
+                }
+                for stat in stats[:limit]
+            ],
+        }
+
+# Process-wide tracker behind /admin/debug/tracemalloc
+memory_tracker = MemoryTracker()
@@ -0,0 +1,42 @@
+import re
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException
+from sqlmodel import SQLModel, select
+
+EXCERPT_LENGTH = 200
+
+def make_excerpt(text: Optional[str], length: int = EXCERPT_LENGTH) -> str:
+    """Plain-text preview of `text`, cut at a word boundary"""
+    text = re.sub(r"\s+", " ", text or "").strip()
+    if len(text) <= length:
+        return text
+    cut = text[:length]
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" ,.;:") + "..."
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], default: Sequence[str]) -> List[str]:
+    """
+    Parse a `fields=a,b,c` query parameter into column names.
+
+    Falls back to `default` when not given; unknown names are a 400.
+    """
+    if not fields:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown field(s): {', '.join(unknown) or fields}. Choose from: {', '.join(allowed)}",
+        )
+    return names
+
+def select_fields(model: Type[SQLModel], names: Sequence[str]):
+    """SELECT only the named columns of `model`"""
+    return select(*(getattr(model, name) for name in names))
+
+def as_dicts(rows: Sequence[Any], names: Sequence[str]) -> List[Dict[str, Any]]:
+    # Pass rows from session.execute(); session.exec() unwraps single-column selects
+    return [dict(zip(names, row)) for row in rows]
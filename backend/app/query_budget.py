@@ -0,0 +1,116 @@
+import logging
+import os
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics import RequestStats, current_request_stats
+
+logger = logging.getLogger(__name__)
+
+# off: no tracking; warn: log violations; enforce: fail the request (test mode)
+_default_mode = {"production": "off", "test": "enforce"}.get(os.getenv("ENVIRONMENT", ""), "warn")
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", _default_mode).lower()
+
+# The same statement repeated this many times in one request is reported as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "3"))
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised in enforce mode when a request issues more queries than its budget"""
+
+def query_budget(max_queries: int) -> Callable:
+    """
+    Declare the maximum number of SQL statements an endpoint may issue,
+    including those from its dependencies (e.g. get_current_user).
+
+    Usage:
+        @router.get("/reports")
+        @query_budget(1)
+        def list_reports(...): ...
+    """
+    def decorator(func: Callable) -> Callable:
+        func.__query_budget__ = max_queries
+        return func
+    return decorator
+
+def repeated_statements(statements: List[str], threshold: int = N_PLUS_ONE_THRESHOLD) -> List[str]:
+    """Return statements issued at least `threshold` times"""
+    return [sql for sql, count in Counter(statements).items() if count >= threshold]
+
+def check_budget(stats: RequestStats, budget: Optional[int], label: str) -> None:
+    """Log (or raise, in enforce mode) query budget and N+1 violations"""
+    problems = []
+
+    if budget is not None and stats.queries > budget:
+        problems.append(f"{label} issued {stats.queries} queries (budget {budget})")
+
+    repeated = repeated_statements(stats.statements or [])
+    if repeated:
+        problems.append(f"{label} repeated {len(repeated)} statement(s) - possible N+1")
+
+    if not problems:
+        return
+
+    message = "; ".join(problems) + "\n" + "\n".join(
+        f"  [{i}] {sql}" for i, sql in enumerate(stats.statements or [], 1)
+    )
+    logger.warning(message)
+    if QUERY_BUDGET_MODE == "enforce":
+        raise QueryBudgetExceeded(message)
+
+@contextmanager
+def assert_max_queries(max_queries: int, label: str = "block") -> Iterator[RequestStats]:
+    """
+    Count the SQL statements issued inside the block, outside of any request.
+    Raises QueryBudgetExceeded when the count exceeds `max_queries`.
+    """
+    stats = RequestStats(record_statements=True)
+    token = current_request_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_request_stats.reset(token)
+    if stats.queries > max_queries:
+        raise QueryBudgetExceeded(
+            f"{label} issued {stats.queries} queries (budget {max_queries})\n"
+            + "\n".join(f"  [{i}] {sql}" for i, sql in enumerate(stats.statements, 1))
+        )
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware that reports the query count and DB time of each request
+    in X-DB-Queries / X-DB-Time-Ms headers and checks them against the budget
+    declared on the endpoint with @query_budget.
+
+    Relies on MetricsMiddleware having installed a RequestStats for the request,
+    so it must be added before (inside) it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        stats = current_request_stats.get()
+        if scope["type"] != "http" or QUERY_BUDGET_MODE == "off" or stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        stats.statements = []
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Handlers have finished by the time headers go out
+                route = scope.get("route")
+                endpoint = getattr(route, "endpoint", None)
+                budget = getattr(endpoint, "__query_budget__", None)
+                check_budget(stats, budget, f"{scope['method']} {getattr(route, 'path', scope['path'])}")
+
+                headers = MutableHeaders(raw=message["headers"])
+                headers["X-DB-Queries"] = str(stats.queries)
+                headers["X-DB-Time-Ms"] = f"{stats.db_seconds * 1000:.2f}"
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
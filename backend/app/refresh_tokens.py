@@ -0,0 +1,183 @@
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from jose import JWTError, jwt
+from sqlalchemy import delete, insert, update
+from sqlmodel import Session, select
+
+from .auth import ALGORITHM, REFRESH_TOKEN_EXPIRE_DAYS, SECRET_KEY, create_refresh_token
+from .db import engine
+from .metrics import REFRESH_TOKEN_ROTATIONS
+from .models import RefreshTokenFamily, User
+
+# Refresh-token rotation. Each login starts a token family; every refresh
+# swaps the family's current jti for a new one with a single conditional
+# UPDATE by primary key. Presenting a superseded token means it was copied,
+# so the whole family is revoked.
+
+REMEMBER_ME_DAYS = 30
+# Tabs sharing a cookie may refresh at the same moment with the same token;
+# the loser of that race within this window is not treated as reuse
+REFRESH_REUSE_GRACE_SECONDS = float(os.getenv("REFRESH_REUSE_GRACE_SECONDS", "30"))
+# How often each worker pulls revocations made by the others (seconds)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
+# Revocations committed this long before the last one seen are re-read on sync
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+class RefreshTokenError(Exception):
+    """The refresh token cannot be used; the message is safe to return"""
+
+class RevocationSet:
+    """
+    Revoked token families, held in memory until their tokens would have
+    expired anyway. Workers share revocations through the database: each
+    pulls new ones at most every REVOCATION_SYNC_SECONDS. The rotation
+    UPDATE re-checks revocation, so a worker that has not synced yet still
+    cannot rotate a revoked family. The set only spares the write.
+    """
+
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._revoked: Dict[str, datetime] = {}  # family id -> expires_at
+        self._watermark: Optional[datetime] = None  # latest revoked_at seen
+        self._next_sync = 0.0
+
+    def add(self, family_id: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked[family_id] = expires_at
+
+    def __contains__(self, family_id: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        expires_at = self._revoked.get(family_id)
+        return expires_at is not None and expires_at > datetime.utcnow()
+
+    def sync(self) -> None:
+        self._next_sync = time.monotonic() + self.sync_interval
+        now = datetime.utcnow()
+        query = select(RefreshTokenFamily.id, RefreshTokenFamily.expires_at, RefreshTokenFamily.revoked_at).where(
+            RefreshTokenFamily.revoked_at.is_not(None), RefreshTokenFamily.expires_at > now,
+        )
+        if self._watermark is not None:
+            query = query.where(RefreshTokenFamily.revoked_at > self._watermark - _SYNC_OVERLAP)
+        with Session(engine) as session:
+            rows = session.execute(query).all()
+        with self._lock:
+            for family_id, expires_at, revoked_at in rows:
+                self._revoked[family_id] = expires_at
+                if self._watermark is None or revoked_at > self._watermark:
+                    self._watermark = revoked_at
+            if self._watermark is None:
+                self._watermark = now
+            for family_id in [family_id for family_id, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[family_id]
+
+# Global revocation set checked on every refresh
+revoked_families = RevocationSet()
+
+def _new_id() -> str:
+    return secrets.token_urlsafe(16)
+
+def _claims(username: str, email: Optional[str], family_id: str, jti: str) -> Dict[str, Any]:
+    return {"sub": username, "email": email, "fam": family_id, "jti": jti}
+
+def issue_refresh_token(user: User, remember_me: bool = False) -> str:
+    """
+    Start a token family for a fresh login and return its first refresh
+    token. Uses its own session, so the caller's `user` is not expired.
+    """
+    days = REMEMBER_ME_DAYS if remember_me else REFRESH_TOKEN_EXPIRE_DAYS
+    family_id, jti = _new_id(), _new_id()
+    expires_at = datetime.utcnow() + timedelta(days=days)
+    with Session(engine) as session:
+        session.execute(insert(RefreshTokenFamily).values(
+            id=family_id, user_id=user.id, current_jti=jti, created_at=datetime.utcnow(), expires_at=expires_at,
+        ))
+        session.commit()
+    return create_refresh_token(_claims(user.username, user.email, family_id, jti), expires_at)
+
+def rotate_refresh_token(payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Exchange a decoded refresh token for the next one in its family.
+
+    Returns None when another request (another tab) rotated this same token
+    moments ago: the caller should issue an access token but keep the
+    refresh cookie that request already set. Raises RefreshTokenError if the
+    token is unknown, revoked, expired or being reused.
+    """
+    family_id, jti = payload.get("fam"), payload.get("jti")
+    if not family_id or not jti:
+        raise RefreshTokenError("Invalid refresh token")
+    if family_id in revoked_families:
+        REFRESH_TOKEN_ROTATIONS.inc("revoked")
+        raise RefreshTokenError("Refresh token has been revoked")
+
+    now = datetime.utcnow()
+    new_jti = _new_id()
+    with Session(engine) as session:
+        result = session.execute(
+            update(RefreshTokenFamily)
+            .where(
+                RefreshTokenFamily.id == family_id,
+                RefreshTokenFamily.current_jti == jti,
+                RefreshTokenFamily.revoked_at.is_(None),
+                RefreshTokenFamily.expires_at > now,
+            )
+            .values(previous_jti=jti, current_jti=new_jti, rotated_at=now)
+        )
+        session.commit()
+        if result.rowcount:
+            REFRESH_TOKEN_ROTATIONS.inc("rotated")
+            claims = _claims(payload["sub"], payload.get("email"), family_id, new_jti)
+            return create_refresh_token(claims, datetime.utcfromtimestamp(payload["exp"]))
+
+        family = session.get(RefreshTokenFamily, family_id)
+        if family is None or family.revoked_at is not None or family.expires_at <= now:
+            REFRESH_TOKEN_ROTATIONS.inc("revoked")
+            raise RefreshTokenError("Refresh token has been revoked")
+        if (family.previous_jti == jti and family.rotated_at is not None
+                and (now - family.rotated_at).total_seconds() <= REFRESH_REUSE_GRACE_SECONDS):
+            REFRESH_TOKEN_ROTATIONS.inc("concurrent")
+            return None
+
+        # A superseded token came back: someone else holds a copy of the chain
+        _revoke(session, family_id, family.expires_at)
+        REFRESH_TOKEN_ROTATIONS.inc("reused")
+        raise RefreshTokenError("Refresh token has been revoked")
+
+def _revoke(session: Session, family_id: str, expires_at: datetime) -> None:
+    session.execute(
+        update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.id == family_id, RefreshTokenFamily.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+    )
+    session.commit()
+    revoked_families.add(family_id, expires_at)
+
+def revoke_refresh_token(token: Optional[str]) -> bool:
+    """Revoke the family of a refresh token (logout). Expired tokens are accepted."""
+    if not token:
+        return False
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM], options={"verify_exp": False})
+    except JWTError:
+        return False
+    if payload.get("type") != "refresh" or not payload.get("fam"):
+        return False
+    with Session(engine) as session:
+        _revoke(session, payload["fam"], datetime.utcfromtimestamp(payload["exp"]))
+    return True
+
+def purge_expired_families(older_than: timedelta = timedelta(days=1)) -> int:
+    """Delete families whose tokens expired more than `older_than` ago"""
+    with Session(engine) as session:
+        result = session.execute(
+            delete(RefreshTokenFamily).where(RefreshTokenFamily.expires_at < datetime.utcnow() - older_than)
+        )
+        session.commit()
+        return result.rowcount
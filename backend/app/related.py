@@ -0,0 +1,238 @@
+import os
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, tuple_
+from sqlmodel import Session, select
+
+from .models import ContentType, Dataset, EconomicReport, RelatedContent
+from .search import tokenize
+
+# Related content: reports and datasets share one space of hashed TF-IDF
+# vectors, and each keeps its top RELATED_TOP_K neighbours of either type in
+# the relatedcontent table. Pages read that table; the vectors and cosine
+# products only run in the background job that keeps it current.
+
+RELATED_TOP_K = int(os.getenv("RELATED_TOP_K", "5"))
+RELATED_MIN_SCORE = float(os.getenv("RELATED_MIN_SCORE", "0.05"))
+
+RELATED_TYPES = (ContentType.REPORT, ContentType.DATASET)
+
+DocKey = Tuple[ContentType, int]
+
+_HASH_BITS = 20
+_MIN_TOKEN_LENGTH = 3
+# Terms in more than this share of documents say nothing about similarity
+# and would make every posting list long; applied once the corpus is big enough
+_MAX_DF = 0.5
+_MAX_DF_MIN_DOCS = 20
+# Score matrix entries per batch (8 bytes each)
+_BATCH_CELLS = 1 << 22
+# Above this share of changed documents, recompute every list
+_FULL_REBUILD_SHARE = 0.25
+
+def _terms(text: str) -> Counter:
+    """Hashed bag of words: crc32 buckets of the folded tokens"""
+    return Counter(
+        zlib.crc32(token.encode("utf-8")) >> (32 - _HASH_BITS)
+        for token in tokenize(text)
+        if len(token) >= _MIN_TOKEN_LENGTH and not token.isdigit()
+    )
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + length) for each pair"""
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(total)
+
+class Corpus:
+    """
+    L2-normalised TF-IDF vectors of every report and dataset, held as a
+    sparse matrix in both row (CSR) and column (CSC) order. Similarities for
+    a batch of documents are one sparse product: each query term gathers its
+    posting range from the CSC arrays, and bincount adds the products into a
+    dense batch x corpus score matrix. Only co-occurring terms cost anything.
+    """
+
+    def __init__(self, keys: List[DocKey], texts: List[str]):
+        self.keys = keys
+        self.index = {key: i for i, key in enumerate(keys)}
+        self.types = np.array([RELATED_TYPES.index(content_type) for content_type, _ in keys], dtype=np.int8)
+        n = len(keys)
+
+        rows, terms, counts = [], [], []
+        for i, text in enumerate(texts):
+            for term, count in _terms(text).items():
+                rows.append(i)
+                terms.append(term)
+                counts.append(count)
+        rows = np.array(rows, dtype=np.int64)
+        counts = np.array(counts, dtype=np.float64)
+        _, cols, df = np.unique(np.array(terms, dtype=np.int64), return_inverse=True, return_counts=True)
+
+        weights = (1 + np.log(counts)) * (np.log((1 + n) / (1 + df)) + 1)[cols]
+        if n >= _MAX_DF_MIN_DOCS:
+            keep = df[cols] <= _MAX_DF * n
+            rows, cols, weights = rows[keep], cols[keep], weights[keep]
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=n))
+        weights = weights / norms[rows]
+
+        # Rows were appended in document order, so they are already CSR
+        self.row_ptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n))))
+        self.row_cols, self.row_weights = cols, weights
+        order = np.argsort(cols, kind="stable")
+        self.col_ptr = np.concatenate(([0], np.cumsum(np.bincount(cols, minlength=len(df)))))
+        self.col_docs, self.col_weights = rows[order], weights[order]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def similarities(self, docs: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each of `docs` (indices) to every document"""
+        n = len(self.keys)
+        starts = self.row_ptr[docs]
+        lengths = self.row_ptr[docs + 1] - starts
+        query = _ranges(starts, lengths)
+        query_rows = np.repeat(np.arange(len(docs)), lengths)
+        query_cols, query_weights = self.row_cols[query], self.row_weights[query]
+
+        posting_starts = self.col_ptr[query_cols]
+        posting_lengths = self.col_ptr[query_cols + 1] - posting_starts
+        postings = _ranges(posting_starts, posting_lengths)
+        cells = np.repeat(query_rows, posting_lengths) * n + self.col_docs[postings]
+        products = np.repeat(query_weights, posting_lengths) * self.col_weights[postings]
+        return np.bincount(cells, products, minlength=len(docs) * n).reshape(len(docs), n)
+
+    def batches(self, docs: Iterable[int]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """(doc indices, similarity rows) in batches of bounded size"""
+        docs = np.fromiter(docs, dtype=np.int64)
+        size = max(1, _BATCH_CELLS // max(1, len(self.keys)))
+        for lo in range(0, len(docs), size):
+            batch = docs[lo:lo + size]
+            yield batch, self.similarities(batch)
+
+    def neighbours(self, docs: Iterable[int]) -> Iterator[Dict[str, Any]]:
+        """relatedcontent rows for `docs`: the top RELATED_TOP_K of each type"""
+        columns = [np.flatnonzero(self.types == code) for code in range(len(RELATED_TYPES))]
+        for batch, scores in self.batches(docs):
+            scores[np.arange(len(batch)), batch] = -1.0  # not related to itself
+            for code, related_type in enumerate(RELATED_TYPES):
+                candidates = columns[code]
+                k = min(RELATED_TOP_K, len(candidates))
+                if not k:
+                    continue
+                sub = scores[:, candidates]
+                top = np.argpartition(-sub, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(sub, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind="stable")
+                top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+                for row, doc in enumerate(batch):
+                    content_type, content_id = self.keys[doc]
+                    rank = 0
+                    for column, score in zip(top[row], top_scores[row]):
+                        if score < RELATED_MIN_SCORE:
+                            break
+                        yield {
+                            "content_type": content_type, "content_id": content_id,
+                            "related_type": related_type, "rank": rank,
+                            "related_id": self.keys[candidates[column]][1], "score": float(score),
+                        }
+                        rank += 1
+
+def load_corpus(session: Session) -> Corpus:
+    """Every report (title and content) and dataset (name and description), two queries"""
+    reports = session.execute(select(EconomicReport.id, EconomicReport.title, EconomicReport.content)).all()
+    datasets = session.execute(select(Dataset.id, Dataset.name, Dataset.description)).all()
+    keys = [(ContentType.REPORT, i) for i, _, _ in reports] + [(ContentType.DATASET, i) for i, _, _ in datasets]
+    texts = [f"{title}\n{content}" for _, title, content in reports]
+    texts += [f"{name}\n{description}" for _, name, description in datasets]
+    return Corpus(keys, texts)
+
+def _affected(session: Session, corpus: Corpus, changed: Set[DocKey]) -> Set[int]:
+    """
+    Documents whose neighbour lists a change can alter: the changed ones,
+    those listing a changed one (its score moved, or it is gone), and those
+    a changed one now outscores.
+    """
+    affected = {corpus.index[key] for key in changed if key in corpus.index}
+    listing = session.execute(
+        select(RelatedContent.content_type, RelatedContent.content_id)
+        .where(tuple_(RelatedContent.related_type, RelatedContent.related_id).in_(list(changed)))
+        .distinct()
+    ).all()
+    affected.update(corpus.index[key] for key in map(tuple, listing) if key in corpus.index)
+
+    present = sorted(corpus.index[key] for key in changed if key in corpus.index)
+    if not present:
+        return affected
+    # Score a newcomer must beat, per document and related type
+    n = len(corpus)
+    thresholds = np.full((len(RELATED_TYPES), n), RELATED_MIN_SCORE)
+    full = session.execute(
+        select(RelatedContent.content_type, RelatedContent.content_id, RelatedContent.related_type,
+               func.min(RelatedContent.score))
+        .group_by(RelatedContent.content_type, RelatedContent.content_id, RelatedContent.related_type)
+        .having(func.count() >= RELATED_TOP_K)
+    ).all()
+    for content_type, content_id, related_type, lowest in full:
+        doc = corpus.index.get((content_type, content_id))
+        if doc is not None:
+            thresholds[RELATED_TYPES.index(related_type), doc] = lowest
+    for batch, scores in corpus.batches(present):
+        beats = scores >= thresholds[corpus.types[batch]]
+        beats[np.arange(len(batch)), batch] = False
+        affected.update(np.flatnonzero(beats.any(axis=0)).tolist())
+    return affected
+
+def update_related(session: Session, changed: Optional[Iterable[DocKey]] = None) -> Dict[str, int]:
+    """
+    Recompute the neighbour lists `changed` documents (created, edited or
+    deleted) can affect, or every list when `changed` is None. Commits.
+    """
+    corpus = load_corpus(session)
+    changed = None if changed is None else set(changed)
+    if changed is not None and len(changed) <= _FULL_REBUILD_SHARE * max(1, len(corpus)):
+        affected = _affected(session, corpus, changed)
+        stale = {corpus.keys[doc] for doc in affected} | changed
+    else:
+        affected, stale = set(range(len(corpus))), None
+
+    if stale is None:
+        session.execute(delete(RelatedContent))
+    else:
+        for content_type in RELATED_TYPES:
+            ids = [content_id for key_type, content_id in stale if key_type == content_type]
+            if ids:
+                session.execute(delete(RelatedContent).where(
+                    RelatedContent.content_type == content_type, RelatedContent.content_id.in_(ids)
+                ))
+    rows = list(corpus.neighbours(sorted(affected)))
+    if rows:
+        session.execute(insert(RelatedContent), rows)
+    session.commit()
+    return {"documents": len(corpus), "updated": len(affected), "neighbours": len(rows)}
+
+def related_items(session: Session, content_type: ContentType, content_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """The stored neighbours of one item with their titles, one query"""
+    rows = session.execute(
+        select(RelatedContent.related_type, RelatedContent.related_id, RelatedContent.score,
+               EconomicReport.title, Dataset.name)
+        .outerjoin(EconomicReport, (RelatedContent.related_type == ContentType.REPORT)
+                   & (EconomicReport.id == RelatedContent.related_id))
+        .outerjoin(Dataset, (RelatedContent.related_type == ContentType.DATASET)
+                   & (Dataset.id == RelatedContent.related_id))
+        .where(RelatedContent.content_type == content_type, RelatedContent.content_id == content_id)
+        .order_by(RelatedContent.related_type, RelatedContent.rank)
+    ).all()
+    related: Dict[str, List[Dict[str, Any]]] = {"reports": [], "datasets": []}
+    for related_type, related_id, score, title, name in rows:
+        # Items deleted since the last update are skipped until it runs again
+        if related_type == ContentType.REPORT and title is not None:
+            related["reports"].append({"id": related_id, "title": title, "score": round(score, 4)})
+        elif related_type == ContentType.DATASET and name is not None:
+            related["datasets"].append({"id": related_id, "name": name, "score": round(score, 4)})
+    return related
@@ -0,0 +1,334 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Column, Date, MetaData, String, Table, delete, insert, literal, or_, update
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, select
+
+from .metrics import record_cache
+from .models import Observation, ObservationVintage, Series, SeriesFrequency
+from .rollups import Group, group_of, update_rollups
+from .series import MONTHS, month_of, month_start, open_series_files, parse_period, period_labels, to_months
+from .series_store import series_store
+
+# Largest number of cached GET /datasets/{id}/series responses per process
+SERIES_CACHE_SIZE = int(os.getenv("SERIES_CACHE_SIZE", "256"))
+# Releases ingested by other worker processes become visible after this long (seconds)
+SERIES_CACHE_TTL = float(os.getenv("SERIES_CACHE_TTL", "60"))
+
+# Observations are diffed in chunks of one calendar year: a chunk whose hash
+# matches the stored one is skipped without comparing its values
+CHUNK_MONTHS = 12
+
+# Keys of the observations a release revises. Staged in a per-connection temp
+# table and joined, rather than bound into an IN list: a large revision would
+# pass SQLite's limit on bound variables.
+_revised_keys = Table(
+    "release_revised_keys", MetaData(),
+    Column("series_id", String, primary_key=True),
+    Column("period", Date, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+def parse_release_csv(text: str) -> List[Tuple[str, str, float]]:
+    """Read `series_id,period,value` rows (header optional, blank values skipped)"""
+    rows = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not row or not row[0].strip():
+            continue
+        if len(row) < 3:
+            raise ValueError(f"Line {line_no}: expected series_id,period,value")
+        if line_no == 1 and not row[1].strip()[:1].isdigit():
+            continue  # header
+        if not row[2].strip():
+            continue
+        try:
+            rows.append((row[0].strip(), row[1].strip(), float(row[2])))
+        except ValueError as exc:
+            raise ValueError(f"Line {line_no}: {exc}") from None
+    return rows
+
+def chunk_digests(months: np.ndarray, values: np.ndarray) -> Dict[int, bytes]:
+    """Hash of each year's periods and values, keyed by chunk number"""
+    if len(months) == 0:
+        return {}
+    keys, starts = np.unique(months // CHUNK_MONTHS, return_index=True)
+    ends = np.r_[starts[1:], len(months)]
+    return {
+        int(key): hashlib.blake2b(
+            months[lo:hi].astype("<i8").tobytes() + values[lo:hi].astype("<f8").tobytes(), digest_size=16
+        ).digest()
+        for key, lo, hi in zip(keys, starts, ends)
+    }
+
+def diff_release(stored_months: np.ndarray, stored_values: np.ndarray,
+                 months: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compare sorted incoming observations with the stored ones.
+    Returns boolean masks over the incoming rows: new periods, and revised values.
+    """
+    stored = chunk_digests(stored_months, stored_values)
+    incoming = chunk_digests(months, values)
+    changed_chunks = [key for key, digest in incoming.items() if stored.get(key) != digest]
+    candidate = np.isin(months // CHUNK_MONTHS, changed_chunks)
+
+    new = np.zeros(len(months), dtype=bool)
+    revised = np.zeros(len(months), dtype=bool)
+    if not candidate.any():
+        return new, revised
+    if len(stored_months) == 0:
+        return candidate, revised
+
+    positions = np.searchsorted(stored_months, months)
+    clipped = np.minimum(positions, len(stored_months) - 1)
+    exists = stored_months[clipped] == months
+    new = candidate & ~exists
+    revised = candidate & exists & (stored_values[clipped] != values)
+    return new, revised
+
+class SeriesCache:
+    """
+    LRU cache of series responses that remembers which series and month range
+    each entry covers, so a release drops only the entries it touched.
+    Entries pinned to an `as_of` before the release stay valid.
+    """
+
+    def __init__(self, size: int = SERIES_CACHE_SIZE, ttl: float = SERIES_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (series ids, first month, last month, as_of, stored at, payload)
+        self._entries: "OrderedDict[Any, Tuple]" = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[4] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_cache("series", entry is not None)
+        return entry[5] if entry is not None else None
+
+    def put(self, key, series_ids: Sequence[str], first: Optional[int], last: Optional[int],
+            as_of: Optional[datetime], payload: Any) -> None:
+        with self._lock:
+            self._entries[key] = (frozenset(series_ids), first, last, as_of, time.monotonic(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, changes: Dict[str, Tuple[int, int]], released_at: datetime) -> int:
+        """Drop entries overlapping any changed (series, first month, last month); returns how many"""
+        dropped = []
+        with self._lock:
+            for key, (series_ids, first, last, as_of, _, _) in self._entries.items():
+                if as_of is not None and as_of < released_at:
+                    continue
+                for series_id in series_ids & changes.keys():
+                    lo, hi = changes[series_id]
+                    if (first is None or hi >= first) and (last is None or lo <= last):
+                        dropped.append(key)
+                        break
+            for key in dropped:
+                del self._entries[key]
+        return len(dropped)
+
+    def invalidate_series(self, series_id: str) -> None:
+        """Drop every entry for a series whose whole history was replaced"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if series_id in entry[0]]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# Global cache of GET /datasets/{id}/series responses
+series_cache = SeriesCache()
+
+def ingest_release(session: Session, rows: Sequence[Tuple[str, str, float]],
+                   dataset_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Apply a statistical release incrementally.
+
+    Periods not stored yet are appended; stored periods whose value changed
+    are revised, with the previous value kept as a vintage. Periods missing
+    from the release are left alone, so partial releases are fine. Unchanged
+    years are skipped by comparing chunk hashes against the store files.
+    Rollup cells of the changed years are recomputed in the same transaction.
+
+    The write is a fixed number of statements however large the release.
+    """
+    series_ids = sorted({series_id for series_id, _, _ in rows})
+    query = select(Series).where(Series.id.in_(series_ids))
+    if dataset_id is not None:
+        query = query.where(Series.dataset_id == dataset_id)
+    metas = {series.id: series for series in session.exec(query).all()}
+    unknown = [series_id for series_id in series_ids if series_id not in metas]
+
+    by_series: Dict[str, Dict[date, float]] = {}
+    for series_id, period, value in rows:
+        if series_id in metas:
+            by_series.setdefault(series_id, {})[parse_period(period, metas[series_id].frequency)] = value
+
+    now = datetime.utcnow()
+    appended: List[Dict[str, Any]] = []
+    revised: List[Dict[str, Any]] = []
+    merged: Dict[str, Tuple[SeriesFrequency, np.ndarray, np.ndarray]] = {}
+    changes: Dict[str, Tuple[int, int]] = {}
+    rollup_groups: Dict[Group, Set[int]] = {}
+    files = open_series_files(session, [metas[series_id] for series_id in by_series])
+    for series_id, observations in by_series.items():
+        periods = sorted(observations)
+        months = to_months(np.array(periods, dtype="datetime64[D]"))
+        values = np.array([observations[period] for period in periods], dtype=np.float64)
+        stored = files[series_id]
+        new_mask, revised_mask = diff_release(stored.months, stored.values, months, values)
+        if not new_mask.any() and not revised_mask.any():
+            continue
+
+        appended.extend(
+            {"series_id": series_id, "period": month_start(month), "value": value, "valid_from": now}
+            for month, value in zip(months[new_mask].tolist(), values[new_mask].tolist())
+        )
+        revised.extend(
+            {"series_id": series_id, "period": month_start(month), "value": value, "valid_from": now}
+            for month, value in zip(months[revised_mask].tolist(), values[revised_mask].tolist())
+        )
+        changed = months[new_mask | revised_mask]
+        changes[series_id] = (int(changed[0]), int(changed[-1]))
+        rollup_groups.setdefault(group_of(metas[series_id]), set()).update((changed // 12 + 1970).tolist())
+
+        all_months = np.concatenate([stored.months, months[new_mask]])
+        all_values = np.concatenate([stored.values, values[new_mask]])
+        if revised_mask.any():
+            all_values[np.searchsorted(stored.months, months[revised_mask])] = values[revised_mask]
+        order = np.argsort(all_months, kind="stable")
+        merged[series_id] = (metas[series_id].frequency, all_months[order], all_values[order])
+
+    if revised:
+        # Archive the values being replaced, then overwrite them in place
+        session.execute(CreateTable(_revised_keys, if_not_exists=True))
+        session.execute(insert(_revised_keys), [
+            {"series_id": row["series_id"], "period": row["period"]} for row in revised
+        ])
+        session.execute(
+            insert(ObservationVintage).from_select(
+                ["series_id", "period", "value", "valid_from", "valid_to"],
+                select(
+                    Observation.series_id, Observation.period, Observation.value,
+                    Observation.valid_from, literal(now),
+                ).join(
+                    _revised_keys,
+                    (_revised_keys.c.series_id == Observation.series_id)
+                    & (_revised_keys.c.period == Observation.period),
+                ),
+            )
+        )
+        session.execute(delete(_revised_keys))
+        session.execute(update(Observation), revised)
+    if appended:
+        session.execute(insert(Observation), appended)
+    if changes:
+        session.execute(update(Series).where(Series.id.in_(list(changes))).values(updated_at=now))
+        update_rollups(session, rollup_groups, {
+            series_id: (months, values) for series_id, (_, months, values) in merged.items()
+        })
+    session.commit()
+
+    for series_id, (frequency, months, values) in merged.items():
+        series_store.write(series_id, frequency, months, values)
+    dropped = series_cache.invalidate(changes, now) if changes else 0
+
+    return {
+        "released_at": now.isoformat(),
+        "series": len(by_series),
+        "changed_series": sorted(changes),
+        "appended": len(appended),
+        "revised": len(revised),
+        "unknown_series": unknown,
+        "cache_entries_dropped": dropped,
+    }
+
+def load_as_of(session: Session, metas: Sequence[Series], as_of: datetime,
+               start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Observations of `metas` as they were published at `as_of`, in two queries:
+    current values already published by then, plus vintages still valid then.
+    The vintage query is bounded by the (series_id, valid_to) interval index,
+    so it only reads values revised after `as_of`.
+    """
+    series_ids = [meta.id for meta in metas]
+    current = select(Observation.series_id, Observation.period, Observation.value).where(
+        Observation.series_id.in_(series_ids),
+        or_(Observation.valid_from.is_(None), Observation.valid_from <= as_of),
+    )
+    vintages = select(ObservationVintage.series_id, ObservationVintage.period, ObservationVintage.value).where(
+        ObservationVintage.series_id.in_(series_ids),
+        ObservationVintage.valid_to > as_of,
+        or_(ObservationVintage.valid_from.is_(None), ObservationVintage.valid_from <= as_of),
+    )
+    if start:
+        current = current.where(Observation.period >= month_start(month_of(start)))
+        vintages = vintages.where(ObservationVintage.period >= month_start(month_of(start)))
+    if end:
+        current = current.where(Observation.period <= end)
+        vintages = vintages.where(ObservationVintage.period <= end)
+
+    by_series: Dict[str, Dict[date, float]] = {series_id: {} for series_id in series_ids}
+    for series_id, period, value in session.execute(current).all():
+        by_series[series_id][period] = value
+    # A period can have several vintages after as_of; the earliest-ending one was valid then
+    for series_id, period, value in session.execute(vintages.order_by(ObservationVintage.valid_to.desc())).all():
+        by_series[series_id][period] = value
+
+    result = {}
+    for series_id, observations in by_series.items():
+        periods = sorted(observations)
+        result[series_id] = (
+            to_months(np.array(periods, dtype="datetime64[D]")),
+            np.array([observations[period] for period in periods], dtype=np.float64),
+        )
+    return result
+
+def dataset_series(session: Session, dataset_id: int, as_of: Optional[datetime] = None,
+                   start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Any]:
+    """Every series of a dataset with its observations, current or as of a past time"""
+    metas = session.exec(select(Series).where(Series.dataset_id == dataset_id).order_by(Series.id)).all()
+    first = month_of(start) if start else None
+    last = month_of(end) if end else None
+    if as_of is None:
+        data = {}
+        files = open_series_files(session, metas)
+        for meta in metas:
+            series_file = files[meta.id]
+            lo, hi = series_file.bounds(first, last)
+            data[meta.id] = (series_file.months[lo:hi], series_file.values[lo:hi])
+    else:
+        data = load_as_of(session, metas, as_of, start, end)
+
+    return {
+        "dataset_id": dataset_id,
+        "as_of": as_of.isoformat() if as_of else None,
+        "series": [
+            {
+                "id": meta.id,
+                "name": meta.name,
+                "frequency": meta.frequency.value,
+                "unit": meta.unit,
+                "periods": period_labels(data[meta.id][0] // MONTHS[meta.frequency], meta.frequency),
+                "values": data[meta.id][1].tolist(),
+            }
+            for meta in metas
+        ],
+    }
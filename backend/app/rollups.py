@@ -0,0 +1,235 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import Column, Integer, MetaData, String, Table, delete, exists, func, insert, or_
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, select
+
+from .models import ObservationRollup, Series
+from .series import open_series_files
+
+# Observation rollups: a small cube of per-year aggregates keyed by
+# (indicator, region, sector, year). Each cell keeps count, sum, min, max
+# and a fixed-size quantile sketch, so any coarser grouping is a merge of
+# cells. Cells are recomputed only for the series groups and years a write
+# touches, inside the same transaction as the write.
+
+Group = Tuple[str, str, str]  # (indicator, region, sector)
+
+GROUP_BY_FIELDS = ("indicator", "region", "sector", "year")
+BASIC_STATS = ("count", "sum", "mean", "min", "max")
+_PERCENTILE = re.compile(r"^p(\d{1,2}(?:\.\d+)?|100)$")
+
+# Centroids per cell sketch. A cell with at most this many values keeps them
+# all, so its percentiles are exact; larger cells keep the means of
+# SKETCH_SIZE runs of their sorted values (at most 1 KB a cell).
+SKETCH_SIZE = 64
+
+# Groups and cells being recomputed, staged for the joins in update_rollups
+# so the number of keys is not bounded by SQLite's bound-variable limit. A
+# NULL year stands for every year of the group.
+_rollup_keys = Table(
+    "rollup_keys", MetaData(),
+    Column("indicator", String, nullable=False),
+    Column("region", String, nullable=False),
+    Column("sector", String, nullable=False),
+    Column("year", Integer),
+    prefixes=["TEMPORARY"],
+)
+
+def make_sketch(sorted_values: np.ndarray) -> bytes:
+    """Sketch of one cell: (mean, weight) float64 pairs, ascending by mean"""
+    if len(sorted_values) <= SKETCH_SIZE:
+        means, weights = sorted_values, np.ones(len(sorted_values))
+    else:
+        # Runs shrink towards both ends (t-digest's arcsine scale), so tail
+        # percentiles stay close
+        edges = (1 - np.cos(np.pi * np.arange(SKETCH_SIZE) / SKETCH_SIZE)) / 2
+        starts = np.unique((edges * len(sorted_values)).astype(np.int64))
+        weights = np.diff(np.append(starts, len(sorted_values))).astype(np.float64)
+        means = np.add.reduceat(sorted_values, starts) / weights
+    return np.column_stack((means, weights)).astype("<f8").tobytes()
+
+def sketch_percentile(sketches: Sequence[np.ndarray], q: float, minimum: float, maximum: float) -> float:
+    """
+    Percentile of merged (mean, weight) sketches, interpolated as
+    np.percentile does: each centroid stands at the middle rank of the values
+    it summarises, and min and max pin the ends. Matches np.percentile when
+    no cell was summarised.
+    """
+    merged = np.concatenate(sketches)
+    merged = merged[np.argsort(merged[:, 0], kind="stable")]
+    means, weights = merged[:, 0], merged[:, 1]
+    ends = np.cumsum(weights)
+    ranks = ends - (weights + 1) / 2  # 0-based rank of each centroid's middle value
+    total = ends[-1]
+    points = np.concatenate(([0.0], ranks, [total - 1]))
+    levels = np.concatenate(([minimum], means, [maximum]))
+    return float(np.interp(q / 100 * (total - 1), points, levels))
+
+def group_of(series: Series) -> Group:
+    return (series.indicator, series.region, series.sector or "")
+
+def parse_stats(stats: str) -> List[str]:
+    """Validate a comma-separated stats list: count, sum, mean, min, max, median, p0-p100"""
+    names = [name.strip().lower() for name in stats.split(",") if name.strip()]
+    for name in names:
+        if name not in BASIC_STATS and name != "median" and not _PERCENTILE.match(name):
+            raise ValueError(f"Unknown statistic '{name}'")
+    return list(dict.fromkeys(names))
+
+def build_cells(group: Group, arrays: Iterable[Tuple[np.ndarray, np.ndarray]],
+                years: Optional[Set[int]] = None) -> List[Dict[str, Any]]:
+    """Rollup rows of one group from its series' (months, values) arrays"""
+    arrays = [(months, values) for months, values in arrays if len(months)]
+    if not arrays:
+        return []
+    cell_years = np.concatenate([months // 12 + 1970 for months, _ in arrays])
+    values = np.concatenate([values for _, values in arrays])
+    if years is not None:
+        keep = np.isin(cell_years, list(years))
+        cell_years, values = cell_years[keep], values[keep]
+    order = np.lexsort((values, cell_years))
+    cell_years, values = cell_years[order], values[order]
+
+    keys, starts, counts = np.unique(cell_years, return_index=True, return_counts=True)
+    indicator, region, sector = group
+    return [
+        {
+            "indicator": indicator, "region": region, "sector": sector, "year": int(year),
+            "count": int(count), "total": float(values[lo:lo + count].sum()),
+            "min_value": float(values[lo]), "max_value": float(values[lo + count - 1]),
+            "sketch": make_sketch(values[lo:lo + count]),
+        }
+        for year, lo, count in zip(keys, starts, counts)
+    ]
+
+def update_rollups(session: Session, groups: Dict[Group, Optional[Set[int]]],
+                   overrides: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None) -> int:
+    """
+    Recompute the rollup cells of `groups`: only the given years, or every
+    year when the set is None. `overrides` supplies (months, values) for
+    series written in the current transaction, ahead of their store files.
+    Does not commit. Returns the number of cells written.
+    """
+    if not groups:
+        return 0
+    overrides = overrides or {}
+    keys = []
+    for (indicator, region, sector), years in groups.items():
+        key = {"indicator": indicator, "region": region, "sector": sector}
+        keys.extend([{**key, "year": None}] if years is None else [{**key, "year": year} for year in years])
+    staged = _rollup_keys.c
+    session.execute(CreateTable(_rollup_keys, if_not_exists=True))
+    session.execute(insert(_rollup_keys), keys)
+
+    members = session.exec(
+        select(Series).where(
+            exists().where(
+                staged.indicator == Series.indicator,
+                staged.region == Series.region,
+                staged.sector == func.coalesce(Series.sector, ""),
+            )
+        )
+    ).all()
+    files = open_series_files(session, [series for series in members if series.id not in overrides])
+
+    by_group: Dict[Group, List[Tuple[np.ndarray, np.ndarray]]] = {group: [] for group in groups}
+    for series in members:
+        if series.id in overrides:
+            by_group[group_of(series)].append(overrides[series.id])
+        else:
+            by_group[group_of(series)].append((files[series.id].months, files[series.id].values))
+    rows = []
+    for group, years in groups.items():
+        rows.extend(build_cells(group, by_group[group], years))
+
+    session.execute(
+        delete(ObservationRollup).where(
+            exists().where(
+                staged.indicator == ObservationRollup.indicator,
+                staged.region == ObservationRollup.region,
+                staged.sector == ObservationRollup.sector,
+                or_(staged.year.is_(None), staged.year == ObservationRollup.year),
+            )
+        )
+    )
+    session.execute(delete(_rollup_keys))
+    if rows:
+        session.execute(insert(ObservationRollup), rows)
+    return len(rows)
+
+def rebuild_rollups(session: Session) -> int:
+    """Recompute the whole cube from the store files, e.g. for a database that predates it"""
+    groups = session.execute(
+        select(Series.indicator, Series.region, func.coalesce(Series.sector, "")).distinct()
+    ).all()
+    cells = update_rollups(session, {tuple(group): None for group in groups})
+    session.commit()
+    return cells
+
+def aggregate(
+    session: Session,
+    group_by: Sequence[str],
+    stats: Sequence[str],
+    indicators: Sequence[str] = (),
+    regions: Sequence[str] = (),
+    sectors: Sequence[str] = (),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Merge the matching rollup cells into one row per `group_by` key (one query)"""
+    needs_sketch = any(name == "median" or name.startswith("p") for name in stats)
+    columns = [getattr(ObservationRollup, field) for field in group_by] + [
+        ObservationRollup.count, ObservationRollup.total, ObservationRollup.min_value, ObservationRollup.max_value,
+    ]
+    if needs_sketch:
+        columns.append(ObservationRollup.sketch)
+    query = select(*columns)
+    if indicators:
+        query = query.where(ObservationRollup.indicator.in_(indicators))
+    if regions:
+        query = query.where(ObservationRollup.region.in_(regions))
+    if sectors:
+        query = query.where(ObservationRollup.sector.in_(sectors))
+    if year_from is not None:
+        query = query.where(ObservationRollup.year >= year_from)
+    if year_to is not None:
+        query = query.where(ObservationRollup.year <= year_to)
+
+    width = len(group_by)
+    merged: Dict[Tuple, List] = {}
+    for cell in session.exec(query).all():
+        key = tuple(cell[:width])
+        count, total, minimum, maximum = cell[width:width + 4]
+        acc = merged.get(key)
+        if acc is None:
+            acc = merged[key] = [0, 0.0, minimum, maximum, []]
+        acc[0] += count
+        acc[1] += total
+        acc[2] = min(acc[2], minimum)
+        acc[3] = max(acc[3], maximum)
+        if needs_sketch:
+            acc[4].append(np.frombuffer(cell[width + 4], dtype="<f8").reshape(-1, 2))
+
+    results = []
+    for key in sorted(merged):
+        count, total, minimum, maximum, sketches = merged[key]
+        row: Dict[str, Any] = dict(zip(group_by, key))
+        for name in stats:
+            if name == "count":
+                row[name] = count
+            elif name == "sum":
+                row[name] = total
+            elif name == "mean":
+                row[name] = total / count
+            elif name == "min":
+                row[name] = minimum
+            elif name == "max":
+                row[name] = maximum
+            else:
+                q = 50.0 if name == "median" else float(name[1:])
+                row[name] = sketch_percentile(sketches, q, minimum, maximum)
+        results.append(row)
+    return results
@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Query
+from sqlmodel import Session
+from typing import Optional
+from ..db import engine
+from ..query_budget import query_budget
+from ..rollups import GROUP_BY_FIELDS, aggregate, parse_stats
+
+router = APIRouter()
+
+def _split(value: Optional[str]):
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+@router.get("/aggregates")
+@query_budget(1)
+def get_aggregates(
+    group_by: str = Query("region,year", description=f"Comma-separated subset of: {', '.join(GROUP_BY_FIELDS)}"),
+    stats: str = Query("count,sum,mean,min,max", description="count, sum, mean, min, max, median, p0-p100"),
+    indicator: Optional[str] = Query(None, description="Comma-separated indicators"),
+    region: Optional[str] = Query(None, description="Comma-separated regions"),
+    sector: Optional[str] = Query(None, description="Comma-separated sectors"),
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+):
+    """
+    Aggregate observations from the precomputed rollup cube, e.g. region x
+    year for one indicator. One query, however many observations are covered.
+    """
+    fields = list(dict.fromkeys(_split(group_by)))
+    unknown = [field for field in fields if field not in GROUP_BY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by: {', '.join(unknown)}")
+    try:
+        names = parse_stats(stats)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not names:
+        raise HTTPException(status_code=400, detail="No statistics requested")
+    with Session(engine) as session:
+        rows = aggregate(
+            session, fields, names, _split(indicator), _split(region), _split(sector), year_from, year_to,
+        )
+    return {"group_by": fields, "stats": names, "rows": rows}
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select
 from app.models import User, Profile
-from app.auth import get_current_user
+from app.auth import clear_auth_cookies, get_current_user
 from app.db import get_session
+from app.query_budget import query_budget
+from app.refresh_tokens import revoke_refresh_token
 
 router = APIRouter()
 
 @router.get("/api/auth/me")
+@query_budget(2)
 def get_current_user_info(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
@@ -23,8 +26,9 @@ def get_current_user_info(
     }
 
 @router.post("/api/auth/logout")
-def logout():
-    """Logout endpoint - clears session"""
-    # In a real implementation, you might want to blacklist the token
-    # For now, we'll just return success since the client will clear cookies
+@query_budget(1)
+def logout(request: Request, response: Response):
+    """Logout endpoint - revokes the refresh token family and clears the auth cookies"""
+    revoke_refresh_token(request.cookies.get("refresh_token"))
+    clear_auth_cookies(response)
     return {"message": "Logged out successfully"} 
\ No newline at end of file
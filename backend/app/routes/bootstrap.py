@@ -0,0 +1,79 @@
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Response
+from sqlmodel import Session, select
+from ..auth import (
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    CSRF_TOKEN_MAX_AGE,
+    get_token_from_cookie_or_header,
+    set_csrf_cookie,
+    username_from_token,
+)
+from ..db import engine
+from ..models import Profile, User
+from ..query_budget import query_budget
+from .profiles import profile_response, profile_topic_slugs, recommend_dashboards, topics_payload
+
+router = APIRouter()
+
+# How long the client may reuse each part of the payload before asking again.
+# Topics only change when init_db seeds them, so they revalidate by ETag.
+RECOMMENDATIONS_MAX_AGE = 5 * 60
+
+@router.get("/bootstrap")
+@query_budget(4)
+def bootstrap(
+    response: Response,
+    lang: Optional[str] = None,
+    token: Optional[str] = Depends(get_token_from_cookie_or_header),
+):
+    """
+    Everything the app shell needs on first load in one round trip: user,
+    profile, topic catalog, recommendations and a CSRF token, plus a cache
+    hint per part. The token is checked once and the user and profile come
+    from a single query. Anonymous visitors get null user and profile and
+    the default recommendations.
+    """
+    username = username_from_token(token)
+    with Session(engine) as session:
+        user: Optional[User] = None
+        profile: Optional[Profile] = None
+        if username is not None:
+            row = session.exec(
+                select(User, Profile)
+                .outerjoin(Profile, Profile.user_id == User.id)
+                .where(User.username == username)
+            ).first()
+            if row is not None:
+                user, profile = row
+
+        topic_slugs = profile_topic_slugs(session, profile) if profile else []
+        if lang not in ("lt", "en"):
+            lang = profile.language.value if profile else "lt"
+        topics = topics_payload(session, lang)
+        recommendations = recommend_dashboards(session, profile, topic_slugs)
+
+        payload = {
+            "user": {
+                "id": user.id,
+                "username": user.username,
+                "email": user.email,
+                "is_admin": user.is_admin,
+                "created_at": user.created_at,
+            } if user else None,
+            "profile": profile_response(profile, topic_slugs) if profile else None,
+            "topics": json.loads(topics.body),
+            "recommendations": recommendations,
+            "csrf_token": set_csrf_cookie(response),
+            "cache": {
+                "user": {"scope": "private", "max_age": ACCESS_TOKEN_EXPIRE_MINUTES * 60 if user else 0},
+                "profile": {"scope": "private", "max_age": 0},
+                "topics": {"scope": "public", "max_age": 0, "etag": topics.etag, "lang": lang},
+                "recommendations": {"scope": "private", "max_age": RECOMMENDATIONS_MAX_AGE},
+                "csrf_token": {"scope": "private", "max_age": CSRF_TOKEN_MAX_AGE},
+            },
+        }
+
+    # The payload is per user and carries a fresh CSRF token
+    response.headers["Cache-Control"] = "private, no-store"
+    return payload
@@ -1,45 +1,86 @@
-from fastapi import APIRouter, HTTPException
-from sqlmodel import Session, select
-from ..models import Dashboard
+from fastapi import APIRouter, HTTPException, Query
+from sqlmodel import Session
+from typing import Any, Dict, List, Optional
+from ..models import ContentType, Dashboard, check_tags, decode_tags
 from ..db import engine
+from ..projections import as_dicts, parse_fields, select_fields
+from ..deadlines import request_timeout
+from ..query_budget import query_budget
+from ..search import suggest_index
+from ..views import view_counter
 
 router = APIRouter()
 
+# Columns selectable with ?fields=; the list view defaults to the summary
+DASHBOARD_COLUMNS = ("id", "title", "description", "tags", "created_at")
+DASHBOARD_SUMMARY = ("id", "title", "description", "tags")
+
+def _check_tags(tags: Optional[str]) -> None:
+    # Request bodies bound to the table model skip its validators
+    try:
+        check_tags(tags)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+def _dashboard_response(dashboard: Dashboard) -> Dict[str, Any]:
+    # Stored as a JSON string; responses return the decoded array
+    return {**dashboard.model_dump(), "tags": decode_tags(dashboard.tags)}
+
 @router.get("/dashboards")
-def list_dashboards():
+@router.get("/api/dashboards")
+@query_budget(1)
+@request_timeout(5)
+def list_dashboards(
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(DASHBOARD_COLUMNS)}")
+) -> List[Dict[str, Any]]:
+    columns = parse_fields(fields, DASHBOARD_COLUMNS, DASHBOARD_SUMMARY)
     with Session(engine) as session:
-        return session.exec(select(Dashboard)).all()
+        dashboards = as_dicts(session.execute(select_fields(Dashboard, columns)).all(), columns)
+    if "tags" in columns:
+        for dashboard in dashboards:
+            dashboard["tags"] = decode_tags(dashboard["tags"])
+    return dashboards
 
 @router.get("/dashboards/{dashboard_id}")
+@query_budget(1)
 def get_dashboard(dashboard_id: int):
     with Session(engine) as session:
         dashboard = session.get(Dashboard, dashboard_id)
         if not dashboard:
             raise HTTPException(status_code=404, detail="Dashboard not found")
-        return dashboard
+        view_counter.record(ContentType.DASHBOARD, dashboard_id)
+        return _dashboard_response(dashboard)
 
 @router.post("/dashboards", status_code=201)
+@query_budget(2)
 def create_dashboard(dashboard: Dashboard):
+    _check_tags(dashboard.tags)
     with Session(engine) as session:
         session.add(dashboard)
         session.commit()
         session.refresh(dashboard)
-        return dashboard
+        suggest_index.put("dashboard", dashboard.id, dashboard.title)
+        return _dashboard_response(dashboard)
 
 @router.put("/dashboards/{dashboard_id}")
+@query_budget(3)
 def update_dashboard(dashboard_id: int, updated: Dashboard):
+    _check_tags(updated.tags)
     with Session(engine) as session:
         dashboard = session.get(Dashboard, dashboard_id)
         if not dashboard:
             raise HTTPException(status_code=404, detail="Dashboard not found")
         dashboard.title = updated.title
         dashboard.description = updated.description
+        dashboard.tags = updated.tags
         session.add(dashboard)
         session.commit()
         session.refresh(dashboard)
-        return dashboard
+        suggest_index.put("dashboard", dashboard_id, dashboard.title)
+        return _dashboard_response(dashboard)
 
 @router.delete("/dashboards/{dashboard_id}", status_code=204)
+@query_budget(2)
 def delete_dashboard(dashboard_id: int):
     with Session(engine) as session:
         dashboard = session.get(Dashboard, dashboard_id)
@@ -47,4 +88,5 @@ def delete_dashboard(dashboard_id: int):
             raise HTTPException(status_code=404, detail="Dashboard not found")
         session.delete(dashboard)
         session.commit()
+        suggest_index.remove("dashboard", dashboard_id)
         return None 
\ No newline at end of file
@@ -1,21 +1,67 @@
-from fastapi import APIRouter, HTTPException, Query
+from datetime import date as date_type, datetime, timezone
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select
-from typing import Optional, List
-from ..models import Dataset
+from typing import Any, Dict, Optional, List
+from ..auth import get_current_admin
+from ..batch import bulk_create, bulk_update
+from ..deadlines import request_timeout
+from ..models import ContentType, Dataset, User
 from ..db import engine
+from ..projections import as_dicts, parse_fields, select_fields
+from ..query_budget import query_budget
+from ..releases import dataset_series, ingest_release, parse_release_csv, series_cache
+from ..related import related_items
+from ..search import suggest_index
+from ..series import month_of
+from ..tasks import enqueue_dataset_refresh, enqueue_datasets_refresh, enqueue_related_update
+from ..utils.urls import UnsafeURLError, check_url_scheme
+from ..views import view_counter
+from .series import _read_body
 
 router = APIRouter()
 
+# Fields clients may set through the batch endpoints
+DATASET_FIELDS = ("name", "description", "source_url")
+
+# Columns selectable with ?fields=
+DATASET_COLUMNS = ("id", "name", "description", "source_url", "created_at")
+
+def _reindex(items: List[Any], result: Dict[str, Any]) -> None:
+    """Refresh search suggestions and related content for batch items whose text was written"""
+    dataset_ids = []
+    for entry in result["items"]:
+        if entry["status"] == "error":
+            continue
+        item = items[entry["index"]]
+        if "name" in item:
+            suggest_index.put("dataset", entry["id"], item["name"])
+        if "name" in item or "description" in item:
+            dataset_ids.append(entry["id"])
+    if dataset_ids:
+        enqueue_related_update(datasets=dataset_ids)
+
+def _check_source_url(url: Optional[str]) -> None:
+    # Request bodies bound to the table model skip its validators
+    if url:
+        try:
+            check_url_scheme(url)
+        except UnsafeURLError as exc:
+            raise HTTPException(status_code=422, detail=str(exc))
+
 @router.get("/datasets")
+@router.get("/api/datasets")
+@query_budget(1)
 def list_datasets(
     name: Optional[str] = None,
     sort_by: Optional[str] = Query("created_at", enum=["created_at", "name"]),
     sort_order: Optional[str] = Query("desc", enum=["asc", "desc"]),
     limit: int = 10,
-    offset: int = 0
-) -> List[Dataset]:
+    offset: int = 0,
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(DATASET_COLUMNS)}")
+) -> List[Dict[str, Any]]:
+    columns = parse_fields(fields, DATASET_COLUMNS, DATASET_COLUMNS)
     with Session(engine) as session:
-        query = select(Dataset)
+        query = select_fields(Dataset, columns)
         if name:
             query = query.where(Dataset.name.contains(name))
         if sort_by == "created_at":
@@ -24,26 +70,113 @@ def list_datasets(
             order = Dataset.name.desc() if sort_order == "desc" else Dataset.name.asc()
         query = query.order_by(order)
         query = query.offset(offset).limit(limit)
-        return session.exec(query).all()
+        return as_dicts(session.execute(query).all(), columns)
 
 @router.get("/datasets/{dataset_id}")
+@query_budget(2)
 def get_dataset(dataset_id: int):
     with Session(engine) as session:
         dataset = session.get(Dataset, dataset_id)
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
-        return dataset
+        view_counter.record(ContentType.DATASET, dataset_id)
+        return {**dataset.model_dump(), "related": related_items(session, ContentType.DATASET, dataset_id)}
+
+@router.get("/datasets/{dataset_id}/series")
+@query_budget(4)
+def get_dataset_series(
+    dataset_id: int,
+    as_of: Optional[datetime] = Query(None, description="Return values as published at this time"),
+    start: Optional[date_type] = None,
+    end: Optional[date_type] = None,
+):
+    """Observations of every series in a dataset, current or as of an earlier release"""
+    if as_of is not None and as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    key = (dataset_id, as_of, start, end)
+    cached = series_cache.get(key)
+    if cached is not None:
+        return cached
+    with Session(engine) as session:
+        if not session.get(Dataset, dataset_id):
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        payload = dataset_series(session, dataset_id, as_of, start, end)
+    series_cache.put(
+        key, [series["id"] for series in payload["series"]],
+        month_of(start) if start else None, month_of(end) if end else None, as_of, payload,
+    )
+    return payload
+
+@router.post("/datasets/{dataset_id}/releases")
+@query_budget(16)
+@request_timeout(60)
+def post_release(dataset_id: int, body: bytes = Depends(_read_body), admin: User = Depends(get_current_admin)):
+    """
+    Apply a release of the dataset's series (admin only): text/csv
+    `series_id,period,value` rows. New periods are appended and changed
+    values are revised, keeping the old ones as vintages.
+    """
+    with Session(engine) as session:
+        if not session.get(Dataset, dataset_id):
+            raise HTTPException(status_code=404, detail="Dataset not found")
+        try:
+            return ingest_release(session, parse_release_csv(body.decode("utf-8")), dataset_id)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
 
 @router.post("/datasets", status_code=201)
-def create_dataset(dataset: Dataset):
+@query_budget(8)
+def create_dataset(dataset: Dataset, response: Response, admin: User = Depends(get_current_admin)):
+    """Create a dataset (admin only: the server fetches its source_url)"""
+    _check_source_url(dataset.source_url)
     with Session(engine) as session:
         session.add(dataset)
         session.commit()
         session.refresh(dataset)
+        suggest_index.put("dataset", dataset.id, dataset.name)
+        enqueue_related_update(datasets=[dataset.id])
+        if dataset.source_url:
+            # Fetch the source in the background; poll GET /jobs/{id} for progress
+            job = enqueue_dataset_refresh(dataset.id, admin.id)
+            response.headers["X-Job-Id"] = str(job.id)
         return dataset
 
+@router.post("/datasets/batch")
+@query_budget(7)
+def create_datasets_batch(
+    response: Response,
+    items: List[Any] = Body(...),
+    atomic: bool = False,
+    admin: User = Depends(get_current_admin),
+):
+    """Create many datasets in one transaction, with a result per item (admin only)"""
+    with Session(engine) as session:
+        result = bulk_create(session, Dataset, items, DATASET_FIELDS, atomic)
+    _reindex(items, result)
+    # One fan-out job refreshes every new dataset that has a source URL
+    dataset_ids = [
+        item["id"] for item in result["items"]
+        if item["status"] == "created" and items[item["index"]].get("source_url")
+    ]
+    if dataset_ids:
+        job = enqueue_datasets_refresh(dataset_ids, admin.id)
+        response.headers["X-Job-Id"] = str(job.id)
+    return result
+
+@router.patch("/datasets/batch")
+@query_budget(5)
+def update_datasets_batch(items: List[Any] = Body(...), atomic: bool = False, admin: User = Depends(get_current_admin)):
+    """Partially update many datasets by id in one transaction (admin only)"""
+    with Session(engine) as session:
+        result = bulk_update(session, Dataset, items, DATASET_FIELDS, atomic)
+    _reindex(items, result)
+    return result
+
 @router.put("/datasets/{dataset_id}")
-def update_dataset(dataset_id: int, updated: Dataset):
+@query_budget(9)
+def update_dataset(dataset_id: int, updated: Dataset, response: Response, admin: User = Depends(get_current_admin)):
+    """Replace a dataset's fields (admin only: the server fetches its source_url)"""
+    _check_source_url(updated.source_url)
     with Session(engine) as session:
         dataset = session.get(Dataset, dataset_id)
         if not dataset:
@@ -54,9 +187,16 @@ def update_dataset(dataset_id: int, updated: Dataset):
         session.add(dataset)
         session.commit()
         session.refresh(dataset)
+        suggest_index.put("dataset", dataset_id, dataset.name)
+        enqueue_related_update(datasets=[dataset_id])
+        if dataset.source_url:
+            # Refetch from the (possibly new) source; poll GET /jobs/{id} for progress
+            job = enqueue_dataset_refresh(dataset_id, admin.id)
+            response.headers["X-Job-Id"] = str(job.id)
         return dataset
 
 @router.delete("/datasets/{dataset_id}", status_code=204)
+@query_budget(4)
 def delete_dataset(dataset_id: int):
     with Session(engine) as session:
         dataset = session.get(Dataset, dataset_id)
@@ -64,4 +204,6 @@ def delete_dataset(dataset_id: int):
             raise HTTPException(status_code=404, detail="Dataset not found")
         session.delete(dataset)
         session.commit()
+        suggest_index.remove("dataset", dataset_id)
+        enqueue_related_update(datasets=[dataset_id])
         return None 
\ No newline at end of file
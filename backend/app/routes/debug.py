@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+from ..auth import PROFILE_TOKEN_EXPIRE_MINUTES, create_profile_token, get_current_admin
+from ..models import User
+from ..profiling import PROFILE_FORMATS, list_profiles, memory_tracker, profile_path
+from ..query_budget import query_budget
+
+router = APIRouter(prefix="/admin/debug", include_in_schema=False)
+
+@router.post("/profile-token")
+@query_budget(1)
+def issue_profile_token(admin: User = Depends(get_current_admin)):
+    """
+    Issue a short-lived token; requests sending it as the X-Profile header are
+    profiled without another admin lookup (admin only)
+    """
+    return {
+        "header": "X-Profile",
+        "token": create_profile_token(admin.username),
+        "expires_in": PROFILE_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+@router.get("/profiles")
+@query_budget(1)
+def get_profiles(admin: User = Depends(get_current_admin)):
+    """Stored request profiles, newest first (admin only)"""
+    return {"profiles": list_profiles()}
+
+@router.get("/profiles/{profile_id}")
+@query_budget(1)
+def get_profile(
+    profile_id: str,
+    format: str = Query("speedscope", enum=list(PROFILE_FORMATS)),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    One stored profile (admin only): a speedscope file to open at
+    https://www.speedscope.app, or folded stacks for flame graph tools
+    """
+    path = profile_path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "speedscope" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+@router.post("/tracemalloc")
+@query_budget(1)
+def start_tracemalloc(
+    frames: int = Query(1, ge=1, le=25, description="Stack frames kept per allocation"),
+    admin: User = Depends(get_current_admin),
+):
+    """Start tracing allocations in this worker and take the baseline snapshot (admin only)"""
+    memory_tracker.start(frames)
+    return {"tracing": True, "started_at": memory_tracker.started_at}
+
+@router.get("/tracemalloc")
+@query_budget(1)
+def diff_tracemalloc(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", enum=["lineno", "filename", "traceback"]),
+    rebase: bool = Query(False, description="Make this snapshot the baseline for the next diff"),
+    admin: User = Depends(get_current_admin),
+):
+    """Allocation sites that grew most since the baseline snapshot (admin only)"""
+    try:
+        return memory_tracker.diff(limit, group_by, rebase)
+    except RuntimeError:
+        raise HTTPException(status_code=409, detail="tracemalloc is not running; POST to start it")
+
+@router.delete("/tracemalloc", status_code=204)
+@query_budget(1)
+def stop_tracemalloc(admin: User = Depends(get_current_admin)):
+    """Stop tracing and drop the snapshots (admin only)"""
+    memory_tracker.stop()
@@ -0,0 +1,61 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from sqlmodel import Session
+from typing import Any, Dict, Optional
+from ..auth import get_current_admin, get_current_user
+from ..db import engine
+from ..jobs import PRIORITY_NORMAL, _handlers, _load_handlers, enqueue
+from ..models import Job, User
+from ..query_budget import query_budget
+
+router = APIRouter()
+
+class JobRequest(BaseModel):
+    type: str
+    payload: Dict[str, Any] = {}
+    priority: int = PRIORITY_NORMAL
+    delay: float = 0
+
+def _job_response(job: Job) -> Dict[str, Any]:
+    return {
+        "id": job.id,
+        "type": job.type,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "run_at": job.run_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+@router.get("/jobs/{job_id}")
+@query_budget(2)
+def get_job(job_id: int, current_user: User = Depends(get_current_user)):
+    """Get the status of a background job (the user who queued it, or an admin)"""
+    with Session(engine) as session:
+        job = session.get(Job, job_id)
+        # Other users' jobs are reported as missing, not forbidden
+        if not job or (not current_user.is_admin and job.user_id != current_user.id):
+            raise HTTPException(status_code=404, detail="Job not found")
+        return _job_response(job)
+
+@router.post("/jobs", status_code=202)
+@query_budget(3)
+def create_job(job_request: JobRequest, admin: User = Depends(get_current_admin)):
+    """Queue a background job (admin only)"""
+    _load_handlers()
+    if job_request.type not in _handlers:
+        raise HTTPException(status_code=400, detail=f"Unknown job type '{job_request.type}'")
+    job = enqueue(
+        job_request.type,
+        job_request.payload,
+        priority=job_request.priority,
+        delay=job_request.delay,
+        user_id=admin.id,
+    )
+    return _job_response(job)
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from typing import List, Optional
-import json
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlmodel import Session, delete, insert, select
+from typing import Dict, List, Optional
 from datetime import datetime
 
-from ..db import get_session
-from ..models import Profile, Topic, ProfileTopic, User, StakeholderRole, DigestFrequency, Language
+from ..db import engine, get_session
+from ..models import Profile, Topic, ProfileTopic, User, Dashboard, StakeholderRole, DigestFrequency, Language, decode_tags
 from ..auth import get_current_user
+from ..middleware.compression import PrecompressedPayload
+from ..metrics import record_cache
+from ..query_budget import query_budget
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
+# Topic catalog responses per language, encoded and compressed once.
+# Topics are only written by init_db, so entries never go stale.
+_topics_payloads: Dict[str, PrecompressedPayload] = {}
+
 @router.get("/me")
+@query_budget(3)
 async def get_my_profile(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
@@ -26,13 +33,14 @@ async def get_my_profile(
             detail="Profile not found"
         )
     
-    # Get user's topics
-    profile_topics = session.exec(
-        select(ProfileTopic).where(ProfileTopic.profile_id == profile.id)
-    ).all()
-    
-    topic_slugs = [pt.topic_slug for pt in profile_topics]
-    
+    return profile_response(profile, profile_topic_slugs(session, profile))
+
+def profile_topic_slugs(session: Session, profile: Profile) -> List[str]:
+    return list(session.exec(
+        select(ProfileTopic.topic_slug).where(ProfileTopic.profile_id == profile.id)
+    ).all())
+
+def profile_response(profile: Profile, topic_slugs: List[str]) -> Dict:
     return {
         "id": profile.id,
         "user_id": profile.user_id,
@@ -47,6 +55,7 @@ async def get_my_profile(
     }
 
 @router.patch("/me")
+@query_budget(6)
 async def update_my_profile(
     profile_data: dict,
     current_user: User = Depends(get_current_user),
@@ -103,40 +112,55 @@ async def update_my_profile(
     
     # Handle topics if provided
     if "topic_slugs" in profile_data:
-        # Remove existing topics
-        existing_topics = session.exec(
-            select(ProfileTopic).where(ProfileTopic.profile_id == profile.id)
-        ).all()
-        for topic in existing_topics:
-            session.delete(topic)
+        slugs = list(dict.fromkeys(profile_data["topic_slugs"]))
         
-        # Add new topics
-        for slug in profile_data["topic_slugs"]:
-            # Verify topic exists
-            topic = session.exec(select(Topic).where(Topic.slug == slug)).first()
-            if not topic:
+        # Verify all topics exist in a single query
+        known_slugs = set(session.exec(
+            select(Topic.slug).where(Topic.slug.in_(slugs))
+        ).all()) if slugs else set()
+        for slug in slugs:
+            if slug not in known_slugs:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Topic with slug '{slug}' not found"
                 )
-            
-            profile_topic = ProfileTopic(profile_id=profile.id, topic_slug=slug)
-            session.add(profile_topic)
+        
+        if profile.id is None:
+            session.flush()  # Assign an id to a newly created profile
+        
+        # Replace existing topics with one DELETE and one multi-row INSERT
+        session.exec(delete(ProfileTopic).where(ProfileTopic.profile_id == profile.id))
+        if slugs:
+            session.exec(insert(ProfileTopic).values([
+                {"profile_id": profile.id, "topic_slug": slug} for slug in slugs
+            ]))
     
     session.commit()
-    session.refresh(profile)
     
     return {"message": "Profile updated successfully"}
 
 @router.get("/topics")
+@query_budget(1)
 async def get_topics(
+    request: Request,
     session: Session = Depends(get_session),
     lang: str = "lt"
 ):
     """Get all available topics"""
+    lang = "lt" if lang == "lt" else "en"
+    return topics_payload(session, lang).response(request)
+
+def topics_payload(session: Session, lang: str) -> PrecompressedPayload:
+    """The cached topic catalog for a language, built on first use"""
+    payload = _topics_payloads.get(lang)
+    record_cache("topics", payload is not None)
+    if payload is None:
+        payload = _topics_payloads[lang] = _build_topics_payload(session, lang)
+    return payload
+
+def _build_topics_payload(session: Session, lang: str) -> PrecompressedPayload:
     topics = session.exec(select(Topic)).all()
-    
-    return [
+    return PrecompressedPayload.from_json([
         {
             "slug": topic.slug,
             "name": topic.name_lt if lang == "lt" else topic.name_en,
@@ -144,7 +168,13 @@ async def get_topics(
             "icon": topic.icon
         }
         for topic in topics
-    ]
+    ])
+
+def warm_topics_cache():
+    """(Re)build the topic catalog payloads for every language"""
+    with Session(engine) as session:
+        for lang in ("lt", "en"):
+            _topics_payloads[lang] = _build_topics_payload(session, lang)
 
 @router.get("/roles")
 async def get_roles():
@@ -177,6 +207,7 @@ async def get_roles():
     ]
 
 @router.get("/recommendations")
+@query_budget(4)
 async def get_recommendations(
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
@@ -186,6 +217,12 @@ async def get_recommendations(
         select(Profile).where(Profile.user_id == current_user.id)
     ).first()
     
+    if not profile or not profile.onboarding_completed:
+        return recommend_dashboards(session, profile, [])
+    return recommend_dashboards(session, profile, profile_topic_slugs(session, profile))
+
+def recommend_dashboards(session: Session, profile: Optional[Profile], topic_slugs: List[str]) -> List[Dict]:
+    """Top dashboards by overlap with the profile's topics; the first six without onboarding"""
     if not profile or not profile.onboarding_completed:
         # Return default dashboards if no profile or onboarding not completed
         dashboards = session.exec(select(Dashboard).limit(6)).all()
@@ -194,18 +231,13 @@ async def get_recommendations(
                 "id": dashboard.id,
                 "title": dashboard.title,
                 "description": dashboard.description,
-                "tags": json.loads(dashboard.tags) if dashboard.tags else [],
+                "tags": decode_tags(dashboard.tags),
                 "score": 0.0
             }
             for dashboard in dashboards
         ]
     
-    # Get user's topics
-    profile_topics = session.exec(
-        select(ProfileTopic).where(ProfileTopic.profile_id == profile.id)
-    ).all()
-    
-    user_topic_slugs = {pt.topic_slug for pt in profile_topics}
+    user_topic_slugs = set(topic_slugs)
     
     # Get all dashboards
     dashboards = session.exec(select(Dashboard)).all()
@@ -213,7 +245,7 @@ async def get_recommendations(
     # Calculate recommendation scores
     recommendations = []
     for dashboard in dashboards:
-        dashboard_tags = json.loads(dashboard.tags) if dashboard.tags else []
+        dashboard_tags = decode_tags(dashboard.tags)
         
         # Simple TF-IDF inspired scoring
         matching_topics = len(set(dashboard_tags) & user_topic_slugs)
@@ -1,70 +1,313 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Body, HTTPException, Query
+from pydantic import BaseModel
+from datetime import date as date_type
+from sqlalchemy import Integer, cast, delete, extract, func, insert
 from sqlmodel import Session, select
-from typing import Optional, List
-from ..models import EconomicReport
+from typing import Any, Dict, Optional, List
+from ..batch import bulk_create, bulk_update
+from ..catalog import source_catalog
+from ..facets import bitmap, facet_index
+from ..models import ContentType, ContentView, EconomicReport, ReportSource, ReportTopic, Topic
 from ..db import engine
+from ..projections import as_dicts, make_excerpt, parse_fields, select_fields
+from ..deadlines import request_timeout
+from ..query_budget import query_budget
+from ..related import related_items
+from ..search import suggest_index
+from ..tasks import enqueue_related_update
+from ..views import TRENDING_WINDOW_HOURS, trending_scores, view_counter
 
 router = APIRouter()
 
+# Fields clients may set through the batch endpoints
+REPORT_FIELDS = ("title", "content", "date")
+
+# Columns selectable with ?fields=; list views default to the summary
+REPORT_COLUMNS = ("id", "title", "date", "excerpt", "content")
+REPORT_SUMMARY = ("id", "title", "date", "excerpt")
+
+class ReportRequest(BaseModel):
+    title: str
+    content: str
+    date: date_type
+    # Topic slugs and source ids; on update, None leaves the links unchanged
+    topics: Optional[List[str]] = None
+    sources: Optional[List[str]] = None
+
+def _set_excerpt(row: Dict[str, Any]) -> None:
+    row["excerpt"] = make_excerpt(row["content"])
+
+def _split(value: Optional[str]) -> List[str]:
+    """Parse a comma-separated query parameter"""
+    return [part.strip() for part in value.split(",") if part.strip()] if value else []
+
+def _filter(query, title: Optional[str], date: Optional[date_type],
+            date_from: Optional[date_type], date_to: Optional[date_type],
+            topics: List[str] = (), sources: List[str] = ()):
+    """
+    Apply the shared list filters. Date bounds are inclusive; a report
+    matches a topic or source filter if it has any of the listed values.
+    """
+    if title:
+        query = query.where(EconomicReport.title.contains(title))
+    if date:
+        query = query.where(EconomicReport.date == date)
+    if date_from:
+        query = query.where(EconomicReport.date >= date_from)
+    if date_to:
+        query = query.where(EconomicReport.date <= date_to)
+    if topics:
+        query = query.where(EconomicReport.id.in_(
+            select(ReportTopic.report_id).where(ReportTopic.topic_slug.in_(topics))
+        ))
+    if sources:
+        query = query.where(EconomicReport.id.in_(
+            select(ReportSource.report_id).where(ReportSource.source_id.in_(sources))
+        ))
+    return query
+
+def _validate_links(session: Session, topics: List[str], sources: List[str]) -> None:
+    unknown_sources = [source_id for source_id in sources if source_catalog.get(source_id) is None]
+    if unknown_sources:
+        raise HTTPException(status_code=400, detail=f"Unknown source(s): {', '.join(unknown_sources)}")
+    if topics:
+        known = set(session.exec(select(Topic.slug).where(Topic.slug.in_(topics))).all())
+        unknown_topics = [slug for slug in topics if slug not in known]
+        if unknown_topics:
+            raise HTTPException(status_code=400, detail=f"Unknown topic(s): {', '.join(unknown_topics)}")
+
+def _write_links(session: Session, report_id: int, topics: List[str], sources: List[str]) -> None:
+    """Insert report-topic/source rows with one multi-row INSERT each"""
+    if topics:
+        session.execute(insert(ReportTopic).values(
+            [{"report_id": report_id, "topic_slug": slug} for slug in dict.fromkeys(topics)]
+        ))
+    if sources:
+        session.execute(insert(ReportSource).values(
+            [{"report_id": report_id, "source_id": source_id} for source_id in dict.fromkeys(sources)]
+        ))
+
+def _load_links(session: Session, report_id: int) -> Dict[str, List[str]]:
+    return {
+        "topics": list(session.exec(select(ReportTopic.topic_slug).where(ReportTopic.report_id == report_id)).all()),
+        "sources": list(session.exec(select(ReportSource.source_id).where(ReportSource.report_id == report_id)).all()),
+    }
+
+def _reindex(items: List[Any], result: Dict[str, Any]) -> None:
+    """Refresh search suggestions and related content for batch items whose text was written"""
+    report_ids = []
+    for entry in result["items"]:
+        if entry["status"] == "error":
+            continue
+        item = items[entry["index"]]
+        if "title" in item:
+            suggest_index.put("report", entry["id"], item["title"])
+        if "title" in item or "content" in item:
+            report_ids.append(entry["id"])
+    if report_ids:
+        enqueue_related_update(reports=report_ids)
+
+def _report_response(report: EconomicReport, topics: List[str], sources: List[str]) -> Dict[str, Any]:
+    return {**report.model_dump(), "topics": topics, "sources": sources}
+
 @router.get("/reports")
+@router.get("/api/reports")
+@query_budget(1)
+@request_timeout(5)
 def list_reports(
     title: Optional[str] = None,
-    date: Optional[str] = None,
-    sort_by: Optional[str] = Query("date", enum=["date", "title"]),
+    date: Optional[date_type] = None,
+    date_from: Optional[date_type] = None,
+    date_to: Optional[date_type] = None,
+    sort_by: Optional[str] = Query("date", enum=["date", "title", "views"]),
     sort_order: Optional[str] = Query("desc", enum=["asc", "desc"]),
     limit: int = 10,
-    offset: int = 0
-) -> List[EconomicReport]:
+    offset: int = 0,
+    topics: Optional[str] = Query(None, description="Comma-separated topic slugs"),
+    sources: Optional[str] = Query(None, description="Comma-separated source ids"),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(REPORT_COLUMNS)}")
+) -> List[Dict[str, Any]]:
+    columns = parse_fields(fields, REPORT_COLUMNS, REPORT_SUMMARY)
     with Session(engine) as session:
-        query = select(EconomicReport)
-        if title:
-            query = query.where(EconomicReport.title.contains(title))
-        if date:
-            query = query.where(EconomicReport.date == date)
+        query = _filter(select_fields(EconomicReport, columns), title, date, date_from, date_to,
+                        _split(topics), _split(sources))
         if sort_by == "date":
             order = EconomicReport.date.desc() if sort_order == "desc" else EconomicReport.date.asc()
+        elif sort_by == "views":
+            # All-time views, as of the last flush
+            query = query.outerjoin(ContentView, (ContentView.content_type == ContentType.REPORT)
+                                    & (ContentView.content_id == EconomicReport.id))
+            views = func.coalesce(ContentView.views, 0)
+            order = views.desc() if sort_order == "desc" else views.asc()
         else:
             order = EconomicReport.title.desc() if sort_order == "desc" else EconomicReport.title.asc()
         query = query.order_by(order)
         query = query.offset(offset).limit(limit)
-        return session.exec(query).all()
+        return as_dicts(session.execute(query).all(), columns)
+
+@router.get("/reports/timeline")
+@query_budget(1)
+def reports_timeline(
+    interval: str = Query("quarter", enum=["year", "quarter"]),
+    title: Optional[str] = None,
+    date_from: Optional[date_type] = None,
+    date_to: Optional[date_type] = None,
+    topics: Optional[str] = None,
+    sources: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Report counts per year or quarter, computed with one GROUP BY"""
+    year = extract("year", EconomicReport.date)
+    buckets = [year]
+    if interval == "quarter":
+        buckets.append(cast((extract("month", EconomicReport.date) + 2) / 3, Integer))
+    query = _filter(select(*buckets, func.count()), title, None, date_from, date_to,
+                    _split(topics), _split(sources))
+    query = query.group_by(*buckets).order_by(*buckets)
+    with Session(engine) as session:
+        rows = session.execute(query).all()
+    if interval == "quarter":
+        return [{"period": f"{y}-Q{q}", "year": y, "quarter": q, "count": n} for y, q, n in rows]
+    return [{"period": str(y), "year": y, "count": n} for y, n in rows]
+
+@router.get("/reports/facets")
+@query_budget(4)
+def reports_facets(
+    title: Optional[str] = None,
+    date_from: Optional[date_type] = None,
+    date_to: Optional[date_type] = None,
+    topics: Optional[str] = Query(None, description="Comma-separated topic slugs"),
+    sources: Optional[str] = Query(None, description="Comma-separated source ids"),
+    years: Optional[str] = Query(None, description="Comma-separated years"),
+):
+    """Counts per topic, source and year for the current filter, from the bitmap index"""
+    try:
+        selected_years = [int(year) for year in _split(years)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="years must be integers")
+
+    facet_index.ensure_fresh()
+    base = None
+    if title or date_from or date_to:
+        # Free-text and date-range filters come from SQL as one id list
+        with Session(engine) as session:
+            ids = session.exec(_filter(select(EconomicReport.id), title, None, date_from, date_to)).all()
+        base = bitmap(ids)
+    return facet_index.counts(base, _split(topics), _split(sources), selected_years)
+
+@router.get("/reports/trending")
+@query_budget(1)
+def trending_reports(
+    limit: int = Query(10, ge=1, le=100),
+    window_hours: int = Query(TRENDING_WINDOW_HOURS, ge=1, le=TRENDING_WINDOW_HOURS),
+    fields: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(REPORT_COLUMNS)}")
+) -> List[Dict[str, Any]]:
+    """Most viewed reports over the last hours, recent views weighing more"""
+    columns = parse_fields(fields, REPORT_COLUMNS, REPORT_SUMMARY)
+    scores = trending_scores(ContentType.REPORT, window_hours).subquery()
+    query = (
+        select_fields(EconomicReport, columns)
+        .add_columns(scores.c.score)
+        .join(scores, scores.c.content_id == EconomicReport.id)
+        .order_by(scores.c.score.desc())
+        .limit(limit)
+    )
+    with Session(engine) as session:
+        return as_dicts(session.execute(query).all(), columns + ["score"])
 
 @router.get("/reports/{report_id}")
+@query_budget(4)
 def get_report(report_id: int):
     with Session(engine) as session:
         report = session.get(EconomicReport, report_id)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
-        return report
+        view_counter.record(ContentType.REPORT, report_id)
+        return {
+            **report.model_dump(),
+            **_load_links(session, report_id),
+            "related": related_items(session, ContentType.REPORT, report_id),
+        }
 
 @router.post("/reports", status_code=201)
-def create_report(report: EconomicReport):
+@query_budget(7)
+def create_report(report_request: ReportRequest):
+    topics, sources = report_request.topics or [], report_request.sources or []
+    report = EconomicReport(
+        **report_request.model_dump(exclude={"topics", "sources"}),
+        excerpt=make_excerpt(report_request.content),
+    )
     with Session(engine) as session:
+        _validate_links(session, topics, sources)
         session.add(report)
+        session.flush()
+        _write_links(session, report.id, topics, sources)
         session.commit()
         session.refresh(report)
-        return report
+        facet_index.add(report.id, report.date.year, topics, sources)
+        suggest_index.put("report", report.id, report.title)
+        enqueue_related_update(reports=[report.id])
+        return _report_response(report, topics, sources)
+
+@router.post("/reports/batch")
+@query_budget(4)
+def create_reports_batch(items: List[Any] = Body(...), atomic: bool = False):
+    """Create many reports in one transaction, with a result per item"""
+    with Session(engine) as session:
+        result = bulk_create(session, EconomicReport, items, REPORT_FIELDS, atomic, prepare=_set_excerpt)
+    facet_index.invalidate()
+    _reindex(items, result)
+    return result
+
+@router.patch("/reports/batch")
+@query_budget(4)
+def update_reports_batch(items: List[Any] = Body(...), atomic: bool = False):
+    """Partially update many reports by id in one transaction"""
+    with Session(engine) as session:
+        result = bulk_update(session, EconomicReport, items, REPORT_FIELDS, atomic, prepare=_set_excerpt)
+    facet_index.invalidate()
+    _reindex(items, result)
+    return result
 
 @router.put("/reports/{report_id}")
-def update_report(report_id: int, updated: EconomicReport):
+@query_budget(11)
+def update_report(report_id: int, updated: ReportRequest):
     with Session(engine) as session:
         report = session.get(EconomicReport, report_id)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
+        _validate_links(session, updated.topics or [], updated.sources or [])
         report.title = updated.title
         report.content = updated.content
         report.date = updated.date
+        report.excerpt = make_excerpt(updated.content)
         session.add(report)
+        if updated.topics is not None:
+            session.execute(delete(ReportTopic).where(ReportTopic.report_id == report_id))
+            _write_links(session, report_id, updated.topics, [])
+        if updated.sources is not None:
+            session.execute(delete(ReportSource).where(ReportSource.report_id == report_id))
+            _write_links(session, report_id, [], updated.sources)
         session.commit()
         session.refresh(report)
-        return report
+        links = _load_links(session, report_id)
+        facet_index.remove(report_id)
+        facet_index.add(report_id, report.date.year, links["topics"], links["sources"])
+        suggest_index.put("report", report_id, report.title)
+        enqueue_related_update(reports=[report_id])
+        return _report_response(report, links["topics"], links["sources"])
 
 @router.delete("/reports/{report_id}", status_code=204)
+@query_budget(6)
 def delete_report(report_id: int):
     with Session(engine) as session:
         report = session.get(EconomicReport, report_id)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
+        session.execute(delete(ReportTopic).where(ReportTopic.report_id == report_id))
+        session.execute(delete(ReportSource).where(ReportSource.report_id == report_id))
         session.delete(report)
         session.commit()
+        facet_index.remove(report_id)
+        suggest_index.remove("report", report_id)
+        enqueue_related_update(reports=[report_id])
         return None 
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Dict, List, Optional
+from ..query_budget import query_budget
+from ..search import SUGGEST_TYPES, suggest_index
+
+router = APIRouter()
+
+@router.get("/search/suggest")
+@query_budget(4)
+def search_suggest(
+    q: str = Query(..., max_length=100),
+    limit: int = Query(10, ge=1, le=25),
+    types: Optional[str] = Query(None, description=f"Comma-separated subset of: {', '.join(SUGGEST_TYPES)}"),
+) -> List[Dict]:
+    """
+    Search-as-you-type over report, dataset and dashboard titles and topic
+    names (Lithuanian and English). Matching ignores case and diacritics,
+    and every word of `q` matches a word prefix. Served from memory; no
+    queries unless the index needs a rebuild.
+    """
+    selected = [part.strip() for part in types.split(",") if part.strip()] if types else list(SUGGEST_TYPES)
+    unknown = [kind for kind in selected if kind not in SUGGEST_TYPES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown type(s): {', '.join(unknown)}")
+    suggest_index.ensure_fresh()
+    return suggest_index.suggest(q, limit, selected)
@@ -0,0 +1,194 @@
+import json
+from datetime import date as date_type
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from typing import List, Optional
+from ..auth import get_current_admin
+from ..catalog import source_catalog
+from ..db import engine
+from ..deadlines import request_timeout
+from ..models import Aggregation, Series, SeriesFrequency, User
+from ..query_budget import query_budget
+from ..releases import series_cache
+from ..rollups import group_of, update_rollups
+from ..series import (
+    JOIN_METHODS, UPSAMPLE_METHODS, compare, load_series, month_of, open_series, parse_observations_csv,
+    parse_period, replace_observations, series_labels,
+)
+from ..series_store import MEDIA_TYPE
+
+router = APIRouter()
+
+# Most series a single comparison may join
+MAX_COMPARE_SERIES = 12
+
+class SeriesRequest(BaseModel):
+    name: str
+    indicator: str
+    region: str
+    frequency: SeriesFrequency
+    sector: Optional[str] = None
+    unit: Optional[str] = None
+    source_id: Optional[str] = None
+    dataset_id: Optional[int] = None
+    aggregation: Aggregation = Aggregation.MEAN
+
+class ObservationIn(BaseModel):
+    period: str
+    value: float
+
+@router.get("/series")
+@query_budget(1)
+def list_series(
+    indicator: Optional[str] = None,
+    region: Optional[str] = None,
+    dataset_id: Optional[int] = None,
+    source_id: Optional[str] = None,
+) -> List[Series]:
+    with Session(engine) as session:
+        query = select(Series)
+        if indicator:
+            query = query.where(Series.indicator == indicator)
+        if region:
+            query = query.where(Series.region == region)
+        if dataset_id is not None:
+            query = query.where(Series.dataset_id == dataset_id)
+        if source_id:
+            query = query.where(Series.source_id == source_id)
+        return session.exec(query.order_by(Series.id)).all()
+
+@router.get("/series/compare")
+@query_budget(2)
+def compare_series(
+    ids: str = Query(..., description="Comma-separated series ids"),
+    frequency: Optional[SeriesFrequency] = Query(None, description="Defaults to the lowest input frequency"),
+    aggregation: Optional[Aggregation] = Query(None, description="Overrides each series' own rule"),
+    upsample: str = Query("repeat", enum=list(UPSAMPLE_METHODS)),
+    join: str = Query("outer", enum=list(JOIN_METHODS)),
+    start: Optional[date_type] = None,
+    end: Optional[date_type] = None,
+):
+    """Align several series onto one frequency and return them as one matrix"""
+    series_ids = list(dict.fromkeys(part.strip() for part in ids.split(",") if part.strip()))
+    if not series_ids:
+        raise HTTPException(status_code=400, detail="No series ids given")
+    if len(series_ids) > MAX_COMPARE_SERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_COMPARE_SERIES} series can be compared")
+    with Session(engine) as session:
+        try:
+            series = load_series(session, series_ids, start, end)
+        except LookupError as exc:
+            raise HTTPException(status_code=404, detail=str(exc))
+    return compare(series, frequency, aggregation, upsample, join)
+
+@router.get("/series/{series_id}")
+@query_budget(1)
+def get_series(series_id: str):
+    with Session(engine) as session:
+        series = session.get(Series, series_id)
+        if not series:
+            raise HTTPException(status_code=404, detail="Series not found")
+        return series
+
+@router.get("/series/{series_id}/observations")
+@query_budget(2)
+def get_observations(
+    series_id: str,
+    start: Optional[date_type] = None,
+    end: Optional[date_type] = None,
+    format: str = Query("json", enum=["json", "binary"]),
+):
+    """
+    Observations of one series. `format=binary` streams the store file's
+    columns straight from the memory mapping (see "Binary series format").
+    """
+    if format == "binary":
+        with Session(engine) as session:
+            series = session.get(Series, series_id)
+            if not series:
+                raise HTTPException(status_code=404, detail="Series not found")
+            series_file = open_series(session, series)
+        lo, hi = series_file.bounds(month_of(start) if start else None, month_of(end) if end else None)
+        chunks = series_file.buffers(lo, hi)
+        return StreamingResponse(
+            iter(chunks),
+            media_type=MEDIA_TYPE,
+            headers={"Content-Length": str(sum(chunk.nbytes for chunk in chunks))},
+        )
+
+    with Session(engine) as session:
+        try:
+            (data,) = load_series(session, [series_id], start, end)
+        except LookupError:
+            raise HTTPException(status_code=404, detail="Series not found")
+    return {
+        "id": series_id,
+        "frequency": data.meta.frequency.value,
+        "periods": series_labels(data),
+        "values": data.values.tolist(),
+    }
+
+@router.put("/series/{series_id}")
+@query_budget(10)
+def put_series(series_id: str, series_request: SeriesRequest, admin: User = Depends(get_current_admin)):
+    """Create or update series metadata (admin only)"""
+    if series_request.source_id and source_catalog.get(series_request.source_id) is None:
+        raise HTTPException(status_code=400, detail=f"Unknown source '{series_request.source_id}'")
+    with Session(engine) as session:
+        series = session.get(Series, series_id)
+        if series is None:
+            series = Series(id=series_id, **series_request.model_dump())
+        elif series.frequency != series_request.frequency:
+            raise HTTPException(status_code=409, detail="Cannot change the frequency of an existing series")
+        else:
+            old_group = group_of(series)
+            for key, value in series_request.model_dump().items():
+                setattr(series, key, value)
+            if group_of(series) != old_group:
+                # The series' observations move to another rollup group
+                session.add(series)
+                update_rollups(session, {old_group: None, group_of(series): None})
+        session.add(series)
+        session.commit()
+        session.refresh(series)
+    series_cache.clear()  # Dataset membership may have changed
+    return series
+
+async def _read_body(request: Request) -> bytes:
+    return await request.body()
+
+@router.put("/series/{series_id}/observations")
+@query_budget(12)
+@request_timeout(60)
+def put_observations(
+    series_id: str,
+    request: Request,
+    body: bytes = Depends(_read_body),
+    admin: User = Depends(get_current_admin),
+):
+    """
+    Replace all observations of a series (admin only).
+    Accepts text/csv `period,value` rows or a JSON array of {"period", "value"}.
+    """
+    with Session(engine) as session:
+        series = session.get(Series, series_id)
+        if not series:
+            raise HTTPException(status_code=404, detail="Series not found")
+        try:
+            if request.headers.get("content-type", "").startswith("text/csv"):
+                rows = parse_observations_csv(body.decode("utf-8"), series.frequency)
+            else:
+                items = json.loads(body or b"[]")
+                if not isinstance(items, list):
+                    raise ValueError("Expected a JSON array of observations")
+                rows = [
+                    (parse_period(item.period, series.frequency), item.value)
+                    for item in map(ObservationIn.model_validate, items)
+                ]
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        count = replace_observations(session, series, rows)
+    series_cache.invalidate_series(series_id)
+    return {"id": series_id, "observations": count}
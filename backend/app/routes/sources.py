@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Request
+from ..catalog import source_catalog
+
+router = APIRouter()
+
+@router.get("/sources")
+@router.get("/api/sources")
+def get_sources(request: Request):
+    """Return available data sources for reports"""
+    return source_catalog.payload.response(request)
@@ -1,6 +1,9 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import update
 from sqlmodel import Session, select
-from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr
@@ -12,7 +15,6 @@ from ..auth import (
     get_current_user, 
     get_current_user_optional, 
     create_access_token, 
-    create_refresh_token,
     set_auth_cookies,
     clear_auth_cookies,
     SECRET_KEY,
@@ -20,8 +22,11 @@ from ..auth import (
 )
 from ..utils.password import validate_password, hash_password_for_bcrypt
 from ..middleware.rate_limit import rate_limit_login, rate_limit_register
+from ..hashing import hash_password, needs_rehash, verify_password
+from ..metrics import PASSWORD_REHASHES
+from ..query_budget import query_budget
+from ..refresh_tokens import RefreshTokenError, issue_refresh_token, revoke_refresh_token, rotate_refresh_token
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
 router = APIRouter()
@@ -44,22 +49,40 @@ class UserResponse(BaseModel):
     is_admin: bool
     created_at: datetime
 
-def get_password_hash(password: str) -> str:
-    """Hash password using bcrypt"""
-    return pwd_context.hash(password)
+# Rehashes run here rather than in the request or its background tasks:
+# executor threads start with an empty context, so the bcrypt work is outside
+# the request's metrics, query budget, deadline and admission slot. Not a
+# queued job, since the payload would be the plain password.
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-rehash")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+def rehash_password(user_id: int, old_hash: str, password: str) -> None:
+    """
+    Store a hash at the current bcrypt cost. Only replaces `old_hash`, so a
+    password change in the meantime wins.
+    """
+    new_hash = hash_password(password)
+    with Session(engine) as session:
+        result = session.execute(
+            update(User).where(User.id == user_id, User.password_hash == old_hash).values(password_hash=new_hash)
+        )
+        session.commit()
+    if result.rowcount:
+        PASSWORD_REHASHES.inc()
+
+def upgrade_hash_later(user: User, password: str) -> None:
+    """Rehash a verified password off the request if its hash uses a weaker cost"""
+    if needs_rehash(user.password_hash):
+        _rehash_executor.submit(rehash_password, user.id, user.password_hash, password)
 
 @router.post("/users/register", response_model=UserResponse)
+@query_budget(4)
 def register_user(user_data: UserRegisterRequest, request: Request, response: Response):
     """
     Register a new user with enhanced security.
     
     Features:
     - Rate limiting to prevent abuse
-    - Input validation
+    - Input validation and password policy
     - Secure password hashing
     - Duplicate user prevention
     - Automatic login after registration
@@ -75,6 +98,11 @@ def register_user(user_data: UserRegisterRequest, request: Request, response: Re
     if "@" not in user_data.email or "." not in user_data.email:
         raise HTTPException(status_code=400, detail="Invalid email format")
     
+    # Password policy, including the breached-password check
+    policy = validate_password(user_data.password)
+    if not policy["valid"]:
+        raise HTTPException(status_code=400, detail="; ".join(policy["errors"]))
+    
     with Session(engine) as session:
         # Check for existing user
         existing = session.exec(
@@ -94,7 +122,7 @@ def register_user(user_data: UserRegisterRequest, request: Request, response: Re
         user = User(
             username=user_data.username,
             email=user_data.email,
-            password_hash=get_password_hash(user_data.password),
+            password_hash=hash_password(user_data.password),
             is_admin=False  # No automatic admin assignment for security
         )
         
@@ -104,7 +132,7 @@ def register_user(user_data: UserRegisterRequest, request: Request, response: Re
         
         # Automatically log in the user after registration
         access_token = create_access_token(data={"sub": user.username, "email": user.email})
-        refresh_token = create_refresh_token(data={"sub": user.username, "email": user.email})
+        refresh_token = issue_refresh_token(user)
         
         # Set HTTP-only cookies
         set_auth_cookies(response, access_token, refresh_token, remember_me=False)
@@ -118,17 +146,18 @@ def register_user(user_data: UserRegisterRequest, request: Request, response: Re
         )
 
 @router.post("/users/login")
+@query_budget(2)
 def login(
     login_data: UserLoginRequest, 
     request: Request, 
-    response: Response
+    response: Response,
 ):
     """
     Login user with enhanced security.
     
     Features:
     - Rate limiting
-    - Secure password verification
+    - Secure password verification, upgrading weaker hashes in the background
     - HTTP-only cookies
     - Remember me functionality
     - Consistent error messages (prevents user enumeration)
@@ -148,13 +177,14 @@ def login(
                 detail="Invalid credentials"
             )
         
+        # Upgrade hashes made at a lower bcrypt cost, off the request
+        upgrade_hash_later(user, login_data.password)
+        
         # Create tokens
         access_token = create_access_token(
             data={"sub": user.username, "email": user.email}
         )
-        refresh_token = create_refresh_token(
-            data={"sub": user.username, "email": user.email}
-        )
+        refresh_token = issue_refresh_token(user, remember_me=login_data.remember_me)
         
         # Set HTTP-only cookies
         set_auth_cookies(
@@ -176,20 +206,25 @@ def login(
         }
 
 @router.post("/users/logout")
-def logout(response: Response):
+@query_budget(1)
+def logout(request: Request, response: Response):
     """
-    Logout user by clearing authentication cookies.
+    Logout user by revoking their refresh token family and clearing
+    authentication cookies.
     """
+    revoke_refresh_token(request.cookies.get("refresh_token"))
     clear_auth_cookies(response)
     return {"message": "Logged out successfully"}
 
 @router.post("/users/refresh")
-async def refresh_token(request: Request, response: Response):
+@query_budget(4)
+def refresh_token(request: Request, response: Response):
     """
     Refresh access token using refresh token from cookie.
     
     This endpoint allows clients to get a new access token without
-    requiring the user to log in again.
+    requiring the user to log in again. The refresh token is rotated:
+    the presented one stops working and a new one is set in its cookie.
     """
     try:
         # Get refresh token from cookie
@@ -213,23 +248,33 @@ async def refresh_token(request: Request, response: Response):
                 detail="Invalid refresh token"
             )
         
-        # Verify user still exists
-        with Session(engine) as session:
-            user = session.exec(
-                select(User).where(User.username == username)
-            ).first()
-            
-            if not user:
-                raise HTTPException(
-                    status_code=401, 
-                    detail="User not found"
-                )
+        # Rotate the refresh token (the revocation check is in memory)
+        try:
+            new_refresh_token = rotate_refresh_token(payload)
+        except RefreshTokenError as exc:
+            # An HTTPException would drop the cookie headers set on `response`,
+            # so the 401 is returned with them
+            rejected = JSONResponse(status_code=401, content={"detail": str(exc)})
+            clear_auth_cookies(rejected)
+            return rejected
         
         # Create new access token
         new_access_token = create_access_token(
-            data={"sub": username, "email": email or user.email}
+            data={"sub": username, "email": email}
         )
         
+        # Another tab rotated this token a moment ago and already set the new cookie
+        if new_refresh_token is not None:
+            response.set_cookie(
+                key="refresh_token",
+                value=new_refresh_token,
+                max_age=max(0, int(payload["exp"] - time.time())),
+                httponly=True,
+                secure=True,
+                samesite="lax",
+                path="/"
+            )
+        
         # Update the access token cookie
         response.set_cookie(
             key="access_token",
@@ -250,6 +295,7 @@ async def refresh_token(request: Request, response: Response):
         )
 
 @router.get("/users/me", response_model=UserResponse)
+@query_budget(1)
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     """
     Get current user information.
@@ -265,6 +311,7 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 # Legacy OAuth2 endpoint for API clients (keeps backward compatibility)
 @router.post("/users/login/oauth2")
+@query_budget(2)
 def login_oauth2(form_data: OAuth2PasswordRequestForm = Depends()):
     """
     OAuth2-compatible login endpoint for API clients.
@@ -281,12 +328,12 @@ def login_oauth2(form_data: OAuth2PasswordRequestForm = Depends()):
                 detail="Invalid credentials"
             )
         
+        upgrade_hash_later(user, form_data.password)
+        
         access_token = create_access_token(
             data={"sub": user.username, "email": user.email}
         )
-        refresh_token = create_refresh_token(
-            data={"sub": user.username, "email": user.email}
-        )
+        refresh_token = issue_refresh_token(user)
         
         return {
             "access_token": access_token,
@@ -0,0 +1,167 @@
+import heapq
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from sqlmodel import Session, select
+
+from .db import engine
+from .metrics import record_cache
+from .models import Dashboard, Dataset, EconomicReport, Topic
+
+# Other worker processes write too; rebuild at least this often (seconds)
+SEARCH_INDEX_TTL = float(os.getenv("SEARCH_INDEX_TTL", "300"))
+
+SUGGEST_TYPES = ("report", "dataset", "dashboard", "topic")
+
+_WORD = re.compile(r"\w+")
+
+ItemKey = Tuple[str, Union[int, str]]  # (type, id); topics are keyed by slug
+
+def fold(text: str) -> str:
+    """Lowercase and strip diacritics, so "ūkis" and "ukis" index alike"""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+def tokenize(text: str) -> List[str]:
+    """Folded words of `text`"""
+    return _WORD.findall(fold(text))
+
+class SuggestIndex:
+    """
+    In-memory prefix index for search-as-you-type.
+
+    Labels are folded and split into words. A sorted vocabulary maps each
+    word to its postings, kept in rank order: labels that start with the
+    word first, then shorter labels. A prefix is one bisected range of the
+    vocabulary, and merging its posting lists lazily yields matches best
+    first, so a query stops after `limit` hits whatever the range covers.
+    Writes insert and delete postings in place.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vocabulary: List[str] = []
+        # word -> sorted (not first word, label length, label, type, id, label number);
+        # ids only compare within one type, so int and slug ids never meet
+        self._postings: Dict[str, List[Tuple]] = {}
+        # (type, id) -> [(label, folded words)]
+        self._labels: Dict[ItemKey, List[Tuple[str, List[str]]]] = {}
+        self.built_at: Optional[float] = None
+
+    @staticmethod
+    def _entries(labels: Sequence[str]) -> List[Tuple[str, List[str]]]:
+        return [(label, tokenize(label)) for label in dict.fromkeys(label for label in labels if label)]
+
+    @staticmethod
+    def _item_postings(key: ItemKey, entries: List[Tuple[str, List[str]]]) -> Iterator[Tuple[str, Tuple]]:
+        for number, (label, words) in enumerate(entries):
+            for word in dict.fromkeys(words):
+                yield word, (word != words[0], len(label), label, *key, number)
+
+    def _insert(self, key: ItemKey, entries: List[Tuple[str, List[str]]]) -> None:
+        self._labels[key] = entries
+        for word, posting in self._item_postings(key, entries):
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = []
+                insort(self._vocabulary, word)
+            insort(postings, posting)
+
+    def _delete(self, key: ItemKey) -> None:
+        entries = self._labels.pop(key, None)
+        if entries is None:
+            return
+        for word, posting in self._item_postings(key, entries):
+            postings = self._postings[word]
+            del postings[bisect_left(postings, posting)]
+            if not postings:
+                del self._postings[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+
+    def build(self, session: Session) -> None:
+        """Load every label with four queries"""
+        items: List[Tuple[ItemKey, Sequence[str]]] = []
+        items += [(("report", i), (title,)) for i, title in session.execute(
+            select(EconomicReport.id, EconomicReport.title)).all()]
+        items += [(("dataset", i), (name,)) for i, name in session.execute(
+            select(Dataset.id, Dataset.name)).all()]
+        items += [(("dashboard", i), (title,)) for i, title in session.execute(
+            select(Dashboard.id, Dashboard.title)).all()]
+        items += [(("topic", slug), (name_lt, name_en)) for slug, name_lt, name_en in session.execute(
+            select(Topic.slug, Topic.name_lt, Topic.name_en)).all()]
+
+        labels = {}
+        postings: Dict[str, List[Tuple]] = {}
+        for key, item_labels in items:
+            entries = labels[key] = self._entries(item_labels)
+            for word, posting in self._item_postings(key, entries):
+                postings.setdefault(word, []).append(posting)
+        for word_postings in postings.values():
+            word_postings.sort()
+
+        with self._lock:
+            self._vocabulary, self._postings, self._labels = sorted(postings), postings, labels
+            self.built_at = time.monotonic()
+
+    def ensure_fresh(self) -> None:
+        if self.built_at is None or time.monotonic() - self.built_at > SEARCH_INDEX_TTL:
+            record_cache("suggest", hit=False)
+            with Session(engine) as session:
+                self.build(session)
+        else:
+            record_cache("suggest", hit=True)
+
+    def put(self, kind: str, item_id: Union[int, str], *labels: str) -> None:
+        """Index a created or renamed item, replacing its previous labels"""
+        if self.built_at is None:
+            return
+        entries = self._entries(labels)
+        with self._lock:
+            self._delete((kind, item_id))
+            self._insert((kind, item_id), entries)
+
+    def remove(self, kind: str, item_id: Union[int, str]) -> None:
+        if self.built_at is None:
+            return
+        with self._lock:
+            self._delete((kind, item_id))
+
+    def invalidate(self) -> None:
+        self.built_at = None
+
+    def suggest(self, query: str, limit: int = 10, types: Sequence[str] = SUGGEST_TYPES) -> List[Dict]:
+        """
+        Items with a label whose words start with every word of `query`.
+        Labels whose first word matches the query's first word come first,
+        then shorter labels.
+        """
+        words = tokenize(query)
+        if not words:
+            return []
+        first, rest = words[0], words[1:]
+        results = []
+        seen = set()
+        with self._lock:
+            start = bisect_left(self._vocabulary, first)
+            end = bisect_left(self._vocabulary, first + "\uffff")
+            runs = [self._postings[word] for word in self._vocabulary[start:end]]
+            for _, _, label, kind, item_id, number in heapq.merge(*runs):
+                key = (kind, item_id)
+                if kind not in types or key in seen:
+                    continue
+                label_words = self._labels[key][number][1]
+                if not all(any(word.startswith(part) for word in label_words) for part in rest):
+                    continue
+                seen.add(key)
+                results.append({"type": kind, "id": item_id, "label": label})
+                if len(results) == limit:
+                    break
+        return results
+
+# Global suggestion index, kept current by the write routes
+suggest_index = SuggestIndex()
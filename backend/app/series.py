@@ -0,0 +1,315 @@
+import csv
+import io
+import re
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+
+from .models import Aggregation, Observation, ObservationVintage, Series, SeriesFrequency
+from .series_store import series_store
+
+# Periods are handled as integer "buckets": months since 1970-01 divided by
+# the number of months per period, so quarters and years line up exactly
+MONTHS = {SeriesFrequency.MONTHLY: 1, SeriesFrequency.QUARTERLY: 3, SeriesFrequency.ANNUAL: 12}
+
+# How a lower-frequency value is spread over higher-frequency periods
+UPSAMPLE_METHODS = ("repeat", "linear")
+JOIN_METHODS = ("outer", "inner")
+
+class SeriesData:
+    """One series held as NumPy arrays: month index of each period start, and values"""
+
+    __slots__ = ("meta", "months", "values")
+
+    def __init__(self, meta: Series, months: np.ndarray, values: np.ndarray):
+        self.meta = meta
+        self.months = months
+        self.values = values
+
+def to_months(periods: np.ndarray) -> np.ndarray:
+    """datetime64 periods -> int64 months since 1970-01"""
+    return periods.astype("datetime64[M]").astype(np.int64)
+
+def month_of(day: date) -> int:
+    return (day.year - 1970) * 12 + day.month - 1
+
+def month_start(month: int) -> date:
+    """Inverse of `month_of`: the first day of a month index"""
+    return date(1970 + month // 12, month % 12 + 1, 1)
+
+def period_labels(buckets: np.ndarray, frequency: SeriesFrequency) -> List[str]:
+    """Human-readable labels: 2024-03, 2024-Q1, 2024"""
+    months = buckets * MONTHS[frequency]
+    years = months // 12 + 1970
+    if frequency == SeriesFrequency.MONTHLY:
+        return [f"{y}-{m:02d}" for y, m in zip(years.tolist(), (months % 12 + 1).tolist())]
+    if frequency == SeriesFrequency.QUARTERLY:
+        return [f"{y}-Q{q}" for y, q in zip(years.tolist(), (months % 12 // 3 + 1).tolist())]
+    return [str(y) for y in years.tolist()]
+
+def series_labels(data: SeriesData) -> List[str]:
+    """Period labels of a series at its own frequency"""
+    return period_labels(data.months // MONTHS[data.meta.frequency], data.meta.frequency)
+
+_PERIOD_PATTERNS = (
+    (re.compile(r"^(\d{4})-?Q([1-4])$"), lambda m: date(int(m[1]), 3 * int(m[2]) - 2, 1)),
+    (re.compile(r"^(\d{4})-?M?(\d{2})$"), lambda m: date(int(m[1]), int(m[2]), 1)),
+    (re.compile(r"^(\d{4})-(\d{2})-(\d{2})$"), lambda m: date(int(m[1]), int(m[2]), int(m[3]))),
+    (re.compile(r"^(\d{4})$"), lambda m: date(int(m[1]), 1, 1)),
+)
+
+def parse_period(text: str, frequency: SeriesFrequency) -> date:
+    """
+    Parse a period label (2024, 2024-Q1, 2024Q1, 2024-03, 2024M03, 2024-03-31)
+    into the first day of the period at `frequency`.
+    """
+    text = text.strip()
+    for pattern, build in _PERIOD_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            day = build(match)
+            month = (day.month - 1) // MONTHS[frequency] * MONTHS[frequency] + 1
+            return date(day.year, month, 1)
+    raise ValueError(f"Unrecognized period {text!r}")
+
+def parse_observations_csv(text: str, frequency: SeriesFrequency) -> List[Tuple[date, float]]:
+    """Read `period,value` rows (header optional, blank values skipped)"""
+    rows = []
+    for line_no, row in enumerate(csv.reader(io.StringIO(text)), start=1):
+        if not row or not row[0].strip():
+            continue
+        if line_no == 1 and not row[0].strip()[:1].isdigit():
+            continue  # header
+        if len(row) < 2:
+            raise ValueError(f"Line {line_no}: expected period,value")
+        if not row[1].strip():
+            continue
+        try:
+            rows.append((parse_period(row[0], frequency), float(row[1])))
+        except ValueError as exc:
+            raise ValueError(f"Line {line_no}: {exc}") from None
+    return rows
+
+def replace_observations(session: Session, series: Series, rows: Iterable[Tuple[date, float]]) -> int:
+    """
+    Replace all observations of `series` with `rows`, rewrite its binary
+    store file and recompute its rollup group. This starts a new history:
+    earlier vintages are dropped.
+    Use `releases.ingest_release` to apply a release incrementally.
+    """
+    values = dict(sorted({period: value for period, value in rows}.items()))  # last one wins on duplicates
+    now = datetime.utcnow()
+    session.execute(delete(Observation).where(Observation.series_id == series.id))
+    session.execute(delete(ObservationVintage).where(ObservationVintage.series_id == series.id))
+    if values:
+        session.execute(insert(Observation), [
+            {"series_id": series.id, "period": period, "value": value, "valid_from": now}
+            for period, value in values.items()
+        ])
+    from .rollups import group_of, update_rollups
+
+    months = to_months(np.array(list(values), dtype="datetime64[D]"))
+    observed = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+    series_id, frequency = series.id, series.frequency  # Not expired by the commit
+    series.updated_at = now
+    session.add(series)
+    update_rollups(session, {group_of(series): None}, {series_id: (months, observed)})
+    session.commit()
+    series_store.write(series_id, frequency, months, observed)
+    return len(values)
+
+def _build_store_files(session: Session, metas: Dict[str, Series]) -> None:
+    """Write store files for series that have none yet, from the database (one query)"""
+    rows = session.execute(
+        select(Observation.series_id, Observation.period, Observation.value)
+        .where(Observation.series_id.in_(list(metas)))
+        .order_by(Observation.series_id, Observation.period)
+    ).all()
+    slices: Dict[str, Tuple[int, int]] = {}
+    months = np.empty(0, np.int64)
+    values = np.empty(0, np.float64)
+    if rows:
+        ids, periods, observed = zip(*rows)
+        ids = np.array(ids)
+        months = to_months(np.array(periods, dtype="datetime64[D]"))
+        values = np.array(observed, dtype=np.float64)
+        # Rows are sorted by series id, so each series is one contiguous slice
+        bounds = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ids)]):
+            slices[str(ids[lo])] = (int(lo), int(hi))
+    for series_id, meta in metas.items():
+        lo, hi = slices.get(series_id, (0, 0))
+        series_store.write(series_id, meta.frequency, months[lo:hi], values[lo:hi])
+
+def open_series(session: Session, meta: Series):
+    """The memory-mapped store file of a series, built from the database if missing"""
+    return open_series_files(session, [meta])[meta.id]
+
+def open_series_files(session: Session, metas: Sequence[Series]) -> Dict:
+    """Store files of several series by id; any missing ones are built with one query"""
+    files = {meta.id: series_store.open(meta.id) for meta in metas}
+    unbuilt = {meta.id: meta for meta in metas if files[meta.id] is None}
+    if unbuilt:
+        _build_store_files(session, unbuilt)
+        files.update({series_id: series_store.open(series_id) for series_id in unbuilt})
+    return files
+
+def load_series(session: Session, series_ids: Sequence[str],
+                start: Optional[date] = None, end: Optional[date] = None) -> List[SeriesData]:
+    """
+    Load series as NumPy arrays: metadata from the database (one query),
+    observations as zero-copy views of the memory-mapped store files
+    """
+    metas = {series.id: series for series in session.exec(select(Series).where(Series.id.in_(series_ids))).all()}
+    missing = [series_id for series_id in series_ids if series_id not in metas]
+    if missing:
+        raise LookupError(f"Unknown series: {', '.join(missing)}")
+
+    files = open_series_files(session, list(metas.values()))
+    start_month = month_of(start) if start else None
+    end_month = month_of(end) if end else None
+    loaded = []
+    for series_id in series_ids:
+        series_file = files[series_id]
+        lo, hi = series_file.bounds(start_month, end_month)
+        loaded.append(SeriesData(metas[series_id], series_file.months[lo:hi], series_file.values[lo:hi]))
+    return loaded
+
+def downsample(months: np.ndarray, values: np.ndarray, source: SeriesFrequency,
+               target: SeriesFrequency, aggregation: Aggregation) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Aggregate to a lower frequency. Periods missing any source observation
+    (e.g. a quarter with two months published) come out as NaN.
+    """
+    buckets = months // MONTHS[target]
+    if len(buckets) == 0:
+        return buckets, values
+    keys, starts, counts = np.unique(buckets, return_index=True, return_counts=True)
+    ends = starts + counts - 1
+
+    if aggregation == Aggregation.SUM:
+        result = np.add.reduceat(values, starts)
+    elif aggregation == Aggregation.MEAN:
+        result = np.add.reduceat(values, starts) / counts
+    elif aggregation == Aggregation.MIN:
+        result = np.minimum.reduceat(values, starts)
+    elif aggregation == Aggregation.MAX:
+        result = np.maximum.reduceat(values, starts)
+    elif aggregation == Aggregation.FIRST:
+        result = values[starts]
+    else:  # LAST
+        result = values[ends]
+
+    expected = MONTHS[target] // MONTHS[source]
+    result = np.where(counts == expected, result, np.nan)
+    return keys, result
+
+def upsample(months: np.ndarray, values: np.ndarray, source: SeriesFrequency,
+             target: SeriesFrequency, aggregation: Aggregation, method: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spread values over a higher frequency.
+
+    "repeat" gives every sub-period the period's value; "linear" interpolates
+    between period starts and carries the last slope through the final
+    period. Flows (aggregation "sum") keep their totals: each period's
+    sub-values are scaled to add up to it, so summing back returns the
+    original series.
+    """
+    ratio = MONTHS[source] // MONTHS[target]
+    anchors = months // MONTHS[target]
+    if len(anchors) == 0:
+        return anchors, values
+
+    flow = aggregation == Aggregation.SUM
+    if method == "linear":
+        slope = (values[-1] - values[-2]) / (anchors[-1] - anchors[-2]) if len(anchors) > 1 else 0.0
+        points = np.append(anchors, anchors[-1] + ratio)
+        levels = np.append(values, values[-1] + slope * ratio)
+        if flow:
+            # Only periods with a published total can be split
+            buckets = (anchors[:, None] + np.arange(ratio)).ravel()
+        else:
+            buckets = np.arange(anchors[0], anchors[-1] + ratio)
+        result = np.interp(buckets, points, levels)
+    else:
+        buckets = (anchors[:, None] + np.arange(ratio)).ravel()
+        result = np.repeat(values, ratio)
+
+    if flow:
+        shares = result.reshape(-1, ratio)
+        sums = shares.sum(axis=1, keepdims=True)
+        totals = values[:, None]
+        # An even split where the shape cannot be scaled to the total
+        scalable = (sums != 0) & (np.sign(sums) == np.sign(totals))
+        result = np.where(scalable, shares * (totals / np.where(scalable, sums, 1)), totals / ratio).ravel()
+    return buckets, result
+
+def resample(data: SeriesData, target: SeriesFrequency, aggregation: Optional[Aggregation] = None,
+             method: str = "repeat") -> Tuple[np.ndarray, np.ndarray]:
+    """Bucket indices and values of `data` at `target` frequency"""
+    source = data.meta.frequency
+    aggregation = aggregation or data.meta.aggregation
+    if MONTHS[target] > MONTHS[source]:
+        return downsample(data.months, data.values, source, target, aggregation)
+    if MONTHS[target] < MONTHS[source]:
+        return upsample(data.months, data.values, source, target, aggregation, method)
+    return data.months // MONTHS[target], data.values
+
+def compare(
+    series: Sequence[SeriesData],
+    frequency: Optional[SeriesFrequency] = None,
+    aggregation: Optional[Aggregation] = None,
+    method: str = "repeat",
+    join: str = "outer",
+) -> Dict:
+    """
+    Align several series on one frequency and join them on period.
+
+    `frequency` defaults to the lowest frequency among the inputs, so nothing
+    is invented by upsampling unless asked for. `aggregation` overrides each
+    series' own rule. Returns a compact matrix: one row of values per series,
+    one column per period, null where a series has no value.
+    """
+    if frequency is None:
+        frequency = max((data.meta.frequency for data in series), key=MONTHS.get)
+
+    resampled = []
+    for data in series:
+        buckets, values = resample(data, frequency, aggregation, method)
+        keep = ~np.isnan(values)
+        resampled.append((buckets[keep], values[keep]))
+
+    bucket_sets = [buckets for buckets, _ in resampled]
+    if join == "inner":
+        periods = bucket_sets[0]
+        for buckets in bucket_sets[1:]:
+            periods = np.intersect1d(periods, buckets)
+    else:
+        periods = np.unique(np.concatenate(bucket_sets)) if bucket_sets else np.empty(0, np.int64)
+
+    matrix = np.full((len(series), len(periods)), np.nan)
+    for row, (buckets, values) in enumerate(resampled):
+        positions = np.searchsorted(periods, buckets)
+        inside = (positions < len(periods))
+        inside[inside] = periods[positions[inside]] == buckets[inside]
+        matrix[row, positions[inside]] = values[inside]
+
+    return {
+        "frequency": frequency.value,
+        "periods": period_labels(periods, frequency),
+        "series": [
+            {
+                "id": data.meta.id,
+                "name": data.meta.name,
+                "region": data.meta.region,
+                "unit": data.meta.unit,
+                "source_frequency": data.meta.frequency.value,
+                "aggregation": (aggregation or data.meta.aggregation).value,
+            }
+            for data in series
+        ],
+        "values": np.where(np.isnan(matrix), None, matrix).tolist(),
+    }
@@ -0,0 +1,124 @@
+import os
+import re
+import struct
+import threading
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .models import SeriesFrequency
+
+SERIES_STORE_DIR = Path(os.getenv("SERIES_STORE_DIR", "./data/series"))
+
+# Binary series format, used both on disk and as the HTTP binary response:
+#
+#   offset  size     field
+#   0       4        magic b"LTS1"
+#   4       1        frequency, ASCII "M", "Q" or "A"
+#   5       3        reserved (zero)
+#   8       8        count n, uint64
+#   16      8 * n    periods, int64: months since 1970-01 of each period start
+#   16+8n   8 * n    values, float64
+#
+# All integers and floats are little-endian. Both columns are 8-byte
+# aligned, so clients can view them directly as BigInt64Array/Float64Array.
+MAGIC = b"LTS1"
+HEADER = struct.Struct("<4sc3xQ")
+MEDIA_TYPE = "application/vnd.lt-econ.series"
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9._-]+$")
+
+def encode_header(frequency: SeriesFrequency, count: int) -> bytes:
+    return HEADER.pack(MAGIC, frequency.value.encode("ascii"), count)
+
+class SeriesFile:
+    """
+    A memory-mapped series file.
+
+    `months` and `values` are NumPy views over the mapping: slicing them and
+    handing out memoryviews never copies or creates per-value objects.
+    """
+
+    __slots__ = ("key", "frequency", "months", "values", "_mmap")
+
+    def __init__(self, key: Tuple[int, int, int], mapped: mmap):
+        magic, frequency, count = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a series file")
+        self.key = key
+        self.frequency = SeriesFrequency(frequency.decode("ascii"))
+        self.months = np.frombuffer(mapped, dtype="<i8", count=count, offset=HEADER.size)
+        self.values = np.frombuffer(mapped, dtype="<f8", count=count, offset=HEADER.size + 8 * count)
+        self._mmap = mapped
+
+    def __len__(self) -> int:
+        return len(self.months)
+
+    def bounds(self, start_month: Optional[int] = None, end_month: Optional[int] = None) -> Tuple[int, int]:
+        """Index range [lo, hi) of periods within the inclusive month bounds"""
+        lo = 0 if start_month is None else int(np.searchsorted(self.months, start_month, "left"))
+        hi = len(self.months) if end_month is None else int(np.searchsorted(self.months, end_month, "right"))
+        return lo, max(lo, hi)
+
+    def buffers(self, lo: int, hi: int) -> List[memoryview]:
+        """The binary response for rows [lo, hi): header, then the two column slices"""
+        return [
+            memoryview(encode_header(self.frequency, hi - lo)),
+            memoryview(self.months[lo:hi]).cast("B"),
+            memoryview(self.values[lo:hi]).cast("B"),
+        ]
+
+class SeriesStore:
+    """
+    Directory of binary series files, one per series, with open mappings
+    cached per process.
+
+    Files are replaced atomically on write. A reader that already holds the
+    old mapping keeps a consistent view, and the next `open` maps the new
+    file, in this process or any other worker.
+    """
+
+    def __init__(self, root: Path = SERIES_STORE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._open: Dict[str, SeriesFile] = {}
+
+    def path(self, series_id: str) -> Path:
+        name = series_id if _SAFE_ID.match(series_id) else series_id.encode("utf-8").hex()
+        return self.root / f"{name}.lts"
+
+    def write(self, series_id: str, frequency: SeriesFrequency, months: np.ndarray, values: np.ndarray) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(series_id)
+        tmp = path.with_suffix(f".tmp{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, "wb") as f:
+            f.write(encode_header(frequency, len(months)))
+            f.write(np.ascontiguousarray(months, dtype="<i8").tobytes())
+            f.write(np.ascontiguousarray(values, dtype="<f8").tobytes())
+        os.replace(tmp, path)
+        with self._lock:
+            self._open.pop(series_id, None)
+
+    def open(self, series_id: str) -> Optional[SeriesFile]:
+        """Map a series file, reusing the cached mapping while the file is unchanged"""
+        path = self.path(series_id)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+        cached = self._open.get(series_id)
+        if cached is not None and cached.key == key:
+            return cached
+
+        with open(path, "rb") as f:
+            series_file = SeriesFile(key, mmap(f.fileno(), 0, access=ACCESS_READ))
+        with self._lock:
+            self._open[series_id] = series_file
+        return series_file
+
+# Global store, shared by the series routes and the comparison engine
+series_store = SeriesStore()
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from .db import engine
+from .jobs import PRIORITY_HIGH, PRIORITY_LOW, enqueue, job_handler, schedule
+from .models import ContentType, Dataset, DigestFrequency, Job
+from .releases import ingest_release, parse_release_csv
+from .utils.urls import UnsafeURLError, open_public_url
+
+logger = logging.getLogger(__name__)
+
+# Handlers for the background job queue (see app/jobs.py) and the periodic
+# schedule. Each handler takes the job payload dict and returns a JSON-able
+# result that is stored on the job.
+
+DATASET_STORAGE_DIR = Path(os.getenv("DATASET_STORAGE_DIR", "./data/datasets"))
+DATASET_FETCH_TIMEOUT = 30
+
+@job_handler("refresh_dataset")
+def refresh_dataset(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Download a dataset from its source URL, keeping the file only if it changed"""
+    with Session(engine) as session:
+        dataset = session.get(Dataset, payload["dataset_id"])
+        if dataset is None:
+            return {"skipped": "dataset not found"}
+        if not dataset.source_url:
+            return {"skipped": "dataset has no source_url"}
+        source_url = dataset.source_url
+
+    try:
+        with open_public_url(source_url, timeout=DATASET_FETCH_TIMEOUT) as response:
+            body = response.read()
+    except UnsafeURLError as exc:
+        return {"skipped": str(exc)}  # retrying would not help
+
+    digest = hashlib.sha256(body).hexdigest()
+    DATASET_STORAGE_DIR.mkdir(parents=True, exist_ok=True)
+    target = DATASET_STORAGE_DIR / f"{payload['dataset_id']}.raw"
+    if target.exists() and hashlib.sha256(target.read_bytes()).hexdigest() == digest:
+        return {"changed": False, "bytes": len(body), "sha256": digest}
+
+    # Apply the new file as an incremental release of the dataset's series
+    try:
+        rows = parse_release_csv(body.decode("utf-8"))
+    except ValueError as exc:
+        # The message quotes the file; keep it in the log, not the job result
+        logger.warning("Dataset %s release not applied: %s", payload["dataset_id"], exc)
+        release = {"skipped": "release file could not be parsed"}
+    else:
+        with Session(engine) as session:
+            release = ingest_release(session, rows, payload["dataset_id"])
+
+    tmp = target.with_suffix(".tmp")
+    tmp.write_bytes(body)
+    tmp.replace(target)
+    return {"changed": True, "bytes": len(body), "sha256": digest, "release": release}
+
+@job_handler("refresh_datasets")
+def refresh_datasets(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fan out one refresh_dataset job per dataset with a source URL, or only
+    for `payload["dataset_ids"]` when given
+    """
+    priority = payload.get("priority", PRIORITY_LOW)
+    with Session(engine) as session:
+        query = select(Dataset.id).where(Dataset.source_url.is_not(None))
+        if "dataset_ids" in payload:
+            query = query.where(Dataset.id.in_(payload["dataset_ids"]))
+        dataset_ids = session.exec(query).all()
+        for dataset_id in dataset_ids:
+            enqueue("refresh_dataset", {"dataset_id": dataset_id}, priority=priority,
+                    dedupe_key=f"refresh_dataset:{dataset_id}", session=session)
+    return {"enqueued": len(dataset_ids)}
+
+@job_handler("rebuild_rollups")
+def rebuild_rollups(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompute the whole observation rollup cube"""
+    from .rollups import rebuild_rollups as run_rebuild
+
+    with Session(engine) as session:
+        return {"cells": run_rebuild(session)}
+
+@job_handler("update_related")
+def update_related(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Recompute related-content neighbours for changed reports and datasets; all of them if none are given"""
+    from .related import update_related as run_update
+
+    changed = None
+    if payload.get("reports") or payload.get("datasets"):
+        changed = [(ContentType.REPORT, report_id) for report_id in payload.get("reports", [])]
+        changed += [(ContentType.DATASET, dataset_id) for dataset_id in payload.get("datasets", [])]
+    with Session(engine) as session:
+        return run_update(session, changed)
+
+@job_handler("purge_refresh_tokens")
+def purge_refresh_tokens(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete refresh token families that expired over a day ago"""
+    from .refresh_tokens import purge_expired_families
+
+    return {"deleted": purge_expired_families()}
+
+@job_handler("purge_view_buckets")
+def purge_view_buckets(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete hourly view counts older than the trending window"""
+    from .views import purge_buckets
+
+    return {"deleted": purge_buckets()}
+
+@job_handler("build_digests")
+def build_digests(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from .digest import build_digests as run_digests
+    return run_digests(DigestFrequency(payload["frequency"]))
+
+@job_handler("warm_caches", in_process=True)
+def warm_caches(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild the precompressed catalog payloads, the report facet index and search suggestions"""
+    from .catalog import source_catalog
+    from .facets import facet_index
+    from .routes.profiles import warm_topics_cache
+    from .search import suggest_index
+
+    source_catalog.load()
+    warm_topics_cache()
+    facet_index.invalidate()
+    facet_index.ensure_fresh()
+    suggest_index.invalidate()
+    suggest_index.ensure_fresh()
+    return {"warmed": ["sources", "topics", "facets", "suggest"]}
+
+def enqueue_dataset_refresh(dataset_id: int, user_id: Optional[int] = None) -> Job:
+    """Queue a refresh for a newly created or updated dataset"""
+    return enqueue("refresh_dataset", {"dataset_id": dataset_id}, priority=PRIORITY_HIGH,
+                   dedupe_key=f"refresh_dataset:{dataset_id}", user_id=user_id)
+
+def enqueue_datasets_refresh(dataset_ids: List[int], user_id: Optional[int] = None) -> Job:
+    """Queue refreshes for a batch of datasets as a single fan-out job"""
+    return enqueue("refresh_datasets", {"dataset_ids": dataset_ids, "priority": PRIORITY_HIGH},
+                   priority=PRIORITY_HIGH, user_id=user_id)
+
+def enqueue_related_update(reports: List[int] = (), datasets: List[int] = ()) -> Job:
+    """Queue a neighbour update for reports and datasets whose text changed (or that were deleted)"""
+    return enqueue("update_related", {"reports": list(reports), "datasets": list(datasets)}, priority=PRIORITY_LOW)
+
+schedule("refresh-datasets", "refresh_datasets", timedelta(hours=24))
+schedule("warm-caches", "warm_caches", timedelta(hours=1))
+schedule("purge-refresh-tokens", "purge_refresh_tokens", timedelta(days=1))
+schedule("purge-view-buckets", "purge_view_buckets", timedelta(hours=6))
+# Full recompute, so IDF weights follow the corpus
+schedule("rebuild-related", "update_related", timedelta(days=1))
+schedule("digest-daily", "build_digests", timedelta(days=1), {"frequency": "daily"})
+schedule("digest-weekly", "build_digests", timedelta(days=7), {"frequency": "weekly"})
+schedule("digest-monthly", "build_digests", timedelta(days=30), {"frequency": "monthly"})
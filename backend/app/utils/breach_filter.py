@@ -0,0 +1,136 @@
+import argparse
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BREACHED_PASSWORDS_FILE = Path(os.getenv("BREACHED_PASSWORDS_FILE", "./data/breached-passwords.bf"))
+
+# Bloom filter file: a 24-byte header (magic b"LTBF", k hash functions as
+# uint32, m bits as uint64, n entries as uint64, little-endian) followed by
+# the m-bit array. Entries are SHA-1 digests of the UTF-8 password, the same
+# keys as the public breached-password corpora, and the k bit positions come
+# from the digest by double hashing, so a lookup is one SHA-1 and k bit tests.
+MAGIC = b"LTBF"
+HEADER = struct.Struct("<4sIQQ")
+
+_MASK = (1 << 64) - 1
+_BUILD_CHUNK = 1 << 20
+
+def _positions(digest: bytes, k: int, m: int) -> Iterable[int]:
+    # Wraps at 64 bits like the vectorized build
+    h1, h2 = struct.unpack_from("<QQ", digest)
+    h2 |= 1
+    return (((h1 + i * h2) & _MASK) % m for i in range(k))
+
+class BreachFilter:
+    """
+    Memory-mapped Bloom filter of breached passwords, opened on first use.
+    A missing file disables the check (with one warning) instead of
+    failing registrations.
+    """
+
+    def __init__(self, path: Path = BREACHED_PASSWORDS_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._bits: Optional[mmap] = None
+        self.k = 0
+        self.m = 0
+        self.count = 0
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                with open(self.path, "rb") as f:
+                    mapped = mmap(f.fileno(), 0, access=ACCESS_READ)
+            except (FileNotFoundError, ValueError):
+                logger.warning("Breached password filter %s not found; breach checks are disabled", self.path)
+            else:
+                magic, self.k, self.m, self.count = HEADER.unpack_from(mapped, 0)
+                if magic != MAGIC:
+                    raise ValueError(f"{self.path} is not a breached password filter")
+                self._bits = mapped
+            self._loaded = True
+
+    @property
+    def available(self) -> bool:
+        self._load()
+        return self._bits is not None
+
+    def contains_digest(self, digest: bytes) -> bool:
+        self._load()
+        bits = self._bits
+        if bits is None:
+            return False
+        offset = HEADER.size
+        return all(
+            bits[offset + (position >> 3)] >> (position & 7) & 1
+            for position in _positions(digest, self.k, self.m)
+        )
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(hashlib.sha1(password.encode("utf-8")).digest())
+
+def build_filter(digests: Iterable[bytes], count: int, path: Path, false_positive_rate: float = 0.001) -> None:
+    """Write a filter sized for `count` entries at the given false positive rate"""
+    count = max(count, 1)
+    m = max(64, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+    k = max(1, round(m / count * math.log(2)))
+    bits = np.zeros((m + 7) // 8, dtype=np.uint8)
+    rounds = np.arange(k, dtype=np.uint64)
+    digests = iter(digests)
+    while True:
+        chunk = b"".join(digest[:16] for _, digest in zip(range(_BUILD_CHUNK), digests))
+        if not chunk:
+            break
+        halves = np.frombuffer(chunk, dtype="<u8").reshape(-1, 2)
+        h1, h2 = halves[:, :1], halves[:, 1:] | np.uint64(1)
+        positions = ((h1 + rounds * h2) % np.uint64(m)).ravel()
+        np.bitwise_or.at(bits, positions >> np.uint64(3), np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, k, m, count))
+        f.write(bits.tobytes())
+    os.replace(tmp, path)
+
+def _read_corpus(source: Path, sha1: bool) -> Iterable[bytes]:
+    with open(source, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line:
+                continue
+            if sha1:
+                # "HEX" or "HEX:count", as in the Pwned Passwords downloads
+                yield bytes.fromhex(line.split(":", 1)[0])
+            else:
+                yield hashlib.sha1(line.encode("utf-8")).digest()
+
+# Global filter used by the password policy
+breached_passwords = BreachFilter()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the breached password Bloom filter")
+    parser.add_argument("corpus", type=Path, help="One password per line, or SHA-1 hex with --sha1")
+    parser.add_argument("--sha1", action="store_true", help="Lines are SHA-1 hashes (optionally HASH:count)")
+    parser.add_argument("--output", type=Path, default=BREACHED_PASSWORDS_FILE)
+    parser.add_argument("--fp-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8", errors="replace") as f:
+        entries = sum(1 for line in f if line.strip())
+    build_filter(_read_corpus(args.corpus, args.sha1), entries, args.output, args.fp_rate)
+    print(f"Wrote {args.output} ({entries} entries, {args.output.stat().st_size} bytes)")
@@ -1,83 +1,114 @@
 import re
+import string
 import hashlib
 import base64
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
+
+from .breach_filter import breached_passwords
+
+MIN_LENGTH = 12
+SPECIAL_CHARACTERS = frozenset('!@#$%^&*(),.?":{}|<>')
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+
+# Words that make a password guessable wherever they appear in it
+_COMMON_PATTERNS = re.compile("password|123456|qwerty|admin|user|letmein|welcome|monkey|dragon|master")
+
+# Runs of this many consecutive keys along one keyboard row, the alphabet or
+# the digits (e.g. "asdfgh", "cdefgh", "345678") are rejected. A run stays
+# on one sequence: "bcdert" is four letters of the alphabet, then three keys
+# of the top row, and is allowed.
+SEQUENCE_LENGTH = 6
+_SEQUENCES = ("qwertyuiop", "asdfghjkl", "zxcvbnm", "1234567890", "abcdefghijklmnopqrstuvwxyz")
+# (sequence, position) of every key in the sequences
+_KEY_POSITIONS: Dict[str, List[Tuple[int, int]]] = {}
+for _index, _sequence in enumerate(_SEQUENCES):
+    for _position, _key in enumerate(_sequence):
+        _KEY_POSITIONS.setdefault(_key, []).append((_index, _position))
 
 def validate_password(password: str) -> Dict[str, Any]:
     """
-    Validate password strength according to NIST SP 800-63B guidelines
+    Validate password strength according to NIST SP 800-63B guidelines.
+
+    Character classes, repeats and key sequences are found in a single pass
+    over the characters; the password is then checked against the local
+    breached-password filter.
     """
+    has_upper = has_lower = has_digit = has_special = False
+    repeated = sequential = False
+    previous = ""
+    repeat_run = 0
+    runs: Dict[Tuple[int, int], int] = {}  # (sequence, position) -> run length ending there
+    seen = set()
+
+    for char in password:
+        if char in _UPPER:
+            has_upper = True
+        elif char in _LOWER:
+            has_lower = True
+        elif char in _DIGITS:
+            has_digit = True
+        elif char in SPECIAL_CHARACTERS:
+            has_special = True
+        seen.add(char)
+
+        repeat_run = repeat_run + 1 if char == previous else 1
+        if repeat_run >= 3:
+            repeated = True
+        runs = {
+            (index, position): runs.get((index, position - 1), 0) + 1
+            for index, position in _KEY_POSITIONS.get(char.lower(), ())
+        }
+        if any(run >= SEQUENCE_LENGTH for run in runs.values()):
+            sequential = True
+        previous = char
+
     errors = []
-    
-    # Minimum length check
-    if len(password) < 12:
-        errors.append("Password must be at least 12 characters long")
-    
-    # Character variety checks
-    if not re.search(r"[A-Z]", password):
+    if len(password) < MIN_LENGTH:
+        errors.append(f"Password must be at least {MIN_LENGTH} characters long")
+    if not has_upper:
         errors.append("Password must contain at least one uppercase letter")
-    
-    if not re.search(r"[a-z]", password):
+    if not has_lower:
         errors.append("Password must contain at least one lowercase letter")
-    
-    if not re.search(r"\d", password):
+    if not has_digit:
         errors.append("Password must contain at least one number")
-    
-    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+    if not has_special:
         errors.append("Password must contain at least one special character")
-    
-    # Check for common patterns
-    common_patterns = [
-        "password", "123456", "qwerty", "admin", "user",
-        "letmein", "welcome", "monkey", "dragon", "master"
-    ]
-    
-    password_lower = password.lower()
-    for pattern in common_patterns:
-        if pattern in password_lower:
-            errors.append("Password contains common patterns that are not allowed")
-            break
-    
-    # Check for sequential characters
-    if re.search(r"(.)\1{2,}", password):
+    if _COMMON_PATTERNS.search(password.lower()):
+        errors.append("Password contains common patterns that are not allowed")
+    if repeated:
         errors.append("Password contains repeated characters")
-    
-    # Check for keyboard sequences
-    keyboard_sequences = [
-        "qwerty", "asdfgh", "zxcvbn", "123456", "abcdef"
-    ]
-    for seq in keyboard_sequences:
-        if seq in password_lower:
-            errors.append("Password contains keyboard sequences")
-            break
-    
-    # Simple entropy check (basic implementation)
-    unique_chars = len(set(password))
+    if sequential:
+        errors.append("Password contains keyboard sequences")
+    unique_chars = len(seen)
     if unique_chars < 8:
         errors.append("Password has insufficient character variety")
-    
+    if password in breached_passwords:
+        errors.append("Password has appeared in a data breach")
+
     if errors:
         return {
             "valid": False,
             "errors": errors,
             "score": 0
         }
-    
+
     # Calculate basic strength score
     score = 0
     if len(password) >= 12:
         score += 1
     if len(password) >= 16:
         score += 1
-    if re.search(r"[A-Z]", password) and re.search(r"[a-z]", password):
+    if has_upper and has_lower:
         score += 1
-    if re.search(r"\d", password):
+    if has_digit:
         score += 1
-    if re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+    if has_special:
         score += 1
     if unique_chars >= 10:
         score += 1
-    
+
     return {
         "valid": True,
         "score": score,
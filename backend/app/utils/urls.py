@@ -0,0 +1,113 @@
+import http.client
+import ipaddress
+import socket
+import urllib.request
+from urllib.parse import urlsplit
+
+# Dataset source URLs are fetched by the server, so they may only point at
+# public http(s) hosts: no file://, no loopback, private or link-local
+# addresses (e.g. cloud metadata at 169.254.169.254)
+ALLOWED_SCHEMES = ("http", "https")
+
+class UnsafeURLError(ValueError):
+    """A URL the server must not fetch; the message is safe to show to clients"""
+
+def check_url_scheme(url: str) -> None:
+    """Reject anything but http(s) URLs with a host, and literal non-public IPs, without DNS lookups"""
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ALLOWED_SCHEMES:
+        raise UnsafeURLError("source_url must be an http or https URL")
+    if not parts.hostname:
+        raise UnsafeURLError("source_url has no host")
+    try:
+        parts.port
+    except ValueError:
+        raise UnsafeURLError("source_url has an invalid port")
+    try:
+        address = ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return  # a host name; resolved when fetched
+    _check_address(address)
+
+def _check_address(address) -> None:
+    if getattr(address, "ipv4_mapped", None) is not None:
+        address = address.ipv4_mapped
+    if not address.is_global or address.is_multicast:
+        raise UnsafeURLError("source_url must point to a public address")
+
+def _resolve_public(host: str, port: int):
+    """getaddrinfo for `host`, refused unless every address is public"""
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM, proto=socket.IPPROTO_TCP)
+    except (ValueError, OSError):
+        raise UnsafeURLError("source_url host does not resolve")
+    for info in infos:
+        _check_address(ipaddress.ip_address(info[4][0].split("%")[0]))
+    return infos
+
+def check_public_url(url: str) -> None:
+    """check_url_scheme, plus every address the host resolves to must be public"""
+    check_url_scheme(url)
+    parts = urlsplit(url)
+    _resolve_public(parts.hostname, parts.port or (443 if parts.scheme.lower() == "https" else 80))
+
+def _connect_public(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None) -> socket.socket:
+    """
+    socket.create_connection that connects only to the addresses it checked,
+    so a DNS answer that changes after the check (rebinding) is never used
+    """
+    host, port = address
+    error = None
+    for family, type_, proto, _, sockaddr in _resolve_public(host, port):
+        sock = socket.socket(family, type_, proto)
+        try:
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            return sock
+        except OSError as exc:
+            error = exc
+            sock.close()
+    raise error or UnsafeURLError("source_url host does not resolve")
+
+# The connections resolve and check the host themselves; TLS still verifies
+# the certificate against the host name, not the address
+class _PublicHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _connect_public
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def http_open(self, req):
+        return self.do_open(_PublicHTTPConnection, req)
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def https_open(self, req):
+        return self.do_open(_PublicHTTPSConnection, req, context=self._context)
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follow redirects only to http(s) URLs; their hosts are checked when connecting"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_url_scheme(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+# No proxies: a proxy would resolve the host itself, after the check
+_opener = urllib.request.build_opener(
+    urllib.request.ProxyHandler({}), _PublicHTTPHandler, _PublicHTTPSHandler, _CheckedRedirectHandler,
+)
+
+def open_public_url(url: str, timeout: float):
+    """
+    urlopen for untrusted URLs. The scheme is checked up front and on every
+    redirect; each connection goes only to addresses checked to be public
+    """
+    check_url_scheme(url)
+    return _opener.open(url, timeout=timeout)
@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import case, delete, func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from .db import engine
+from .metrics import CONTENT_VIEWS, VIEW_FLUSH_DURATION
+from .models import ContentType, ContentView, ContentViewBucket
+
+logger = logging.getLogger(__name__)
+
+# Views are counted in memory per worker and written every VIEW_FLUSH_SECONDS
+# with two batched upserts, so serving a page never waits on a write. A crash
+# loses at most one interval of views.
+VIEW_FLUSH_SECONDS = float(os.getenv("VIEW_FLUSH_SECONDS", "5"))
+# Trending scores sum hourly buckets over the window, halving a view's
+# weight every half-life
+TRENDING_WINDOW_HOURS = int(os.getenv("TRENDING_WINDOW_HOURS", "72"))
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "12"))
+
+def current_bucket() -> int:
+    return int(time.time() // 3600)
+
+class ViewCounter:
+    """Write-behind view counts: `record` is a dict update, a thread flushes them"""
+
+    def __init__(self, flush_interval: float = VIEW_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[ContentType, int, int], int] = {}  # (type, id, bucket) -> views
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, content_type: ContentType, content_id: int) -> None:
+        key = (content_type, content_id, current_bucket())
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+        CONTENT_VIEWS.inc(content_type.value)
+
+    def flush(self) -> int:
+        """Write the buffered counts; returns the number of views written"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        totals: Dict[Tuple[ContentType, int], int] = {}
+        for (content_type, content_id, _), views in pending.items():
+            totals[(content_type, content_id)] = totals.get((content_type, content_id), 0) + views
+        now = datetime.utcnow()
+        try:
+            with VIEW_FLUSH_DURATION.time(), Session(engine) as session:
+                stmt = insert(ContentViewBucket)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["content_type", "bucket", "content_id"],
+                        set_={"views": ContentViewBucket.views + stmt.excluded.views},
+                    ),
+                    [
+                        {"content_type": content_type, "content_id": content_id, "bucket": bucket, "views": views}
+                        for (content_type, content_id, bucket), views in pending.items()
+                    ],
+                )
+                stmt = insert(ContentView)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["content_type", "content_id"],
+                        set_={"views": ContentView.views + stmt.excluded.views, "last_viewed_at": now},
+                    ),
+                    [
+                        {"content_type": content_type, "content_id": content_id, "views": views, "last_viewed_at": now}
+                        for (content_type, content_id), views in totals.items()
+                    ],
+                )
+                session.commit()
+        except Exception:
+            # Keep the counts for the next attempt
+            with self._lock:
+                for key, views in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + views
+            raise
+        return sum(totals.values())
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="view-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flush thread and write what is left"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush view counts")
+
+# Global counter fed by the detail routes
+view_counter = ViewCounter()
+
+def trending_scores(content_type: ContentType, window_hours: int = TRENDING_WINDOW_HOURS,
+                    half_life_hours: float = TRENDING_HALF_LIFE_HOURS):
+    """
+    SELECT content_id, score for one content type, highest score first.
+    The decay weights are bound per bucket, so the whole window is one
+    GROUP BY over the buckets' primary key range.
+    """
+    now = current_bucket()
+    first = now - window_hours + 1
+    weights = {bucket: 0.5 ** ((now - bucket) / half_life_hours) for bucket in range(first, now + 1)}
+    score = func.sum(ContentViewBucket.views * case(weights, value=ContentViewBucket.bucket, else_=0.0))
+    return (
+        select(ContentViewBucket.content_id, score.label("score"))
+        .where(ContentViewBucket.content_type == content_type, ContentViewBucket.bucket >= first)
+        .group_by(ContentViewBucket.content_id)
+        .order_by(score.desc())
+    )
+
+def purge_buckets(window_hours: int = TRENDING_WINDOW_HOURS) -> int:
+    """Delete hourly buckets that have left the trending window"""
+    with Session(engine) as session:
+        result = session.execute(
+            delete(ContentViewBucket).where(ContentViewBucket.bucket < current_bucket() - window_hours)
+        )
+        session.commit()
+        return result.rowcount
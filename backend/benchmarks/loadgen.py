@@ -0,0 +1,101 @@
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# A scenario builds one request from the shared client and an RNG, and
+# returns the response so the generator can record status and size.
+RequestFactory = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+@dataclass
+class Scenario:
+    name: str
+    make_request: RequestFactory
+    concurrency: int = 16
+    # Requests with these status codes count as successes
+    ok_statuses: tuple = (200,)
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    wire_bytes: int = 0
+    latencies: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_rps": round(self.requests / self.seconds, 1) if self.seconds else 0.0,
+            "latency_ms": {
+                "p50": _ms(percentile(ordered, 50)),
+                "p90": _ms(percentile(ordered, 90)),
+                "p99": _ms(percentile(ordered, 99)),
+                "max": _ms(ordered[-1] if ordered else 0.0),
+            },
+            "avg_wire_bytes": round(self.wire_bytes / self.requests) if self.requests else 0,
+            "statuses": self.statuses,
+        }
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    duration: float,
+    warmup: float = 1.0,
+    rng_seed: int = 0,
+    max_requests: Optional[int] = None,
+) -> ScenarioResult:
+    """
+    Drive one scenario with a fixed number of concurrent workers (closed loop).
+
+    Requests completed during the warmup period are not recorded.
+    """
+    result = ScenarioResult(scenario.name)
+    started = time.perf_counter()
+    record_from = started + warmup
+    deadline = record_from + duration
+
+    async def worker(index: int) -> None:
+        rng = random.Random(rng_seed * 1000 + index)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline or (max_requests and result.requests >= max_requests):
+                return
+            try:
+                response = await scenario.make_request(client, rng)
+                status = str(response.status_code)
+                ok = response.status_code in scenario.ok_statuses
+                size = response.num_bytes_downloaded
+            except httpx.HTTPError:
+                status, ok, size = "transport_error", False, 0
+            finished = time.perf_counter()
+            if now < record_from:
+                continue
+            result.requests += 1
+            result.latencies.append(finished - now)
+            result.wire_bytes += size
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if not ok:
+                result.errors += 1
+
+    await asyncio.gather(*(worker(i) for i in range(scenario.concurrency)))
+    result.seconds = max(time.perf_counter() - record_from, 1e-9)
+    return result
@@ -0,0 +1,264 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.loadgen import Scenario, run_scenario  # noqa: E402
+from benchmarks.seed import BENCH_PASSWORD, WORDS  # noqa: E402
+
+DEFAULT_BASELINE = BENCH_DIR / "baselines" / "baseline.json"
+RESULTS_DIR = BENCH_DIR / "results"
+
+# Compression counters scraped from /metrics around each scenario
+COMPRESSION_METRICS = (
+    "compression_bytes_in_total",
+    "compression_bytes_out_total",
+    "compression_seconds_total",
+)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _random_ip(rng: random.Random) -> str:
+    # The login rate limiter keys on X-Forwarded-For; spread load across clients
+    return f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+
+def start_server(workdir: Path, port: int, workers: int) -> subprocess.Popen:
+    """Start uvicorn in `workdir`, where the benchmark SQLite file lives"""
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": str(BACKEND_DIR),
+        "QUERY_BUDGET_MODE": "off",
+        "LOG_LEVEL": "WARNING",
+    })
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=workdir, env=env,
+    )
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/test")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("Server did not become ready")
+
+async def login_pool(client: httpx.AsyncClient, users: int, size: int, rng: random.Random) -> List[str]:
+    """Log in a sample of synthetic users and return their access tokens"""
+    tokens = []
+    for _ in range(size):
+        response = await client.post(
+            "/users/login",
+            json={"username": f"bench_user_{rng.randrange(users)}", "password": BENCH_PASSWORD},
+            headers={"X-Forwarded-For": _random_ip(rng)},
+        )
+        response.raise_for_status()
+        tokens.append(response.cookies["access_token"])
+    return tokens
+
+def build_scenarios(users: int, reports: int, tokens: List[str], concurrency: int) -> List[Scenario]:
+    def auth(rng: random.Random) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {rng.choice(tokens)}"}
+
+    async def login(client, rng):
+        return await client.post(
+            "/users/login",
+            json={"username": f"bench_user_{rng.randrange(users)}", "password": BENCH_PASSWORD},
+            headers={"X-Forwarded-For": _random_ip(rng)},
+        )
+
+    async def profile_me(client, rng):
+        return await client.get("/profiles/me", headers=auth(rng))
+
+    async def recommendations(client, rng):
+        return await client.get("/profiles/recommendations", headers=auth(rng))
+
+    async def reports_deep_page(client, rng):
+        # Deep pages: the back half of the archive
+        offset = rng.randrange(reports // 2, max(reports // 2 + 1, reports - 20))
+        return await client.get("/reports", params={"offset": offset, "limit": 20})
+
+    async def reports_search(client, rng):
+        return await client.get("/reports", params={"title": rng.choice(WORDS), "limit": 20})
+
+    return [
+        Scenario("login", login, concurrency=concurrency),
+        Scenario("profiles_me", profile_me, concurrency=concurrency),
+        Scenario("recommendations", recommendations, concurrency=concurrency),
+        Scenario("reports_deep_page", reports_deep_page, concurrency=concurrency),
+        Scenario("reports_search", reports_search, concurrency=concurrency),
+    ]
+
+async def scrape_compression(client: httpx.AsyncClient) -> Dict[str, float]:
+    values = dict.fromkeys(COMPRESSION_METRICS, 0.0)
+    response = await client.get("/metrics")
+    if response.status_code != 200:
+        return values
+    for line in response.text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in values:
+            values[name] = float(value)
+    return values
+
+async def run_benchmarks(args) -> Dict:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    headers = {"Accept-Encoding": "br, zstd, gzip"}
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, headers=headers, timeout=30.0) as client:
+        await wait_ready(client)
+        tokens = await login_pool(client, args.users, args.token_pool, rng)
+        scenarios = build_scenarios(args.users, args.reports, tokens, args.concurrency)
+        if args.scenarios:
+            scenarios = [s for s in scenarios if s.name in args.scenarios]
+
+        results = {}
+        for scenario in scenarios:
+            before = await scrape_compression(client)
+            result = await run_scenario(client, scenario, args.duration, args.warmup, args.seed)
+            after = await scrape_compression(client)
+
+            summary = result.summary()
+            bytes_in = after["compression_bytes_in_total"] - before["compression_bytes_in_total"]
+            bytes_out = after["compression_bytes_out_total"] - before["compression_bytes_out_total"]
+            summary["compression"] = {
+                "bytes_saved": int(bytes_in - bytes_out),
+                "ratio": round(bytes_out / bytes_in, 3) if bytes_in else None,
+                "cpu_ms": round((after["compression_seconds_total"] - before["compression_seconds_total"]) * 1000, 1),
+            }
+            results[scenario.name] = summary
+            latency = summary["latency_ms"]
+            print(f"{scenario.name:20s} {summary['throughput_rps']:8.1f} req/s  "
+                  f"p50 {latency['p50']:7.1f} ms  p99 {latency['p99']:7.1f} ms  errors {summary['errors']}")
+        return results
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return human-readable regressions against a saved baseline"""
+    regressions = []
+    for name, base in baseline.get("scenarios", {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        if current["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {current['throughput_rps']} < baseline {base['throughput_rps']} req/s"
+            )
+        if current["latency_ms"]["p99"] > base["latency_ms"]["p99"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 {current['latency_ms']['p99']} > baseline {base['latency_ms']['p99']} ms"
+            )
+        base_error_rate = base["errors"] / max(base["requests"], 1)
+        error_rate = current["errors"] / max(current["requests"], 1)
+        if error_rate > base_error_rate + 0.01:
+            regressions.append(f"{name}: error rate {error_rate:.2%} > baseline {base_error_rate:.2%}")
+    return regressions
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend load-testing and benchmark suite")
+    parser.add_argument("--url", help="Benchmark an already running, already seeded server")
+    parser.add_argument("--workdir", type=Path, help="Directory holding the benchmark database")
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--datasets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--token-pool", type=int, default=50)
+    parser.add_argument("--scenarios", nargs="*", help="Subset of scenarios to run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        workdir = args.workdir or Path(tempfile.mkdtemp(prefix="lt-econ-bench-"))
+        workdir.mkdir(parents=True, exist_ok=True)
+        if not (workdir / "lt_econ_portal.db").exists():
+            print(f"Seeding corpus in {workdir} ...")
+            subprocess.run(
+                [sys.executable, str(BENCH_DIR / "seed.py"),
+                 "--reports", str(args.reports), "--datasets", str(args.datasets),
+                 "--users", str(args.users), "--seed", str(args.seed)],
+                cwd=workdir, check=True,
+            )
+        port = _free_port()
+        args.url = f"http://127.0.0.1:{port}"
+        server = start_server(workdir, port, args.workers)
+
+    try:
+        scenarios = asyncio.run(run_benchmarks(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "corpus": {"reports": args.reports, "datasets": args.datasets, "users": args.users},
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "scenarios": scenarios,
+    }
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    result_path = RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    result_path.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {result_path}")
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if args.baseline.exists():
+        regressions = compare(scenarios, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print("No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
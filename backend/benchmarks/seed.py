@@ -0,0 +1,149 @@
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+# Synthetic corpus generator for the benchmark suite.
+#
+# Run from an empty working directory: app.db creates its SQLite file
+# relative to the current directory, so the benchmark database never
+# touches a development one. See benchmarks/README.md.
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app.db import engine, init_db, hash_password  # noqa: E402
+from app.projections import make_excerpt  # noqa: E402
+from app.models import (  # noqa: E402
+    Dataset, DigestFrequency, EconomicReport, Language, Profile,
+    ProfileTopic, StakeholderRole, Topic, User,
+)
+
+# Every synthetic user shares this password so the load generator can log in as any of them
+BENCH_PASSWORD = "Bench-Password-2024!"
+
+BATCH_SIZE = 5000
+
+WORDS = (
+    "economy inflation growth labor market wages employment prices energy budget "
+    "deficit debt export import trade regional investment productivity household "
+    "consumption savings interest rate monetary fiscal policy outlook quarterly annual "
+    "survey index housing construction industry services tourism agriculture vilnius "
+    "kaunas klaipeda euro area forecast recovery demand supply credit banking"
+).split()
+
+def _sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+def _batched(rows: List[Dict], size: int = BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _insert(session: Session, model, rows: List[Dict]) -> None:
+    for batch in _batched(rows):
+        session.exec(insert(model), params=batch)
+    session.commit()
+
+def seed(reports: int, datasets: int, users: int, rng_seed: int) -> Dict[str, int]:
+    """Create tables, the regular sample data and the synthetic corpus"""
+    rng = random.Random(rng_seed)
+    init_db()
+
+    with Session(engine) as session:
+        if session.exec(select(User).where(User.username == "bench_user_0")).first():
+            raise SystemExit("Benchmark corpus already present; use a fresh working directory")
+
+        topic_slugs = list(session.exec(select(Topic.slug)).all())
+        now = datetime.utcnow()
+        start = date(2000, 1, 1)
+        span_days = (date(2024, 12, 31) - start).days
+
+        report_rows = [
+            {
+                "title": _sentence(rng, rng.randint(3, 8)).title(),
+                "content": _sentence(rng, rng.randint(60, 160)),
+                "date": start + timedelta(days=rng.randint(0, span_days)),
+            }
+            for _ in range(reports)
+        ]
+        for row in report_rows:
+            row["excerpt"] = make_excerpt(row["content"])
+        _insert(session, EconomicReport, report_rows)
+
+        _insert(session, Dataset, [
+            {
+                "name": _sentence(rng, rng.randint(2, 5)).title(),
+                "description": _sentence(rng, rng.randint(10, 30)),
+                "source_url": f"https://example.com/datasets/{i}.csv",
+                "created_at": now - timedelta(minutes=i),
+            }
+            for i in range(datasets)
+        ])
+
+        # bcrypt is deliberately slow, so hash once and share it
+        password_hash = hash_password(BENCH_PASSWORD)
+        _insert(session, User, [
+            {
+                "username": f"bench_user_{i}",
+                "email": f"bench_user_{i}@example.com",
+                "password_hash": password_hash,
+                "is_admin": False,
+                "created_at": now,
+            }
+            for i in range(users)
+        ])
+
+        user_ids = session.exec(
+            select(User.id).where(User.username.startswith("bench_user_"))
+        ).all()
+        roles = list(StakeholderRole)
+        frequencies = list(DigestFrequency)
+        _insert(session, Profile, [
+            {
+                "user_id": user_id,
+                "role": rng.choice(roles),
+                "language": rng.choice([Language.LT, Language.EN]),
+                "newsletter": rng.random() < 0.7,
+                "digest_frequency": rng.choice(frequencies),
+                "onboarding_completed": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for user_id in user_ids
+        ])
+
+        profile_ids = session.exec(
+            select(Profile.id)
+            .join(User, User.id == Profile.user_id)
+            .where(User.username.startswith("bench_user_"))
+        ).all()
+        _insert(session, ProfileTopic, [
+            {"profile_id": profile_id, "topic_slug": slug}
+            for profile_id in profile_ids
+            for slug in rng.sample(topic_slugs, rng.randint(1, 4))
+        ])
+
+    return {"reports": reports, "datasets": datasets, "users": users}
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a synthetic benchmark corpus")
+    parser.add_argument("--reports", type=int, default=100_000)
+    parser.add_argument("--datasets", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed for reproducible data")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = seed(args.reports, args.datasets, args.users, args.seed)
+    counts["seconds"] = round(time.perf_counter() - started, 1)
+    print(json.dumps(counts))
+
+if __name__ == "__main__":
+    main()
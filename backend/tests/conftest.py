@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+# Settings are read at import time and the database URL is relative to the
+# working directory, so both are fixed before the app is imported: every run
+# gets a scratch directory holding its database.
+os.chdir(tempfile.mkdtemp(prefix="lt-econ-portal-tests-"))
+os.environ.update({
+    "ENVIRONMENT": "test",
+    "JOBS_ENABLED": "false",
+    "ADMISSION_CONTROL": "false",
+    "PROFILING_ENABLED": "false",
+    "BCRYPT_ROUNDS": "4",
+    "JWT_SECRET_KEY": "test-secret-key",
+})
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+from app import query_budget  # noqa: E402
+from app.auth import create_access_token  # noqa: E402
+from app.db import engine  # noqa: E402
+from app.hashing import hash_password  # noqa: E402
+from app.models import User  # noqa: E402
+
+PASSWORD = "Correct-Horse-42"
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(monkeypatch):
+    """
+    Run every test with query budgets enforced: a request issuing more
+    statements than its @query_budget, or repeating one (N+1), raises
+    QueryBudgetExceeded out of the test client.
+    """
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "enforce")
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its startup hooks run (schema, sample data)"""
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+def make_user(username: str, is_admin: bool = False) -> User:
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).first()
+        if user is None:
+            user = User(username=username, email=f"{username}@example.com",
+                        password_hash=hash_password(PASSWORD), is_admin=is_admin)
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user
+
+def auth_headers(user: User) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.username, 'email': user.email})}"}
+
+@pytest.fixture(scope="session")
+def admin(client) -> User:
+    return make_user("test-admin", is_admin=True)
+
+@pytest.fixture(scope="session")
+def user(client) -> User:
+    return make_user("test-user")
+
+@pytest.fixture
+def admin_headers(admin) -> Dict[str, str]:
+    return auth_headers(admin)
+
+@pytest.fixture
+def user_headers(user) -> Dict[str, str]:
+    return auth_headers(user)
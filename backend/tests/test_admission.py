@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+import pytest
+
+from app.auth import create_access_token
+from app.middleware import admission
+from app.middleware.admission import AdaptiveLimit, AdmissionControlMiddleware, priority_class
+
+TOKEN = create_access_token({"sub": "admission-user"})
+
+@pytest.fixture(autouse=True)
+def admission_on(monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_CONTROL", True)
+
+def scope(path="/reports", token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    return {"type": "http", "method": "GET", "path": path, "headers": headers}
+
+async def call(middleware, request_scope):
+    """Status, Retry-After and body of one request through the middleware"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(request_scope, receive, send)
+    headers = dict(messages[0].get("headers", []))
+    return messages[0]["status"], headers.get(b"retry-after"), messages[-1].get("body", b"")
+
+def test_requests_over_their_class_share_are_shed():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def app(request_scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        limiter = AdaptiveLimit(initial=5, minimum=5, maximum=5)
+        middleware = AdmissionControlMiddleware(app, limiter)
+        # Four anonymous requests fill 80% of the limit ...
+        held = [asyncio.create_task(call(middleware, scope())) for _ in range(4)]
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 4
+
+        # ... so a fourth anonymous request and any login are refused
+        status, retry_after, body = await call(middleware, scope())
+        assert (status, retry_after) == (503, b"2")
+        assert json.loads(body) == {"detail": "Server is busy, please retry shortly"}
+        assert (await call(middleware, scope("/users/login")))[:2] == (503, b"5")
+
+        # Authenticated reads may use the whole limit; monitoring is never shed
+        held.append(asyncio.create_task(call(middleware, scope(token=TOKEN))))
+        held.append(asyncio.create_task(call(middleware, scope("/metrics"))))
+        await asyncio.sleep(0)
+        assert limiter.in_flight == 5
+        assert (await call(middleware, scope(token=TOKEN)))[:2] == (503, b"1")
+
+        release.set()
+        assert [status for status, _, _ in await asyncio.gather(*held)] == [200] * 6
+        assert limiter.in_flight == 0
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+def test_failures_cut_the_limit_and_successes_grow_it_back():
+    limiter = AdaptiveLimit(initial=10, minimum=4, maximum=12)
+    assert limiter.try_acquire("authenticated")
+    limiter.release("authenticated", 0.01, failed=True)
+    assert limiter.limit == pytest.approx(10 * admission.ADMISSION_BACKOFF)
+
+    limiter.limit = 4
+    for _ in range(3):
+        assert limiter.try_acquire("authenticated")
+    limiter.release("authenticated", 0.01, failed=False)  # half the limit still in use
+    assert limiter.limit == pytest.approx(4.25)
+
+def test_only_valid_access_tokens_count_as_authenticated():
+    assert priority_class(scope(token=TOKEN)) == "authenticated"
+    assert priority_class(scope(token="made-up")) == "anonymous"
+    cookie = {"type": "http", "path": "/reports", "headers": [(b"cookie", f"access_token={TOKEN}".encode())]}
+    assert priority_class(cookie) == "authenticated"
+    assert priority_class(scope("/users/login", token=TOKEN)) == "login"
@@ -0,0 +1,72 @@
+def test_partial_batch_creates_valid_items_and_reports_the_rest(client):
+    items = [
+        {"title": "Batch A", "content": "a", "date": "2024-01-10"},
+        {"title": "Batch B", "date": "2024-01-11"},  # no content
+        {"title": ["Batch C"], "content": "c", "date": "2024-01-12"},
+        {"id": 5, "title": "Batch D", "content": "d", "date": "2024-01-12"},  # not settable
+        {"title": "Batch E", "content": "e", "date": "2024-01-13"},
+        "not an object",
+    ]
+    response = client.post("/reports/batch", json=items)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["ok"], body["failed"]) == (2, 4)
+    assert [item["index"] for item in body["items"]] == list(range(len(items)))
+    assert [item["status"] for item in body["items"]] == ["created", "error", "error", "error", "created", "error"]
+    assert body["items"][1]["errors"][0]["loc"] == ["content"]
+    assert body["items"][3]["errors"][0]["type"] == "extra_forbidden"
+
+    # Each id belongs to the item at its index
+    for index in (0, 4):
+        report = client.get(f"/reports/{body['items'][index]['id']}").json()
+        assert (report["title"], report["content"]) == (items[index]["title"], items[index]["content"])
+
+def test_atomic_batch_writes_nothing_if_any_item_fails(client):
+    before = len(client.get("/reports?limit=1000").json())
+    items = [
+        {"title": "Atomic A", "content": "a", "date": "2024-02-01"},
+        {"title": "Atomic B", "content": "b"},
+    ]
+    response = client.post("/reports/batch?atomic=true", json=items)
+    assert response.status_code == 422
+    detail = response.json()["detail"]
+    assert (detail["ok"], detail["failed"]) == (1, 1)
+    assert len(client.get("/reports?limit=1000").json()) == before
+
+    items[1]["date"] = "2024-02-02"
+    response = client.post("/reports/batch?atomic=true", json=items)
+    assert response.status_code == 200
+    ids = [item["id"] for item in response.json()["items"]]
+    assert [client.get(f"/reports/{report_id}").json()["title"] for report_id in ids] == ["Atomic A", "Atomic B"]
+
+def test_large_batch_keeps_ids_in_item_order(client):
+    items = [{"title": f"Bulk {i}", "content": f"body {i}", "date": "2024-03-01"} for i in range(300)]
+    response = client.post("/reports/batch", json=items)
+    assert response.status_code == 200, response.text
+    created = response.json()["items"]
+    titles = {row["id"]: row["title"] for row in client.get("/reports?title=Bulk&limit=1000").json()}
+    assert all(titles[item["id"]] == items[item["index"]]["title"] for item in created)
+
+def test_batch_update_applies_valid_changes_only(client):
+    created = client.post("/reports/batch", json=[
+        {"title": "Patch A", "content": "a", "date": "2024-04-01"},
+        {"title": "Patch B", "content": "b", "date": "2024-04-02"},
+    ]).json()["items"]
+    first, second = (item["id"] for item in created)
+
+    response = client.patch("/reports/batch", json=[
+        {"id": first, "content": "a, revised"},
+        {"id": second, "title": None},
+        {"id": 10 ** 9, "title": "Missing"},
+    ])
+    assert response.status_code == 200, response.text
+    assert [item["status"] for item in response.json()["items"]] == ["updated", "error", "error"]
+    assert client.get(f"/reports/{first}").json()["content"] == "a, revised"
+    assert client.get(f"/reports/{second}").json()["title"] == "Patch B"
+
+    response = client.patch("/reports/batch?atomic=true", json=[
+        {"id": first, "title": "Patch A, again"},
+        {"id": second, "title": None},
+    ])
+    assert response.status_code == 422
+    assert client.get(f"/reports/{first}").json()["title"] == "Patch A"
@@ -0,0 +1,16 @@
+def test_anonymous_bootstrap(client):
+    response = client.get("/bootstrap")
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["user"] is None and body["profile"] is None
+    assert body["topics"] and body["csrf_token"]
+    assert response.cookies["csrf_token"] == body["csrf_token"]
+    assert response.headers["Cache-Control"] == "private, no-store"
+    assert body["cache"]["user"]["max_age"] == 0
+
+def test_bootstrap_for_a_signed_in_user(client, user, user_headers):
+    body = client.get("/bootstrap?lang=en", headers=user_headers).json()
+    assert body["user"]["username"] == user.username
+    assert "password_hash" not in body["user"]
+    assert body["cache"]["topics"]["lang"] == "en"
+    assert body["cache"]["topics"]["etag"] == client.get("/profiles/topics?lang=en").headers["ETag"]
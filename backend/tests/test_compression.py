@@ -0,0 +1,82 @@
+import gzip
+
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, available_encodings, negotiate_encoding
+
+BODY = "GDP grew by 3% in Q1. " * 200
+
+def compressed_app() -> TestClient:
+    def large(request):
+        return PlainTextResponse(BODY)
+
+    def small(request):
+        return PlainTextResponse("ok")
+
+    def image(request):
+        return Response(b"\x89PNG" + bytes(4000), media_type="image/png")
+
+    def stream(request):
+        return StreamingResponse(iter([BODY.encode()] * 3), media_type="text/csv")
+
+    app = Starlette(routes=[
+        Route("/large", large), Route("/small", small), Route("/image", image), Route("/stream", stream),
+    ])
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", "gzip"),
+    ("gzip, br", "br"),  # ties go to the server's preference
+    ("br;q=0.5, gzip;q=0.9", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *;q=0.1", "zstd"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate_encoding(header, expected):
+    assert negotiate_encoding(header, ["br", "zstd", "gzip"]) == expected
+
+def test_large_text_is_compressed_with_the_accepted_coding():
+    client = compressed_app()
+    for encoding in available_encodings():
+        response = client.get("/large", headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert response.text == BODY  # decoded by the client
+
+def test_raw_gzip_body_and_length():
+    client = compressed_app()
+    with client.stream("GET", "/large", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert int(response.headers["content-length"]) == len(raw) < len(BODY)
+    assert gzip.decompress(raw).decode() == BODY
+
+def test_small_binary_and_unaccepted_responses_pass_through():
+    client = compressed_app()
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/image", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+
+def test_streaming_responses_are_compressed_chunk_by_chunk():
+    response = compressed_app().get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BODY * 3
+
+def test_precompressed_payload_with_etag(client):
+    response = client.get("/profiles/topics", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    topics = response.json()
+    assert {"slug", "name", "description", "icon"} <= set(topics[0])
+
+    assert "content-encoding" not in client.get("/profiles/topics", headers={"Accept-Encoding": "identity"}).headers
+    response = client.get("/profiles/topics", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
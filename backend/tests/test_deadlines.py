@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session
+
+from app.db import engine
+from app.deadlines import Deadline, DeadlineExceeded, current_deadline
+from app.routes import reports
+
+# Counts to ten million: long enough to be interrupted several times over
+RUNAWAY_QUERY = text(
+    "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 10000000) SELECT count(*) FROM n"
+)
+
+def test_endpoint_over_its_deadline_gets_a_504(client, monkeypatch):
+    monkeypatch.setattr(reports.list_reports, "__request_timeout__", 0, raising=False)
+    response = client.get("/reports")
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request timed out"}
+    monkeypatch.undo()
+    assert client.get("/reports").status_code == 200
+
+def test_running_statement_is_interrupted_at_the_deadline():
+    deadline = Deadline({"type": "http", "path": "/test"})
+    deadline._expires_at = deadline.started + 0.05
+    token = current_deadline.set(deadline)
+    try:
+        with Session(engine) as session, pytest.raises(DeadlineExceeded) as raised:
+            session.execute(RUNAWAY_QUERY)
+    finally:
+        current_deadline.reset(token)
+    assert raised.value.reason == "timeout"
+
+    with Session(engine) as session:  # the connection went back to the pool usable
+        assert session.execute(text("SELECT 1")).scalar() == 1
+
+def test_disconnect_stops_the_request():
+    deadline = Deadline({"type": "http", "path": "/test"})
+    assert deadline.reason() is None
+    deadline.disconnected = True
+    assert deadline.reason() == "disconnect"
@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlmodel import Session
+
+from app.db import engine
+from app.digest import DigestRenderer
+from app.models import DigestFrequency, Language
+
+# Far enough ahead that no other test's reports fall into the week
+NOW = datetime(2031, 1, 10)
+
+def test_digests_list_the_reports_of_their_topics(client):
+    for title, topics in (("Digest economy", ["economy"]), ("Digest labor", ["labor"]), ("Digest untagged", [])):
+        response = client.post("/reports", json={"title": title, "content": "Body", "date": "2031-01-05",
+                                                  "topics": topics})
+        assert response.status_code == 201, response.text
+
+    with Session(engine) as session:
+        renderer = DigestRenderer(session, DigestFrequency.WEEKLY, NOW)
+
+    def body(*topics):
+        return renderer.render((DigestFrequency.WEEKLY, Language.EN, frozenset(topics))).get_content()
+
+    assert "Digest economy" in body("economy")
+    assert "Digest labor" not in body("economy") and "Digest untagged" not in body("economy")
+    assert all(title in body() for title in ("Digest economy", "Digest labor", "Digest untagged"))
@@ -0,0 +1,61 @@
+import pytest
+
+# A title word no sample report uses, so the title filter scopes the counts to these reports
+WORD = "Zephyrfacet"
+
+def counts(facet):
+    return {item["value"]: item["count"] for item in facet}
+
+@pytest.fixture(scope="module")
+def reports(client):
+    bodies = [
+        {"title": f"{WORD} one", "content": "x", "date": "2023-06-01", "topics": ["economy"], "sources": ["Eurostat"]},
+        {"title": f"{WORD} two", "content": "x", "date": "2024-02-01", "topics": ["economy", "labor"], "sources": ["LB"]},
+        {"title": f"{WORD} three", "content": "x", "date": "2024-09-01", "topics": ["labor"]},
+    ]
+    ids = []
+    for body in bodies:
+        response = client.post("/reports", json=body)
+        assert response.status_code == 201, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+def test_counts_for_a_filter(client, reports):
+    body = client.get(f"/reports/facets?title={WORD}").json()
+    assert body["total"] == 3
+    assert counts(body["topics"]) == {"economy": 2, "labor": 2}
+    assert counts(body["sources"]) == {"Eurostat": 1, "LB": 1}
+    assert counts(body["years"]) == {2024: 2, 2023: 1}
+    assert [item["value"] for item in body["years"]] == [2024, 2023]
+
+def test_a_facet_ignores_its_own_selection(client, reports):
+    body = client.get(f"/reports/facets?title={WORD}&topics=labor").json()
+    assert body["total"] == 2
+    # Other topics still show what they would add
+    assert counts(body["topics"]) == {"economy": 2, "labor": 2}
+    assert [item["value"] for item in body["topics"] if item["selected"]] == ["labor"]
+    # Other facets are narrowed by it
+    assert counts(body["sources"]) == {"LB": 1}
+    assert counts(body["years"]) == {2024: 2}
+
+def test_facets_are_anded_and_selected_values_stay_listed(client, reports):
+    body = client.get(f"/reports/facets?title={WORD}&topics=labor&years=2023").json()
+    assert body["total"] == 0
+    assert counts(body["years"]) == {2024: 2, 2023: 0}
+    assert counts(body["topics"]) == {"economy": 1, "labor": 0}
+
+def test_counts_follow_writes(client, reports):
+    first, _, third = reports
+    response = client.put(f"/reports/{third}", json={
+        "title": f"{WORD} three", "content": "x", "date": "2024-09-01", "topics": ["economy"],
+    })
+    assert response.status_code == 200, response.text
+    assert counts(client.get(f"/reports/facets?title={WORD}").json()["topics"]) == {"economy": 3, "labor": 1}
+
+    assert client.delete(f"/reports/{first}").status_code == 204
+    body = client.get(f"/reports/facets?title={WORD}").json()
+    assert body["total"] == 2
+    assert counts(body["years"]) == {2024: 2}
+
+def test_non_integer_years_are_rejected(client):
+    assert client.get("/reports/facets?years=last").status_code == 400
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, select
+
+from app import jobs
+from app.db import engine
+from app.jobs import Schedule, _finish, claim_next_job, enqueue, enqueue_due_schedules
+from app.models import Job, JobStatus
+
+# Above anything the app queues, so these jobs are claimed first
+TOP_PRIORITY = 1000
+
+def load(job_id: int) -> Job:
+    with Session(engine) as session:
+        return session.get(Job, job_id)
+
+def test_dedupe_key_returns_the_pending_job():
+    first = enqueue("refresh_datasets", dedupe_key="test-dedupe")
+    assert enqueue("refresh_datasets", dedupe_key="test-dedupe").id == first.id
+    _finish(first.id, result={"ok": True})
+    assert enqueue("refresh_datasets", dedupe_key="test-dedupe").id != first.id
+
+def test_jobs_are_claimed_by_priority_and_retried_with_backoff():
+    low = enqueue("refresh_datasets", priority=TOP_PRIORITY, max_attempts=2)
+    high = enqueue("refresh_datasets", priority=TOP_PRIORITY + 1, max_attempts=2)
+    assert claim_next_job().id == high.id
+    claimed = claim_next_job()
+    assert (claimed.id, claimed.status, claimed.attempts) == (low.id, JobStatus.RUNNING, 1)
+
+    _finish(low.id, error="boom")
+    job = load(low.id)
+    assert job.status == JobStatus.QUEUED and job.run_at > datetime.utcnow()
+    assert job.error == "boom"
+
+    # Not due yet, so a worker does not pick it up again straight away
+    claimed = claim_next_job()
+    assert claimed is None or claimed.id != low.id
+
+def test_final_attempt_marks_the_job_failed():
+    job = enqueue("refresh_datasets", priority=TOP_PRIORITY, max_attempts=1)
+    assert claim_next_job().id == job.id
+    _finish(job.id, error="boom")
+    assert load(job.id).status == JobStatus.FAILED
+
+def test_due_schedules_are_queued_once(monkeypatch):
+    monkeypatch.setattr(jobs, "_schedules", [Schedule("test-hourly", "refresh_datasets", timedelta(hours=1))])
+    enqueue_due_schedules()
+    enqueue_due_schedules()  # still queued: not added again
+    with Session(engine) as session:
+        queued = session.exec(select(Job).where(Job.dedupe_key == "schedule:test-hourly")).all()
+    assert len(queued) == 1
+
+def test_queue_and_read_jobs_over_http(client, admin_headers, user_headers):
+    response = client.post("/jobs", json={"type": "refresh_datasets"}, headers=admin_headers)
+    assert response.status_code == 202, response.text
+    job = response.json()
+    assert (job["type"], job["status"]) == ("refresh_datasets", "queued")
+    assert client.get(f"/jobs/{job['id']}", headers=admin_headers).json()["id"] == job["id"]
+    assert client.get(f"/jobs/{job['id']}", headers=user_headers).status_code == 404  # not their job
+    assert client.get(f"/jobs/{job['id']}").status_code == 401
+
+    assert client.post("/jobs", json={"type": "nope"}, headers=admin_headers).status_code == 400
+    assert client.post("/jobs", json={"type": "refresh_datasets"}, headers=user_headers).status_code == 403
+
+def test_replacing_a_dataset_source_queues_a_refresh(client, admin_headers):
+    response = client.post("/datasets", json={"name": "Refreshed", "description": "d"}, headers=admin_headers)
+    assert "X-Job-Id" not in response.headers
+    response = client.put(f"/datasets/{response.json()['id']}", headers=admin_headers, json={
+        "name": "Refreshed", "description": "d", "source_url": "https://data.example.com/series.csv",
+    })
+    assert response.status_code == 200, response.text
+    assert load(int(response.headers["X-Job-Id"])).type == "refresh_dataset"
@@ -0,0 +1,34 @@
+from app.routes import metrics as metrics_route
+
+def sample(client, name, **labels) -> float:
+    """Current value of one series in the /metrics output (0 if absent)"""
+    selector = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f"{name}{{{selector}}} " if labels else f"{name} "
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0.0
+
+def test_requests_are_counted_by_route_template(client):
+    labels = {"method": "GET", "route": "/reports/{report_id}", "status": "200"}
+    before = sample(client, "http_requests_total", **labels)
+    missing = sample(client, "http_requests_total", **{**labels, "status": "404"})
+    report_id = client.get("/reports").json()[0]["id"]
+    assert client.get(f"/reports/{report_id}").status_code == 200
+    assert client.get(f"/reports/{report_id}").status_code == 200
+    assert client.get("/reports/999999").status_code == 404
+    assert sample(client, "http_requests_total", **labels) == before + 2
+    assert sample(client, "http_requests_total", **{**labels, "status": "404"}) == missing + 1
+
+def test_sql_statements_are_attributed_to_the_route(client):
+    before = sample(client, "db_queries_total", route="/reports")
+    client.get("/reports")
+    assert sample(client, "db_queries_total", route="/reports") > before
+
+def test_metrics_token_is_required_when_set(client, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "scrape-me")
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-me"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
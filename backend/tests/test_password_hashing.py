@@ -0,0 +1,62 @@
+import pytest
+from conftest import PASSWORD, make_user
+from sqlmodel import Session
+
+from app import hashing
+from app.db import engine
+from app.models import User
+from app.routes import users
+
+def stored_hash(user_id: int) -> str:
+    with Session(engine) as session:
+        return session.get(User, user_id).password_hash
+
+def test_calibrated_cost_stays_within_bounds():
+    assert hashing.BCRYPT_MIN_ROUNDS <= hashing.calibrate_rounds(target_ms=1) <= hashing.BCRYPT_MAX_ROUNDS
+    assert hashing.calibrate_rounds(target_ms=10 ** 9) == hashing.BCRYPT_MAX_ROUNDS
+
+def test_only_weaker_hashes_need_a_rehash():
+    weak = hashing.hash_password(PASSWORD)
+    hashing.configure_rounds(5)
+    try:
+        strong = hashing.hash_password(PASSWORD)
+        assert strong.startswith("$2b$05$")
+        assert hashing.needs_rehash(weak)
+        assert not hashing.needs_rehash(strong)
+        assert hashing.verify_password(PASSWORD, weak)
+    finally:
+        hashing.configure_rounds(4)
+    assert not hashing.needs_rehash(strong)  # stronger hashes are left alone
+
+def wait_for_rehashes():
+    users._rehash_executor.submit(lambda: None).result()
+
+@pytest.mark.parametrize("oauth2", [False, True])
+def test_login_upgrades_a_weaker_hash(client, oauth2):
+    user = make_user(f"rehash-on-login-{int(oauth2)}")
+    assert stored_hash(user.id).startswith("$2b$04$")
+    hashing.configure_rounds(5)
+    try:
+        if oauth2:
+            response = client.post("/users/login/oauth2", data={"username": user.username, "password": PASSWORD})
+        else:
+            response = client.post("/users/login", json={"username": user.username, "password": PASSWORD})
+        assert response.status_code == 200, response.text
+        wait_for_rehashes()  # the upgrade runs after the response, off the request
+    finally:
+        hashing.configure_rounds(4)
+    upgraded = stored_hash(user.id)
+    assert upgraded.startswith("$2b$05$")
+    assert hashing.verify_password(PASSWORD, upgraded)
+
+def test_wrong_password_is_refused_without_a_rehash(client):
+    user = make_user("rehash-wrong-password")
+    before = stored_hash(user.id)
+    hashing.configure_rounds(5)
+    try:
+        response = client.post("/users/login", json={"username": user.username, "password": "Wrong-Horse-42"})
+        assert response.status_code == 401
+        wait_for_rehashes()
+    finally:
+        hashing.configure_rounds(4)
+    assert stored_hash(user.id) == before
@@ -0,0 +1,62 @@
+import hashlib
+
+import pytest
+
+from app.utils import password as policy
+from app.utils.breach_filter import BreachFilter, build_filter
+from app.utils.password import validate_password
+
+STRONG = "Vx7!mQ2#rLp9"
+
+def errors(password):
+    return validate_password(password).get("errors", [])
+
+def test_a_strong_password_passes():
+    result = validate_password(STRONG)
+    assert result["valid"]
+    assert result["strength"] == "strong"
+
+@pytest.mark.parametrize("password, error", [
+    ("Vx7!mQ2#rL", "at least 12 characters"),
+    ("vx7!mq2#rlp9", "uppercase letter"),
+    ("VX7!MQ2#RLP9", "lowercase letter"),
+    ("Vxa!mQb#rLpz", "one number"),
+    ("Vx7pmQ2wrLp9", "special character"),
+    ("Vx7!Dragon2#", "common patterns"),
+    ("Vx7!mQ2#rrrL", "repeated characters"),
+    ("Vx7!asdfgh2#", "keyboard sequences"),   # keyboard row
+    ("Vx7!cdefgh2#", "keyboard sequences"),   # alphabet
+    ("Vq!345678mZ#", "keyboard sequences"),   # digits
+    ("Vq!9ZXCVBNm#", "keyboard sequences"),   # keyboard row, any case
+    ("Aa1!Aa1!Aa1!", "character variety"),
+])
+def test_each_rule_is_reported(password, error):
+    assert any(error in message for message in errors(password)), errors(password)
+
+def test_short_runs_are_allowed():
+    assert validate_password("Vx7!asdfQ2#m")["valid"]  # four keys of a row
+    assert validate_password("Vx7!abcdeQ2#")["valid"]  # five letters of the alphabet
+
+def test_runs_do_not_carry_across_sequences():
+    # b-c-d-e along the alphabet, then e-r-t along the top row
+    assert validate_password("Zq!9bcdertMw")["valid"]
+
+def test_breached_passwords_are_rejected(tmp_path, monkeypatch):
+    breached = "Summer-Breeze-2024!"
+    path = tmp_path / "breached.bf"
+    build_filter((hashlib.sha1(word.encode()).digest() for word in (breached, "hunter2")), 2, path)
+    monkeypatch.setattr(policy, "breached_passwords", BreachFilter(path))
+    assert "Password has appeared in a data breach" in errors(breached)
+    assert validate_password(STRONG)["valid"]
+
+def test_a_missing_filter_disables_the_check(tmp_path):
+    missing = BreachFilter(tmp_path / "absent.bf")
+    assert not missing.available
+    assert "hunter2" not in missing
+
+def test_register_enforces_the_policy(client):
+    response = client.post("/users/register", json={
+        "username": "weak-registrant", "email": "weak@example.com", "password": "qwerty",
+    })
+    assert response.status_code == 400
+    assert "at least 12 characters" in response.json()["detail"]
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from app.middleware import profiling
+
+@pytest.fixture(autouse=True)
+def profiling_on(monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+
+def test_admins_can_profile_a_request(client, admin_headers):
+    response = client.get("/reports?profile=1", headers=admin_headers)
+    assert response.status_code == 200, response.text
+    profile_id = response.headers["X-Profile-Id"]
+    assert profile_id in client.get("/admin/debug/profiles", headers=admin_headers).json()["profiles"]
+
+    response = client.get(f"/admin/debug/profiles/{profile_id}", headers=admin_headers)
+    assert response.status_code == 200
+    assert json.loads(response.content)["profiles"][0]["name"] == "GET /reports"
+    response = client.get(f"/admin/debug/profiles/{profile_id}?format=collapsed", headers=admin_headers)
+    assert response.headers["content-type"].startswith("text/plain")
+
+def test_profile_tokens_flag_requests_without_an_admin_lookup(client, admin_headers):
+    token = client.post("/admin/debug/profile-token", headers=admin_headers).json()["token"]
+    assert "X-Profile-Id" in client.get("/reports", headers={"X-Profile": token}).headers
+    assert "X-Profile-Id" not in client.get("/reports", headers={"X-Profile": "forged"}).headers
+
+def test_other_users_are_not_profiled(client, user_headers):
+    response = client.get("/reports?profile=1", headers=user_headers)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert client.get("/admin/debug/profiles", headers=user_headers).status_code == 403
+
+def test_tracemalloc_diffs(client, admin_headers):
+    assert client.get("/admin/debug/tracemalloc", headers=admin_headers).status_code == 409
+    assert client.post("/admin/debug/tracemalloc", headers=admin_headers).json()["tracing"]
+    try:
+        growth = [bytearray(1024) for _ in range(100)]  # noqa: F841
+        body = client.get("/admin/debug/tracemalloc?limit=5", headers=admin_headers).json()
+        assert body["traced_bytes"] > 0 and len(body["top"]) <= 5
+    finally:
+        assert client.delete("/admin/debug/tracemalloc", headers=admin_headers).status_code == 204
@@ -0,0 +1,67 @@
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import Dashboard
+from app.projections import make_excerpt
+
+def test_list_views_default_to_the_summary(client):
+    report = client.get("/reports").json()[0]
+    assert set(report) == {"id", "title", "date", "excerpt"}
+    dashboard = client.get("/dashboards").json()[0]
+    assert set(dashboard) == {"id", "title", "description", "tags"}
+    assert isinstance(dashboard["tags"], list)
+
+def test_detail_view_decodes_dashboard_tags(client):
+    dashboard = client.get("/dashboards").json()[0]
+    detail = client.get(f"/dashboards/{dashboard['id']}").json()
+    assert detail["tags"] == dashboard["tags"]
+    assert isinstance(detail["tags"], list)
+
+def test_fields_selects_only_the_named_columns(client):
+    assert set(client.get("/reports?fields=id,title").json()[0]) == {"id", "title"}
+    assert set(client.get("/datasets?fields=name").json()[0]) == {"name"}
+    assert set(client.get("/dashboards?fields=id,created_at").json()[0]) == {"id", "created_at"}
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/reports?fields=id,password")
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+def test_excerpt_follows_content_writes(client):
+    content = "Growth slowed " * 40
+    report_id = client.post("/reports", json={"title": "Excerpted", "content": content, "date": "2024-06-01"}).json()["id"]
+    listed = client.get("/reports?title=Excerpted&fields=id,excerpt").json()
+    assert listed == [{"id": report_id, "excerpt": make_excerpt(content)}]
+
+    client.put(f"/reports/{report_id}", json={"title": "Excerpted", "content": "Short now", "date": "2024-06-01"})
+    assert client.get("/reports?title=Excerpted&fields=excerpt").json() == [{"excerpt": "Short now"}]
+
+def test_make_excerpt_cuts_at_a_word_boundary():
+    assert make_excerpt("  Short\n text ") == "Short text"
+    excerpt = make_excerpt("word " * 100, length=22)
+    assert excerpt == "word word word word..."
+
+def test_dashboard_tags_must_be_a_json_array(client):
+    for tags in ("gdp, growth", '"gdp"', "[1, 2]"):
+        response = client.post("/dashboards", json={"title": "Bad tags", "tags": tags})
+        assert response.status_code == 400, tags
+    assert client.get("/dashboards").status_code == 200
+
+    response = client.post("/dashboards", json={"title": "Tagged", "tags": '["gdp", "growth"]'})
+    assert response.status_code == 201, response.text
+    dashboard = response.json()
+    assert dashboard["tags"] == ["gdp", "growth"]
+    response = client.put(f"/dashboards/{dashboard['id']}", json={"title": "Tagged", "tags": '["gdp"]'})
+    assert response.json()["tags"] == ["gdp"]
+    assert client.put(f"/dashboards/{dashboard['id']}", json={"title": "Tagged", "tags": "gdp"}).status_code == 400
+
+def test_unchecked_stored_tags_still_decode(client):
+    with Session(engine) as session:
+        legacy = Dashboard(title="Legacy tags", tags="gdp, growth")
+        session.add(legacy)
+        session.commit()
+        session.refresh(legacy)
+    response = client.get("/dashboards")
+    assert response.status_code == 200
+    assert {"id": legacy.id, "title": "Legacy tags", "description": None, "tags": ["gdp", "growth"]} in response.json()
+    assert client.get(f"/dashboards/{legacy.id}").json()["tags"] == ["gdp", "growth"]
@@ -0,0 +1,97 @@
+import pytest
+from sqlmodel import Session, select
+
+from app import query_budget
+from app.db import engine
+from app.metrics import RequestStats
+from app.models import User
+from app.query_budget import QueryBudgetExceeded, assert_max_queries, check_budget
+from app.routes import reports
+
+# Read-only routes and the queries they may issue; enforce mode fails any
+# request going over its @query_budget
+PUBLIC_GETS = [
+    "/reports",
+    "/reports?title=economic&sort_by=date&sort_order=desc&limit=5",
+    "/reports?fields=id,title,date,content&limit=50",
+    "/reports?date_from=2020-01-01&date_to=2024-12-31",
+    "/reports?topics=economy&sources=Eurostat&date_from=2020-01-01",
+    "/reports/facets",
+    "/reports/facets?title=economic&topics=economy&years=2024",
+    "/reports/timeline?interval=quarter",
+    "/reports/trending?limit=5",
+    "/datasets",
+    "/datasets?fields=id,name",
+    "/dashboards",
+    "/dashboards?fields=id,title,tags",
+    "/sources",
+    "/series",
+    "/aggregates?group_by=region,year&stats=count,mean,median,p90",
+    "/profiles/topics?lang=en",
+    "/bootstrap",
+    "/search/suggest?q=inf",
+]
+
+@pytest.mark.parametrize("url", PUBLIC_GETS)
+def test_public_routes_stay_within_budget(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    assert "X-DB-Queries" in response.headers
+
+def test_detail_routes_stay_within_budget(client):
+    report_id = client.get("/reports").json()[0]["id"]
+    dashboard_id = client.get("/dashboards").json()[0]["id"]
+    dataset_id = client.get("/datasets").json()[0]["id"]
+    for url in (f"/reports/{report_id}", f"/dashboards/{dashboard_id}", f"/datasets/{dataset_id}"):
+        response = client.get(url)
+        assert response.status_code == 200, response.text
+
+def test_authenticated_routes_stay_within_budget(client, user_headers):
+    for url in ("/users/me", "/profiles/me", "/profiles/recommendations", "/bootstrap"):
+        response = client.get(url, headers=user_headers)
+        assert response.status_code in (200, 404), f"{url}: {response.text}"
+
+def test_write_routes_stay_within_budget(client, admin_headers):
+    response = client.post("/reports", json={
+        "title": "Budgeted write", "content": "Body", "date": "2024-05-01",
+        "topics": ["economy"], "sources": ["Eurostat"],
+    })
+    assert response.status_code == 201, response.text
+    report_id = response.json()["id"]
+    response = client.put(f"/reports/{report_id}", json={
+        "title": "Budgeted write, edited", "content": "Body", "date": "2024-05-02", "topics": ["labor"],
+    })
+    assert response.status_code == 200, response.text
+    assert client.delete(f"/reports/{report_id}").status_code == 204
+
+    response = client.post("/datasets", json={"name": "Budgeted", "description": "d"}, headers=admin_headers)
+    assert response.status_code == 201, response.text
+
+def test_over_budget_request_fails_in_enforce_mode(client, monkeypatch):
+    monkeypatch.setattr(reports.list_reports, "__query_budget__", 0)
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/reports")
+
+def test_assert_max_queries_counts_statements_outside_requests():
+    with Session(engine) as session:
+        with assert_max_queries(1):
+            session.exec(select(User).limit(1)).all()
+        with pytest.raises(QueryBudgetExceeded):
+            with assert_max_queries(1):
+                session.exec(select(User).limit(1)).all()
+                session.exec(select(User.id).limit(1)).all()
+
+def test_repeated_statements_are_reported_as_n_plus_one():
+    stats = RequestStats(record_statements=True)
+    stats.queries = 4
+    stats.statements = ["SELECT report"] + ["SELECT topic WHERE report_id = ?"] * 3
+    with pytest.raises(QueryBudgetExceeded, match="possible N\\+1"):
+        check_budget(stats, 10, "GET /reports")
+
+def test_warn_mode_logs_instead_of_raising(monkeypatch, caplog):
+    monkeypatch.setattr(query_budget, "QUERY_BUDGET_MODE", "warn")
+    stats = RequestStats(record_statements=True)
+    stats.queries = 2
+    stats.statements = ["SELECT 1", "SELECT 2"]
+    check_budget(stats, 1, "GET /reports")
+    assert "issued 2 queries (budget 1)" in caplog.text
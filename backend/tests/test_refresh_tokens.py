@@ -0,0 +1,67 @@
+from conftest import PASSWORD, make_user
+
+from app import refresh_tokens
+from app.refresh_tokens import issue_refresh_token
+
+def cleared_cookies(response):
+    """Names of the cookies a response deletes"""
+    return {
+        header.split("=", 1)[0]
+        for header in response.headers.get_list("set-cookie")
+        if "max-age=0" in header.lower()
+    }
+
+def refresh(client, token):
+    # Cookies are marked Secure, so they are passed by hand to the http:// test client
+    return client.post("/users/refresh", headers={"Cookie": f"refresh_token={token}"})
+
+def test_login_sets_a_refresh_token_that_rotates(client):
+    make_user("rotating-login")
+    response = client.post("/users/login", json={"username": "rotating-login", "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    first = response.cookies["refresh_token"]
+
+    response = refresh(client, first)
+    assert response.status_code == 200, response.text
+    second = response.cookies["refresh_token"]
+    assert second != first
+    assert response.cookies["access_token"]
+
+    response = refresh(client, second)
+    assert response.status_code == 200, response.text
+    assert response.cookies["refresh_token"] not in (first, second)
+
+def test_reused_token_revokes_the_family(client, monkeypatch):
+    monkeypatch.setattr(refresh_tokens, "REFRESH_REUSE_GRACE_SECONDS", 0)
+    first = issue_refresh_token(make_user("reuse"))
+    second = refresh(client, first).cookies["refresh_token"]
+
+    # The superseded token comes back: someone holds a copy of the chain
+    response = refresh(client, first)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Refresh token has been revoked"
+    assert cleared_cookies(response) >= {"refresh_token", "access_token"}
+    # ... so the legitimate holder's newer token stops working too
+    assert refresh(client, second).status_code == 401
+
+def test_concurrent_refresh_within_grace_keeps_the_new_cookie(client):
+    first = issue_refresh_token(make_user("two-tabs"))
+    second = refresh(client, first).cookies["refresh_token"]
+
+    # Another tab sent the same token at the same moment
+    response = refresh(client, first)
+    assert response.status_code == 200
+    assert "refresh_token" not in response.cookies
+    assert refresh(client, second).status_code == 200
+
+def test_logout_revokes_the_family(client):
+    token = issue_refresh_token(make_user("leaving"))
+    response = client.post("/users/logout", headers={"Cookie": f"refresh_token={token}"})
+    assert response.status_code == 200, response.text
+    response = refresh(client, token)
+    assert response.status_code == 401
+    assert cleared_cookies(response) >= {"refresh_token", "access_token"}
+
+def test_access_token_is_not_a_refresh_token(client, user_headers):
+    access_token = user_headers["Authorization"].split(" ", 1)[1]
+    assert refresh(client, access_token).status_code == 401
@@ -0,0 +1,28 @@
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import ContentType
+from app.related import update_related
+
+def create_report(client, title, content):
+    response = client.post("/reports", json={"title": title, "content": content, "date": "2024-06-01"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_similar_reports_become_neighbours(client):
+    dairy = create_report(client, "Dairy cooperatives", "Milk cheese butter cooperatives dairy farmers quota")
+    cheese = create_report(client, "Cheese exports", "Cheese butter milk exports dairy farmers prices")
+    other = create_report(client, "Railway freight", "Locomotive wagons freight railway tonnage corridor")
+    with Session(engine) as session:
+        update_related(session, [(ContentType.REPORT, dairy), (ContentType.REPORT, cheese),
+                                 (ContentType.REPORT, other)])
+
+    related = client.get(f"/reports/{dairy}").json()["related"]
+    ids = [item["id"] for item in related["reports"]]
+    assert ids[0] == cheese
+    assert other not in ids
+    assert dairy not in ids
+
+    assert client.delete(f"/reports/{cheese}").status_code in (200, 204)
+    related = client.get(f"/reports/{dairy}").json()["related"]
+    assert cheese not in [item["id"] for item in related["reports"]]  # deleted items are skipped at once
@@ -0,0 +1,35 @@
+import pytest
+
+# A title word no sample report uses, so the title filter scopes results to these reports
+WORD = "Quarterdated"
+
+@pytest.fixture(scope="module")
+def reports(client):
+    items = [
+        {"title": f"{WORD} {day}", "content": "x", "date": day}
+        for day in ("2023-02-10", "2023-03-31", "2023-11-05", "2024-01-01", "2024-07-15")
+    ]
+    response = client.post("/reports/batch?atomic=true", json=items)
+    assert response.status_code == 200, response.text
+    return items
+
+def test_date_range_is_inclusive_and_sorted_by_date(client, reports):
+    rows = client.get(f"/reports?title={WORD}&date_from=2023-03-31&date_to=2024-01-01&sort_order=asc").json()
+    assert [row["date"] for row in rows] == ["2023-03-31", "2023-11-05", "2024-01-01"]
+    rows = client.get(f"/reports?title={WORD}&date=2024-07-15").json()
+    assert [row["date"] for row in rows] == ["2024-07-15"]
+
+def test_timeline_counts_per_quarter_and_year(client, reports):
+    quarters = client.get(f"/reports/timeline?title={WORD}").json()
+    assert [(row["period"], row["count"]) for row in quarters] == [
+        ("2023-Q1", 2), ("2023-Q4", 1), ("2024-Q1", 1), ("2024-Q3", 1),
+    ]
+    years = client.get(f"/reports/timeline?interval=year&title={WORD}&date_from=2023-03-01").json()
+    assert [(row["period"], row["count"]) for row in years] == [("2023", 2), ("2024", 2)]
+
+def test_invalid_dates_are_rejected(client):
+    assert client.get("/reports?date_from=last-week").status_code == 422
+    response = client.post("/reports", json={"title": f"{WORD} bad", "content": "x", "date": "2024-13-01"})
+    assert response.status_code == 422
+    response = client.post("/reports/batch", json=[{"title": f"{WORD} bad", "content": "x", "date": "soon"}])
+    assert response.json()["items"][0]["errors"][0]["loc"] == ["date"]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from app.models import Aggregation, SeriesFrequency
+from app.series import downsample, period_labels, to_months, upsample
+
+M, Q, A = SeriesFrequency.MONTHLY, SeriesFrequency.QUARTERLY, SeriesFrequency.ANNUAL
+
+def months(*periods):
+    return to_months(np.array([f"{year}-{month:02d}-01" for year, month in periods], dtype="datetime64[D]"))
+
+QUARTERS_2023 = months((2023, 1), (2023, 4), (2023, 7), (2023, 10))
+
+def test_downsample_aggregates_and_blanks_incomplete_periods():
+    monthly = months(*[(2023, m) for m in range(1, 13)], (2024, 1))
+    values = np.arange(1.0, 14.0)
+    buckets, sums = downsample(monthly, values, M, Q, Aggregation.SUM)
+    assert period_labels(buckets, Q) == ["2023-Q1", "2023-Q2", "2023-Q3", "2023-Q4", "2024-Q1"]
+    assert sums[:4].tolist() == [6.0, 15.0, 24.0, 33.0]
+    assert np.isnan(sums[4])  # one month of three
+
+    _, means = downsample(monthly, values, M, Q, Aggregation.MEAN)
+    assert means[:4].tolist() == [2.0, 5.0, 8.0, 11.0]
+    _, lasts = downsample(monthly, values, M, A, Aggregation.LAST)
+    assert lasts[0] == 12.0
+
+def test_repeat_upsampling_covers_every_sub_period():
+    buckets, values = upsample(QUARTERS_2023, np.array([1.0, 2.0, 3.0, 4.0]), Q, M, Aggregation.MEAN, "repeat")
+    assert period_labels(buckets, M)[0] == "2023-01" and period_labels(buckets, M)[-1] == "2023-12"
+    assert values.tolist() == [1.0] * 3 + [2.0] * 3 + [3.0] * 3 + [4.0] * 3
+
+def test_linear_upsampling_fills_the_last_period_with_the_last_slope():
+    buckets, values = upsample(QUARTERS_2023, np.array([10.0, 12.0, 13.0, 16.0]), Q, M, Aggregation.MEAN, "linear")
+    labels = period_labels(buckets, M)
+    assert labels[0] == "2023-01" and labels[-1] == "2023-12"  # Nov and Dec included
+    assert values[:4].tolist() == pytest.approx([10.0, 10 + 2 / 3, 10 + 4 / 3, 12.0])
+    assert values[-3:].tolist() == pytest.approx([16.0, 17.0, 18.0])
+
+def test_linear_upsampling_of_a_single_period_repeats_it():
+    _, values = upsample(QUARTERS_2023[:1], np.array([5.0]), Q, M, Aggregation.MEAN, "linear")
+    assert values.tolist() == [5.0, 5.0, 5.0]
+
+@pytest.mark.parametrize("method", ["repeat", "linear"])
+def test_upsampled_flows_sum_back_to_their_totals(method):
+    totals = np.array([30.0, 36.0, 39.0, 48.0])
+    buckets, values = upsample(QUARTERS_2023, totals, Q, M, Aggregation.SUM, method)
+    assert len(values) == 12
+    _, summed = downsample(buckets, values, M, Q, Aggregation.SUM)
+    assert summed.tolist() == pytest.approx(totals.tolist())
+
+def test_linear_flows_skip_periods_without_a_total():
+    quarters = months((2023, 1), (2023, 10))  # Q2 and Q3 not published
+    buckets, values = upsample(quarters, np.array([30.0, 48.0]), Q, M, Aggregation.SUM, "linear")
+    assert period_labels(buckets, M) == ["2023-01", "2023-02", "2023-03", "2023-10", "2023-11", "2023-12"]
+    assert values[:3].sum() == pytest.approx(30.0)
+    assert values[3:].sum() == pytest.approx(48.0)
+
+def test_compare_aligns_series_of_different_frequencies(client, admin_headers):
+    for series_id, frequency, aggregation, rows in (
+        ("TEST.GDP.Q", "Q", "sum", [{"period": f"2023-Q{q}", "value": v} for q, v in zip(range(1, 5), (30, 36, 39, 48))]),
+        ("TEST.HICP.M", "M", "mean", [{"period": f"2023-{m:02d}", "value": m} for m in range(1, 13)]),
+    ):
+        response = client.put(f"/series/{series_id}", headers=admin_headers, json={
+            "name": series_id, "indicator": series_id.split(".")[1].lower(), "region": "LT",
+            "frequency": frequency, "aggregation": aggregation,
+        })
+        assert response.status_code == 200, response.text
+        response = client.put(f"/series/{series_id}/observations", headers=admin_headers, json=rows)
+        assert response.status_code == 200, response.text
+
+    # Defaults to the lowest frequency: monthly HICP averaged per quarter
+    body = client.get("/series/compare?ids=TEST.GDP.Q,TEST.HICP.M").json()
+    assert body["frequency"] == "Q"
+    assert body["periods"] == ["2023-Q1", "2023-Q2", "2023-Q3", "2023-Q4"]
+    assert body["values"] == [[30, 36, 39, 48], [2, 5, 8, 11]]
+
+    body = client.get("/series/compare?ids=TEST.GDP.Q,TEST.HICP.M&frequency=M").json()
+    assert body["periods"][0] == "2023-01" and body["periods"][-1] == "2023-12"
+    assert body["values"][0][:3] == [10, 10, 10]
+    assert body["values"][1] == list(range(1, 13))
+
+    body = client.get("/series/compare?ids=TEST.GDP.Q,TEST.HICP.M&frequency=M&upsample=linear").json()
+    assert body["periods"][-1] == "2023-12"
+    gdp = body["values"][0]
+    assert None not in gdp
+    assert sum(gdp[9:12]) == pytest.approx(48)
+
+    assert client.get("/series/compare?ids=TEST.GDP.Q,TEST.NOPE").status_code == 404
@@ -0,0 +1,49 @@
+import pytest
+
+from app.search import SuggestIndex, fold
+
+def suggest(client, query, **params):
+    response = client.get("/search/suggest", params={"q": query, **params})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.fixture(scope="module")
+def report_id(client):
+    client.get("/search/suggest?q=warm")  # build the index before the write
+    response = client.post("/reports", json={
+        "title": "Žemės ūkio produkcija Kaune", "content": "Body", "date": "2024-06-01",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_fold_strips_case_and_diacritics():
+    assert fold("Žemės ŪKIO") == "zemes ukio"
+
+@pytest.mark.parametrize("query", ["ukio", "ŪKIO", "zemes", "Žem", "ukio prod", "kaun zem"])
+def test_queries_match_regardless_of_diacritics(client, report_id, query):
+    assert {"type": "report", "id": report_id, "label": "Žemės ūkio produkcija Kaune"} in suggest(client, query)
+
+def test_every_query_word_must_match(client, report_id):
+    assert all(hit["id"] != report_id for hit in suggest(client, "ukio vilni"))
+
+def test_writes_update_the_index(client, report_id):
+    response = client.put(f"/reports/{report_id}", json={
+        "title": "Miškų ūkio produkcija", "content": "Body", "date": "2024-06-01",
+    })
+    assert response.status_code == 200, response.text
+    assert [hit["label"] for hit in suggest(client, "misku", types="report")] == ["Miškų ūkio produkcija"]
+    assert all(hit["id"] != report_id for hit in suggest(client, "zemes"))
+
+def test_labels_starting_with_the_query_rank_first():
+    index = SuggestIndex()
+    index.built_at = 0
+    index.put("report", 1, "Annual inflation outlook")
+    index.put("report", 2, "Inflation and wages over the long run")
+    index.put("report", 3, "Inflation")
+    assert [hit["id"] for hit in index.suggest("infl")] == [3, 2, 1]
+    assert [hit["id"] for hit in index.suggest("infl", limit=1)] == [3]
+    index.remove("report", 3)
+    assert [hit["id"] for hit in index.suggest("infl")] == [2, 1]
+
+def test_unknown_types_are_rejected(client):
+    assert client.get("/search/suggest?q=a&types=report,video").status_code == 400
@@ -0,0 +1,68 @@
+from datetime import date
+
+import numpy as np
+import pytest
+from conftest import auth_headers
+
+from app.models import SeriesFrequency
+from app.series import month_of
+from app.series_store import HEADER, MAGIC, MEDIA_TYPE, SeriesStore
+
+SERIES = "TEST.BINARY.M"
+
+@pytest.fixture(scope="module")
+def series(client, admin):
+    headers = auth_headers(admin)
+    response = client.put(f"/series/{SERIES}", headers=headers, json={
+        "name": "Binary test", "indicator": "binary", "region": "LT", "frequency": "M",
+    })
+    assert response.status_code == 200, response.text
+    rows = [{"period": f"2023-{m:02d}", "value": m / 4} for m in range(1, 13)]
+    response = client.put(f"/series/{SERIES}/observations", headers=headers, json=rows)
+    assert response.status_code == 200, response.text
+    return rows
+
+def decode(body: bytes):
+    magic, frequency, count = HEADER.unpack_from(body, 0)
+    assert magic == MAGIC
+    assert len(body) == HEADER.size + 16 * count
+    months = np.frombuffer(body, dtype="<i8", count=count, offset=HEADER.size)
+    values = np.frombuffer(body, dtype="<f8", count=count, offset=HEADER.size + 8 * count)
+    return frequency.decode(), months.tolist(), values.tolist()
+
+def test_binary_observations_match_json(client, series):
+    response = client.get(f"/series/{SERIES}/observations?format=binary")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MEDIA_TYPE
+    assert int(response.headers["content-length"]) == len(response.content)
+    frequency, months, values = decode(response.content)
+
+    as_json = client.get(f"/series/{SERIES}/observations").json()
+    assert frequency == "M"
+    assert months == [month_of(date(2023, m, 1)) for m in range(1, 13)]
+    assert values == as_json["values"] == [row["value"] for row in series]
+
+def test_binary_observations_honour_the_date_range(client, series):
+    response = client.get(f"/series/{SERIES}/observations?format=binary&start=2023-03-01&end=2023-05-31")
+    _, months, values = decode(response.content)
+    assert months == [month_of(date(2023, m, 1)) for m in (3, 4, 5)]
+    assert values == [0.75, 1.0, 1.25]
+
+    _, months, _ = decode(client.get(f"/series/{SERIES}/observations?format=binary&start=2030-01-01").content)
+    assert months == []
+
+def test_binary_observations_of_an_unknown_series(client):
+    assert client.get("/series/TEST.MISSING/observations?format=binary").status_code == 404
+
+def test_rewrites_replace_the_file_without_disturbing_open_readers(tmp_path):
+    store = SeriesStore(tmp_path)
+    store.write("A", SeriesFrequency.QUARTERLY, np.array([636, 639]), np.array([1.0, 2.0]))
+    before = store.open("A")
+    assert store.open("A") is before  # cached while the file is unchanged
+
+    store.write("A", SeriesFrequency.QUARTERLY, np.array([636, 639, 642]), np.array([1.0, 2.5, 3.0]))
+    after = store.open("A")
+    assert after is not before
+    assert after.values.tolist() == [1.0, 2.5, 3.0]
+    assert before.values.tolist() == [1.0, 2.0]  # the old mapping stays consistent
+    assert store.open("B") is None
@@ -0,0 +1,77 @@
+import socket
+
+import pytest
+
+from app.utils import urls
+from app.utils.urls import UnsafeURLError, check_public_url, check_url_scheme, open_public_url
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/data.csv",
+    "http:///no-host",
+    "http://127.0.0.1/admin",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://10.0.0.8/data.csv",
+    "http://[::1]/",
+    "http://[::ffff:192.168.0.1]/",
+    "http://example.com:99999/",
+])
+def test_unsafe_urls_are_rejected_without_dns(url):
+    with pytest.raises(UnsafeURLError):
+        check_url_scheme(url)
+
+def resolve_to(address):
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+    return getaddrinfo
+
+def test_host_names_must_resolve_to_public_addresses(monkeypatch):
+    monkeypatch.setattr(urls.socket, "getaddrinfo", resolve_to("93.184.216.34"))
+    check_public_url("https://data.example.com/series.csv")
+
+    monkeypatch.setattr(urls.socket, "getaddrinfo", resolve_to("192.168.1.20"))
+    with pytest.raises(UnsafeURLError):
+        check_public_url("https://internal.example.com/series.csv")
+
+class RecordedSocket:
+    """Stands in for socket.socket: records where it connects, then refuses"""
+    connected = []
+
+    def __init__(self, *args):
+        pass
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, sockaddr):
+        self.connected.append(sockaddr)
+        raise ConnectionRefusedError
+
+    def close(self):
+        pass
+
+def test_fetches_connect_to_the_checked_address(monkeypatch):
+    # A rebinding host answers with a public address, then a private one
+    answers = iter(["93.184.216.34", "127.0.0.1"])
+    monkeypatch.setattr(urls.socket, "getaddrinfo", lambda *args, **kwargs: resolve_to(next(answers))(*args))
+    monkeypatch.setattr(urls.socket, "socket", RecordedSocket)
+    RecordedSocket.connected = []
+    with pytest.raises(OSError):
+        open_public_url("http://rebind.example.com/data.csv", timeout=1)
+    assert RecordedSocket.connected == [("93.184.216.34", 80)]
+
+def test_fetches_refuse_private_answers(monkeypatch):
+    monkeypatch.setattr(urls.socket, "getaddrinfo", resolve_to("10.0.0.5"))
+    monkeypatch.setattr(urls.socket, "socket", RecordedSocket)
+    RecordedSocket.connected = []
+    with pytest.raises(UnsafeURLError):
+        open_public_url("https://internal.example.com/data.csv", timeout=1)
+    assert RecordedSocket.connected == []
+
+def test_dataset_writes_check_the_source_url(client, admin_headers, user_headers):
+    dataset = {"name": "Unsafe source", "description": "d", "source_url": "file:///etc/passwd"}
+    assert client.post("/datasets", json=dataset).status_code == 401
+    assert client.post("/datasets", json=dataset, headers=user_headers).status_code == 403
+    response = client.post("/datasets", json=dataset, headers=admin_headers)
+    assert response.status_code == 422
+    assert response.json()["detail"] == "source_url must be an http or https URL"
@@ -0,0 +1,28 @@
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import ContentType, ContentView
+from app.views import view_counter
+
+def create_report(client, title):
+    response = client.post("/reports", json={"title": title, "content": "Body", "date": "2024-06-01"})
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+def test_views_are_written_behind_and_rank_trending_reports(client):
+    popular, quiet = create_report(client, "Trending popular"), create_report(client, "Trending quiet")
+    view_counter.flush()
+    for report_id in (popular, popular, popular, quiet):
+        assert client.get(f"/reports/{report_id}").status_code == 200
+    with Session(engine) as session:
+        assert session.get(ContentView, (ContentType.REPORT, popular)) is None  # not yet flushed
+
+    assert view_counter.flush() >= 4
+    with Session(engine) as session:
+        assert session.get(ContentView, (ContentType.REPORT, popular)).views == 3
+
+    response = client.get("/reports/trending?limit=100&fields=id,title")
+    assert response.status_code == 200, response.text
+    ranked = [row["id"] for row in response.json() if row["id"] in (popular, quiet)]
+    assert ranked == [popular, quiet]
+    assert set(response.json()[0]) == {"id", "title", "score"}
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from conftest import auth_headers
+
+SERIES = "TEST.VINTAGE.M"
+
+def release(client, headers, dataset_id, rows):
+    body = "series_id,period,value\n" + "".join(f"{SERIES},{period},{value}\n" for period, value in rows)
+    response = client.post(
+        f"/datasets/{dataset_id}/releases", content=body,
+        headers={**headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def values(client, dataset_id, as_of=None):
+    url = f"/datasets/{dataset_id}/series" + (f"?as_of={as_of}" if as_of else "")
+    response = client.get(url)
+    assert response.status_code == 200, response.text
+    (series,) = response.json()["series"]
+    return dict(zip(series["periods"], series["values"]))
+
+@pytest.fixture(scope="module")
+def dataset_id(client, admin):
+    admin_headers = auth_headers(admin)
+    response = client.post("/datasets", json={"name": "Vintages", "description": "d"}, headers=admin_headers)
+    assert response.status_code == 201, response.text
+    dataset_id = response.json()["id"]
+    response = client.put(f"/series/{SERIES}", headers=admin_headers, json={
+        "name": "Vintage test", "indicator": "vintage", "region": "LT", "frequency": "M", "dataset_id": dataset_id,
+    })
+    assert response.status_code == 200, response.text
+    return dataset_id
+
+def test_as_of_reads_values_as_first_published(client, admin_headers, dataset_id):
+    first = release(client, admin_headers, dataset_id, [("2024-01", 1.0), ("2024-02", 2.0)])
+    assert (first["appended"], first["revised"]) == (2, 0)
+    first_at = datetime.fromisoformat(first["released_at"])
+
+    # Revises February and adds March
+    second = release(client, admin_headers, dataset_id, [("2024-01", 1.0), ("2024-02", 2.5), ("2024-03", 3.0)])
+    assert (second["appended"], second["revised"]) == (1, 1)
+    second_at = datetime.fromisoformat(second["released_at"])
+    assert second_at > first_at
+
+    assert values(client, dataset_id) == {"2024-01": 1.0, "2024-02": 2.5, "2024-03": 3.0}
+    assert values(client, dataset_id, first_at.isoformat()) == {"2024-01": 1.0, "2024-02": 2.0}
+    # Timezone-aware times are read as UTC
+    assert values(client, dataset_id, f"{first_at.isoformat()}Z") == {"2024-01": 1.0, "2024-02": 2.0}
+    assert values(client, dataset_id, second_at.isoformat()) == {"2024-01": 1.0, "2024-02": 2.5, "2024-03": 3.0}
+    assert values(client, dataset_id, (first_at - timedelta(seconds=1)).isoformat()) == {}
+
+def test_each_revision_keeps_its_own_vintage(client, admin_headers, dataset_id):
+    before = datetime.fromisoformat(release(client, admin_headers, dataset_id, [("2024-03", 3.0)])["released_at"])
+    middle = datetime.fromisoformat(release(client, admin_headers, dataset_id, [("2024-03", 3.1)])["released_at"])
+    release(client, admin_headers, dataset_id, [("2024-03", 3.2)])
+
+    assert values(client, dataset_id)["2024-03"] == 3.2
+    assert values(client, dataset_id, middle.isoformat())["2024-03"] == 3.1
+    assert values(client, dataset_id, before.isoformat())["2024-03"] == 3.0
+
+def test_unchanged_release_writes_nothing(client, admin_headers, dataset_id):
+    current = values(client, dataset_id)
+    rows = [(period, value) for period, value in current.items()]
+    result = release(client, admin_headers, dataset_id, rows)
+    assert (result["appended"], result["revised"], result["changed_series"]) == (0, 0, [])
+
+def test_release_rejects_bad_rows(client, admin_headers, dataset_id):
+    response = client.post(
+        f"/datasets/{dataset_id}/releases", content=f"{SERIES},2024-04,many\n",
+        headers={**admin_headers, "Content-Type": "text/csv"},
+    )
+    assert response.status_code == 400
+
+def test_large_revisions_stay_within_sqlite_variable_limits(client, admin_headers, dataset_id):
+    # More revised keys than SQLite allows bound variables in one statement
+    periods = [f"{year}-{month:02d}" for year in range(1000, 2400) for month in range(1, 13)]
+    assert len(periods) * 2 > 32766
+    release(client, admin_headers, dataset_id, [(period, 1.0) for period in periods])
+    result = release(client, admin_headers, dataset_id, [(period, 2.0) for period in periods])
+    assert result["revised"] == len(periods)
@@ -1,9 +1,16 @@
 import { renderHook, act, waitFor } from '@testing-library/react';
 import { useProfile } from '../hooks/useProfile';
+import { takeBootstrap } from '../hooks/bootstrap';
 
 // Mock fetch globally
 global.fetch = jest.fn();
 
+// No bootstrap payload unless a test seeds one, so the hook calls /api/profile/me
+jest.mock('../hooks/bootstrap', () => ({
+  takeBootstrap: jest.fn().mockResolvedValue(undefined),
+}));
+const mockTakeBootstrap = jest.mocked(takeBootstrap);
+
 describe('useProfile', () => {
   beforeEach(() => {
     jest.clearAllMocks();
@@ -219,4 +226,30 @@ describe('useProfile', () => {
     expect(result.current.error).toBe('');
     expect(result.current.retryCount).toBe(0);
   });
-}); 
\ No newline at end of file
+
+  it('should take the profile from the bootstrap payload on first load', async () => {
+    const seededProfile = {
+      id: 1,
+      user_id: 1,
+      role: 'journalist',
+      language: 'lt',
+      newsletter: false,
+      digest_frequency: 'never',
+      onboarding_completed: true,
+      topic_slugs: ['prices'],
+      created_at: '2024-01-01T00:00:00Z',
+      updated_at: '2024-01-01T00:00:00Z',
+    };
+    mockTakeBootstrap.mockResolvedValueOnce(seededProfile);
+
+    const { result } = renderHook(() => useProfile());
+
+    await waitFor(() => {
+      expect(result.current.loading).toBe(false);
+    });
+
+    expect(mockTakeBootstrap).toHaveBeenCalledWith('profile');
+    expect(result.current.profile).toEqual(seededProfile);
+    expect(global.fetch).not.toHaveBeenCalled();
+  });
+});
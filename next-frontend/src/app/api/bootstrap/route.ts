@@ -0,0 +1,33 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+export async function GET(request: NextRequest) {
+  try {
+    // Forward request to backend, keeping the query string (e.g. ?lang=en)
+    const backendUrl = process.env.BACKEND_URL || 'http://localhost:8000';
+    const response = await fetch(`${backendUrl}/bootstrap${request.nextUrl.search}`, {
+      method: 'GET',
+      headers: {
+        'Cookie': request.headers.get('cookie') || '', // Forward cookies
+      },
+      cache: 'no-store',
+    });
+
+    const data = await response.json();
+    const result = NextResponse.json(data, { status: response.status });
+    result.headers.set('Cache-Control', 'private, no-store');
+
+    // Pass the CSRF cookie set by the backend through to the browser
+    const setCookie = response.headers.get('set-cookie');
+    if (setCookie) {
+      result.headers.set('Set-Cookie', setCookie);
+    }
+
+    return result;
+  } catch (error) {
+    console.error('Bootstrap API error:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
@@ -17,11 +17,11 @@ export async function GET(request: NextRequest) {
     }
     
     if (searchParams.get('from')) {
-      queryParams.append('from', searchParams.get('from')!);
+      queryParams.append('date_from', searchParams.get('from')!);
     }
     
     if (searchParams.get('to')) {
-      queryParams.append('to', searchParams.get('to')!);
+      queryParams.append('date_to', searchParams.get('to')!);
     }
 
     const queryString = queryParams.toString();
@@ -42,11 +42,12 @@ export async function GET(request: NextRequest) {
     const data = await response.json();
     
     // Transform the data to match the expected Report interface
-    const transformedData = data.map((report: { id: string; title: string; content?: string; date: string; topics?: string[]; coverUrl?: string; pdfUrl?: string; sources?: any[] }) => ({
+    const transformedData = data.map((report: { id: string; title: string; excerpt?: string; content?: string; date: string; topics?: string[]; coverUrl?: string; pdfUrl?: string; sources?: any[] }) => ({
       id: report.id,
       title: report.title,
       date: report.date,
-      abstract: (report.content?.slice(0, 200) || '') + (report.content && report.content.length > 200 ? '...' : ''),
+      // List responses carry a server-side excerpt instead of the full content
+      abstract: report.excerpt ?? ((report.content?.slice(0, 200) || '') + (report.content && report.content.length > 200 ? '...' : '')),
       topics: report.topics || ['Economy'], // Default topic if none provided
       coverUrl: report.coverUrl || `/api/placeholder/400/250?text=${encodeURIComponent(report.title)}`,
       pdfUrl: report.pdfUrl || `/reports/${report.id}`,
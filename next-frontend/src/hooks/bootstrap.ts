@@ -0,0 +1,58 @@
+'use client';
+
+// First-load payload from /api/bootstrap: user, profile, topics,
+// recommendations and a CSRF token in one round trip. Hooks take their part
+// from it on mount instead of calling their own endpoints.
+
+export interface BootstrapCacheHint {
+  scope: 'private' | 'public';
+  max_age: number;
+  etag?: string;
+  lang?: string;
+}
+
+export interface BootstrapPayload {
+  user: {
+    id: number;
+    username: string;
+    email: string;
+    is_admin: boolean;
+    created_at: string;
+  } | null;
+  profile: Record<string, unknown> | null;
+  topics: unknown[];
+  recommendations: unknown[];
+  csrf_token: string;
+  cache: Record<string, BootstrapCacheHint>;
+}
+
+let pending: Promise<BootstrapPayload | null> | null = null;
+const taken = new Set<keyof BootstrapPayload>();
+
+function loadBootstrap(): Promise<BootstrapPayload | null> {
+  if (!pending) {
+    pending = fetch('/api/bootstrap', { credentials: 'include', cache: 'no-store' })
+      .then((r) => (r.ok ? r.json() : null))
+      .catch((err) => {
+        console.error('Bootstrap fetch error:', err);
+        return null;
+      });
+  }
+  return pending;
+}
+
+/**
+ * One part of the bootstrap payload, fetched once and shared by every hook.
+ * Each part is handed out only once; later calls, and all calls after a
+ * failed bootstrap, get undefined so refetches go to the part's own endpoint.
+ */
+export async function takeBootstrap<K extends keyof BootstrapPayload>(
+  part: K
+): Promise<BootstrapPayload[K] | undefined> {
+  if (typeof window === 'undefined' || taken.has(part)) {
+    return undefined;
+  }
+  taken.add(part);
+  const payload = await loadBootstrap();
+  return payload ? payload[part] : undefined;
+}
@@ -1,6 +1,7 @@
 'use client';
 
 import useSWR from 'swr';
+import { takeBootstrap } from './bootstrap';
 
 export interface CurrentUser {
   id: string;
@@ -9,8 +10,13 @@ export interface CurrentUser {
   is_admin?: boolean;
 }
 
-const fetcher = (url: string) =>
-  fetch(url, { credentials: 'include' }).then((r) => {
+const fetcher = async (url: string) => {
+  // First load: the user arrives with the rest of /api/bootstrap
+  const seeded = await takeBootstrap('user');
+  if (seeded !== undefined) {
+    return seeded as unknown as CurrentUser | null;
+  }
+  return fetch(url, { credentials: 'include' }).then((r) => {
     if (r.status === 401) {
       // 401 is expected when user is not authenticated
       // Return null instead of throwing an error
@@ -21,6 +27,7 @@ const fetcher = (url: string) =>
     }
     return r.json();
   });
+};
 
 export function useCurrentUser() {
   const { data, error, isLoading, mutate } = useSWR<CurrentUser | null>('/api/auth/me', fetcher, {
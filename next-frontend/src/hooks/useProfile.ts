@@ -1,4 +1,5 @@
 import { useState, useEffect, useCallback } from 'react';
+import { takeBootstrap } from './bootstrap';
 
 interface ProfileData {
   id: number;
@@ -25,6 +26,14 @@ export function useProfile() {
   const fetchProfile = useCallback(async () => {
     try {
       setError("");
+      // First load: the profile arrives with the rest of /api/bootstrap
+      const seeded = await takeBootstrap('profile');
+      if (seeded !== undefined) {
+        setProfile(seeded as unknown as ProfileData | null);
+        setRetryCount(0);
+        return;
+      }
+
       const response = await fetch('/api/profile/me', {
         credentials: 'include',
         cache: 'no-store', // Prevent caching